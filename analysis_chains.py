@@ -1,28 +1,47 @@
 # 파일 이름: analysis_chains.py (언더바 사용 필수)
 
-from dotenv import load_dotenv
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from data_preparer import EmotionAnalysisReport # 언더바 파일명으로 임포트
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
+from data_preparer import EmotionAnalysisBatch, EmotionAnalysisReport # 언더바 파일명으로 임포트
 
-# 환경 변수 로드
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+_llm = None
 
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY를 .env 파일에 정확히 입력했는지 확인하세요.")
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    api_key=GEMINI_API_KEY,
-    temperature=0.1,
-)
+def get_api_key() -> str:
+    """.env를 읽어 GEMINI_API_KEY를 반환합니다. 키가 필요한 시점에만 호출됩니다."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY를 .env 파일에 정확히 입력했는지 확인하세요.")
+    # Google SDK가 기본적으로 찾는 환경 변수 이름에도 키를 설정합니다.
+    os.environ.setdefault("GOOGLE_API_KEY", api_key)
+    return api_key
+
+
+def get_llm():
+    """기본 Gemini 채팅 모델. 임포트 시점이 아니라 처음 사용할 때 만들어 재사용합니다."""
+    global _llm
+    if _llm is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        _llm = ChatGoogleGenerativeAI(
+            model="gemini-2.5-flash",
+            api_key=get_api_key(),
+            temperature=0.1,
+        )
+    return _llm
+
 
 # --- 1. 감정 분석 체인 정의 ---
-def get_emotion_analysis_chain():
-    """개별 일기 청크를 분석하는 LangChain 체인을 반환합니다."""
+def get_emotion_analysis_chain(chat_model=None):
+    """개별 일기 청크를 분석하는 LangChain 체인을 반환합니다.
+
+    chat_model을 넘기면 기본 Gemini 모델 대신 사용합니다. (테스트용 가짜 모델 등)
+    """
     
     parser = PydanticOutputParser(pydantic_object=EmotionAnalysisReport)
 
@@ -39,11 +58,39 @@ def get_emotion_analysis_chain():
             ("human", "다음 일기를 분석하여 상세 보고서를 작성해 주세요:\n\n{diary_chunk}"),
         ]
     )
-    return prompt | llm | parser
+    return prompt | (chat_model or get_llm()) | parser
+
+
+# --- 1-1. 묶음 감정 분석 체인 정의 ---
+def get_batch_emotion_analysis_chain(chat_model=None):
+    """여러 일기 청크를 한 번의 요청으로 분석하는 체인을 반환합니다.
+
+    입력 diary_chunks는 '[청크 N]' 머리말로 구분된 청크들이며, 결과는 청크 번호(entry_id)로 짝지어진
+    EmotionAnalysisBatch입니다. 짧은 일기가 많을 때 고정 프롬프트 비용과 요청 수를 줄여 줍니다.
+    """
+
+    parser = PydanticOutputParser(pydantic_object=EmotionAnalysisBatch)
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                (
+                    "당신은 심리 분석 전문가입니다. 여러 개의 일기 청크가 '[청크 N]' 머리말로 구분되어 주어집니다. "
+                    "각 청크를 서로 섞지 말고 따로 분석하여 감정 유형, 강도(0.0~1.0), 그리고 원인 사건을 추출하세요. "
+                    "모든 청크에 대해 entry_id에 청크 번호 N을 넣은 결과를 하나씩 빠짐없이 작성하고, "
+                    "결과는 반드시 다음 형식에 맞춰서 JSON으로 출력해야 합니다.\n"
+                    "{format_instructions}"
+                ),
+            ),
+            ("human", "다음 일기 청크들을 각각 분석하여 상세 보고서를 작성해 주세요:\n\n{diary_chunks}"),
+        ]
+    )
+    return prompt | (chat_model or get_llm()) | parser
 
 
 # --- 2. 종합 보고서 생성 체인 정의 ---
-def get_final_report_chain():
+def get_final_report_chain(chat_model=None):
     """청크 분석 결과를 통합하여 종합 보고서를 생성하는 LangChain 체인을 반환합니다."""
     
     report_prompt = ChatPromptTemplate.from_messages(
@@ -59,4 +106,75 @@ def get_final_report_chain():
             ("human", "다음은 제 일기 분석 결과(JSON)입니다. 이를 통합하여 종합 심리 보고서를 작성해 주세요:\n\n{analysis_data}"),
         ]
     )
-    return report_prompt | llm
\ No newline at end of file
+    return report_prompt | (chat_model or get_llm())
+
+
+# --- 3. 기간별 요약 체인 정의 (계층형 종합 보고서용) ---
+def get_period_summary_chain(chat_model=None):
+    """한 기간(주/월)의 분석 결과를 다음 단계에 넘길 짧은 요약문으로 줄이는 체인을 반환합니다."""
+
+    summary_prompt = ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                (
+                    "당신은 개인 심리 분석가입니다. 주어진 기간의 일기 분석 데이터를 읽고, "
+                    "이후 종합 보고서 작성에 쓰일 수 있도록 핵심 감정 패턴, 강도가 높았던 사건(날짜 포함), "
+                    "감정 변화의 흐름을 한국어로 10문장 이내로 요약하세요."
+                ),
+            ),
+            ("human", "기간: {period} ({level})\n\n{analysis_data}"),
+        ]
+    )
+    return summary_prompt | (chat_model or get_llm()) | StrOutputParser()
+
+
+
+# --- 4. RAG 질의응답 체인 정의 ---
+def format_docs(docs):
+    """RAG 검색 결과를 하나의 문자열로 합치는 헬퍼 함수"""
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def get_rag_chain(retriever, chat_model=None, assemble_context=None):
+    """retriever로 찾은 일기 청크만을 근거로 질문에 답하는 RAG 체인을 반환합니다. (입력: 질문 문자열)
+
+    assemble_context(docs, question) -> str 를 넘기면 format_docs 대신 그 함수로 맥락 정보를 만듭니다.
+    (context_assembler.ContextAssembler: 토큰 예산 + 중복 제거 + 분석 요약 대용)
+    """
+
+    rag_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", ("당신은 사용자의 일기 데이터베이스 기반 전문 검색 시스템입니다. "
+                        "주어진 '맥락 정보'만을 사용하여 질문에 답변하세요. 답이 없다면, '정보를 찾을 수 없습니다'라고 답변해야 합니다. "
+                        "\n\n--- 맥락 정보 ---\n{context}")),
+            ("human", "질문: {question}"),
+        ]
+    )
+    if assemble_context is None:
+        context = retriever | format_docs
+    else:
+        context = ({"docs": retriever, "question": RunnablePassthrough()}
+                   | RunnableLambda(lambda inputs: assemble_context(inputs["docs"], inputs["question"])))
+    return (
+        {"context": context, "question": RunnablePassthrough()}
+        | rag_prompt
+        | (chat_model or get_llm())
+    )
+
+
+def get_answer_phrasing_chain(chat_model=None):
+    """통계로 이미 계산한 답(facts)을 질문에 맞는 짧은 문장으로 다듬는 체인을 반환합니다. (입력: question, facts)
+
+    query_router가 감정 색인에서 계산한 결과를 말투만 바꾸는 용도이므로 숫자와 날짜는 바꾸지 않게 합니다.
+    """
+
+    phrasing_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", ("아래 '계산된 사실'만 사용해 사용자의 질문에 두세 문장으로 답하세요. "
+                        "숫자와 날짜는 그대로 쓰고, 사실에 없는 내용은 덧붙이지 마세요."
+                        "\n\n--- 계산된 사실 ---\n{facts}")),
+            ("human", "질문: {question}"),
+        ]
+    )
+    return phrasing_prompt | (chat_model or get_llm()) | StrOutputParser()
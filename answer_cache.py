@@ -0,0 +1,252 @@
+# 파일 이름: answer_cache.py (언더바 사용 필수)
+# RAG 체인 앞에 두는 질문-답변 캐시. 같은 질문은 정규화된 문자열로, 표현만 다른 질문은 질문 임베딩 유사도로 찾습니다.
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+from langchain_core.messages import AIMessage
+
+from tracing import add_event
+
+DEFAULT_ANSWER_CACHE_PATH = "./.cache/rag-answers.sqlite"
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_AGE_DAYS = 30
+SIMILARITY_THRESHOLD = 0.95
+
+
+def normalize_question(question: str) -> str:
+    """띄어쓰기, 문장부호, 대소문자 차이를 없앤 질문 문자열."""
+    question = unicodedata.normalize("NFC", question).lower()
+    return re.sub(r"[\W_]+", "", question)
+
+
+def index_fingerprint(chunk_ids, *extra) -> str:
+    """검색 대상 청크 ID 집합(+ 감정 색인 등 검색 조건에 영향을 주는 값)의 해시. 색인이 바뀌면 값이 달라집니다."""
+    digest = hashlib.sha256()
+    for chunk in sorted(chunk_ids):
+        digest.update(chunk.encode("utf-8"))
+        digest.update(b"\0")
+    for value in extra:
+        digest.update(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def rag_chain_fingerprint(rag_chain) -> str:
+    """RAG 체인의 프롬프트 템플릿과 모델 이름. 프롬프트나 모델을 바꾸면 예전 답변을 쓰지 않습니다."""
+    parts = []
+    for step in getattr(rag_chain, "steps", []):
+        messages = getattr(step, "messages", None)  # 프롬프트 템플릿 단계만 (가짜 모델의 messages 반복자는 제외)
+        for message in messages if isinstance(messages, list) else []:
+            parts.append(getattr(getattr(message, "prompt", None), "template", repr(message)))
+        model_name = getattr(step, "model", None) or getattr(step, "model_name", None)
+        if model_name:
+            parts.append(f"{model_name}:{getattr(step, 'temperature', None)}")
+    return json.dumps(parts, ensure_ascii=False)
+
+
+class AnswerCache:
+    """RAG 답변을 SQLite에 저장하는 캐시.
+
+    index_version(색인 지문)이 다른 항목은 열 때 모두 지우므로 일기가 추가/수정되면 자동으로 무효화됩니다.
+    질문 임베딩은 현재 버전의 것만 메모리 행렬로 올려 두고 코사인 유사도로 비교합니다.
+    """
+
+    def __init__(self, index_version: str, path: str = DEFAULT_ANSWER_CACHE_PATH,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+                 similarity_threshold: float = SIMILARITY_THRESHOLD):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.index_version = index_version
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        # 비동기 서비스는 조회/저장을 스레드에서 하므로, 연결과 메모리 색인은 잠금으로 한 번에 한 스레드만 씁니다.
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY,"
+            " scope TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " vector BLOB,"
+            " answer TEXT NOT NULL,"
+            " index_version TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("DELETE FROM answers WHERE index_version != ?", (index_version,))
+        self.conn.commit()
+        self._keys, self._scopes, self._vectors, self._rows, self._matrix = [], [], [], {}, None
+        self.evict()
+        self._load_vectors()
+
+    def _load_vectors(self):
+        """SQLite에 남아 있는 항목의 질문 벡터로 메모리 색인(key → 행 번호)을 다시 만듭니다."""
+        self._keys, self._scopes, self._vectors, self._rows, self._matrix = [], [], [], {}, None
+        for key, scope, vector in self.conn.execute(
+                "SELECT key, scope, vector FROM answers WHERE vector IS NOT NULL"):
+            self._remember(key, scope, np.frombuffer(vector, dtype=np.float32))
+
+    def _remember(self, key, scope, vector):
+        """key의 벡터를 추가하거나, 이미 있으면 같은 행을 새 벡터/scope로 바꿉니다."""
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        row = self._rows.get(key)
+        if row is None:
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._scopes.append(scope)
+            self._vectors.append(vector)
+        else:
+            self._scopes[row] = scope
+            self._vectors[row] = vector
+        self._matrix = None
+
+    def _similar_key(self, query_vector, scope: str):
+        """scope가 같은 항목 중 질문 벡터가 가장 비슷한 key. 임계값 미만이면 None."""
+        if not self._keys:
+            return None
+        if self._matrix is None:
+            self._matrix = np.stack(self._vectors), np.asarray(self._scopes)
+        vectors, scopes = self._matrix
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        similarity = vectors @ query
+        similarity[scopes != scope] = -1.0
+        best = int(np.argmax(similarity))
+        return self._keys[best] if similarity[best] >= self.similarity_threshold else None
+
+    def make_key(self, question: str, scope: str) -> str:
+        return hashlib.sha256(f"{scope}\0{normalize_question(question)}".encode("utf-8")).hexdigest()
+
+    def get(self, question: str, scope: str = "", query_vector=None):
+        """캐시된 답변을 반환합니다. 정규화된 질문이 같은 항목이 없으면, scope가 같은 항목 중
+        질문 임베딩 유사도가 임계값 이상인 것을 찾습니다. 없으면 None."""
+        with self._lock:
+            key = self.make_key(question, scope)
+            row = self.conn.execute("SELECT answer FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None and query_vector is not None:
+                similar_key = self._similar_key(query_vector, scope)
+                if similar_key is not None:
+                    row = self.conn.execute("SELECT answer FROM answers WHERE key = ?", (similar_key,)).fetchone()
+                    if row is None:
+                        # 다른 프로세스가 지운 항목이면 메모리 색인을 맞추고 한 번 더 찾습니다.
+                        self._load_vectors()
+                        similar_key = self._similar_key(query_vector, scope)
+                        if similar_key is not None:
+                            row = self.conn.execute("SELECT answer FROM answers WHERE key = ?",
+                                                    (similar_key,)).fetchone()
+                    if row is not None:
+                        key = similar_key
+                        self.similar_hits += 1
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE answers SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+            add_event("cache_hit", cache="answer")
+            return row[0]
+
+    def put(self, question: str, answer: str, scope: str = "", query_vector=None):
+        with self._lock:
+            key = self.make_key(question, scope)
+            vector = None if query_vector is None else np.asarray(query_vector, dtype=np.float32)
+            now = time.time()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO answers"
+                " (key, scope, question, vector, answer, index_version, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, scope, question, None if vector is None else vector.tobytes(),
+                 answer, self.index_version, now, now),
+            )
+            self.conn.commit()
+            if vector is not None:
+                self._remember(key, scope, vector)
+
+    def evict(self) -> int:
+        """TTL(max_age_days)이 지난 항목과 최근에 쓰이지 않은 초과 항목(max_entries 초과)을 지웁니다."""
+        with self._lock:
+            removed = 0
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self.conn.execute("DELETE FROM answers WHERE created_at < ?", (cutoff,)).rowcount
+            if self.max_entries:
+                removed += self.conn.execute(
+                    "DELETE FROM answers WHERE key IN ("
+                    " SELECT key FROM answers ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+            self.conn.commit()
+            if removed:
+                self._load_vectors()   # 지운 항목이 비슷한 질문 검색에 남지 않도록 메모리 색인도 다시 만듭니다.
+            return removed
+
+    def close(self):
+        self.evict()
+        self.conn.close()
+
+
+class CachedRagChain:
+    """get_rag_chain()이 만든 체인을 AnswerCache로 감쌉니다. invoke 결과는 원래 체인처럼 AIMessage입니다.
+
+    - embeddings가 있으면 질문 임베딩으로 비슷한 질문을 찾습니다. (CachedEmbeddings라면 리트리버가
+      같은 질문을 다시 임베딩할 때 캐시를 쓰므로 추가 API 호출이 없습니다.)
+    - get_conditions(FilteredDiaryRetriever.get_conditions)가 있으면 질문의 날짜 범위/감정 조건을 scope로 써서
+      '3월에 기뻤던 일'과 '4월에 기뻤던 일'처럼 문장은 비슷하지만 조건이 다른 질문을 섞지 않습니다.
+    """
+
+    def __init__(self, rag_chain, cache: AnswerCache, embeddings=None, get_conditions=None):
+        self.rag_chain = rag_chain
+        self.cache = cache
+        self.embeddings = embeddings
+        self.get_conditions = get_conditions
+        self.fingerprint = rag_chain_fingerprint(rag_chain)
+
+    def _scope(self, question: str) -> str:
+        conditions = self.get_conditions(question) if self.get_conditions else None
+        return json.dumps([self.fingerprint, conditions], ensure_ascii=False, default=str)
+
+    def _embed(self, question: str):
+        return self.embeddings.embed_query(question) if self.embeddings is not None else None
+
+    def invoke(self, question: str):
+        scope, query_vector = self._scope(question), self._embed(question)
+        answer = self.cache.get(question, scope, query_vector)
+        if answer is not None:
+            return AIMessage(content=answer)
+        response = self.rag_chain.invoke(question)
+        self.cache.put(question, response.content, scope, query_vector)
+        return response
+
+    async def ainvoke(self, question: str):
+        parts = [text async for text in self.astream(question)]
+        return AIMessage(content="".join(parts))
+
+    async def astream(self, question: str):
+        """답변 텍스트 조각을 생성되는 대로 내보냅니다. 캐시에 있으면 한 번에 전체 답변을 내보냅니다.
+
+        질문 임베딩과 캐시 조회/저장(SQLite, 비슷한 질문 검색)은 스레드에서 해서 이벤트 루프를 막지 않습니다.
+        (그동안 다른 연결의 답변 스트리밍이 멈추지 않습니다.) 끝까지 받은 답변만 캐시에 저장합니다.
+        """
+        scope = self._scope(question)
+        query_vector = await asyncio.to_thread(self._embed, question)
+        answer = await asyncio.to_thread(self.cache.get, question, scope, query_vector)
+        if answer is not None:
+            yield answer
+            return
+        parts = []
+        async for chunk in self.rag_chain.astream(question):
+            text = getattr(chunk, "content", chunk)
+            parts.append(text)
+            yield text
+        await asyncio.to_thread(self.cache.put, question, "".join(parts), scope, query_vector)
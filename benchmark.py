@@ -0,0 +1,359 @@
+# 파일 이름: benchmark.py (언더바 사용 필수)
+# 실제 Gemini API 없이 가짜 채팅/임베딩 모델과 합성 일기로 파이프라인 단계별 성능을 잽니다.
+# 모든 입력과 가짜 모델의 응답은 seed로 정해지므로 같은 옵션이면 항상 같은 작업량을 측정합니다.
+# 사용법:
+#   python benchmark.py --size 1y                        # 1년치 합성 일기로 측정
+#   python benchmark.py --size 1y --save-baseline        # 결과를 기준값으로 저장 (benchmark-baseline.json)
+#   python benchmark.py --size 1y --check                # 기준값보다 허용 범위 이상 느려지면 종료 코드 1
+#   python benchmark.py --days 30 --latency 0.2 --error-rate 0.05   # 지연 시간/오류를 넣어 측정
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+
+SIZES = {"7d": 7, "1m": 31, "1y": 365, "5y": 1826}
+DEFAULT_BASELINE_PATH = "./benchmark-baseline.json"
+DEFAULT_TOLERANCE = 0.3        # 처리량이 30% 넘게 줄거나 p95/메모리가 30% 넘게 늘면 회귀로 판단
+DEFAULT_QUERIES = 50
+DEFAULT_START_DATE = date(2024, 1, 1)
+
+# --- 합성 일기 ---
+_PEOPLE = ["엄마", "아빠", "동생", "친구 민지", "팀장님", "동료 지훈", "룸메이트", "할머니"]
+_PLACES = ["회사", "카페", "공원", "도서관", "병원", "헬스장", "본가", "지하철"]
+_EVENTS = [
+    "{person}와 {place}에서 오랜만에 이야기를 나눴다",
+    "{place}에 가는 길에 비가 와서 옷이 다 젖었다",
+    "{person}가 보낸 메시지를 한참 동안 읽지 못했다",
+    "{place}에서 마감 때문에 밤늦게까지 일했다",
+    "{person}와 저녁을 먹으며 다음 여행 계획을 세웠다",
+    "{place}에서 혼자 책을 읽으며 시간을 보냈다",
+    "{person}에게 서운한 말을 들어서 하루 종일 마음이 무거웠다",
+    "{place}까지 걸어가며 생각을 정리했다",
+]
+_FEELINGS = [
+    "오늘은 마음이 평온했다", "괜히 불안하고 초조했다", "정말 기쁘고 뿌듯했다", "조금 외로웠다",
+    "너무 피곤해서 아무것도 하기 싫었다", "고마운 마음이 들었다", "화가 나서 참기 어려웠다",
+    "내일이 조금 기대된다", "왜 그랬는지 후회가 된다", "생각이 많아 잠이 오지 않았다",
+]
+_TITLES = ["평범한 하루", "비 오는 날", "긴 하루", "작은 행복", "마음이 복잡한 날", "주말", "야근", "산책"]
+
+
+def generate_diary_text(days: int, seed: int = 0, start: date = DEFAULT_START_DATE) -> str:
+    """크롤러와 같은 '날짜:/제목:/본문:' 형식의 합성 일기 days일치. (약 5%는 여러 청크로 나뉘는 긴 일기)"""
+    rng = random.Random(seed)
+    records = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        sentences = rng.randint(12, 28) if rng.random() < 0.05 else rng.randint(3, 9)
+        body = []
+        for _ in range(sentences):
+            event = rng.choice(_EVENTS).format(person=rng.choice(_PEOPLE), place=rng.choice(_PLACES))
+            body.append(f"{event}. {rng.choice(_FEELINGS)}.")
+        # blog_crawler.format_post()와 같은 형식
+        records.append(
+            f"날짜: {day.year}. {day.month}. {day.day}. {rng.randint(20, 23)}:{rng.randint(0, 59):02d}\n"
+            f"제목: {rng.choice(_TITLES)}\n본문:\n{' '.join(body)}\n\n---\n\n"
+        )
+    return "".join(records)
+
+
+def generate_questions(count: int, days: int, seed: int = 0, start: date = DEFAULT_START_DATE):
+    """검색 단계에 쓸 질문. 날짜/감정 조건이 있는 질문과 없는 질문을 섞습니다. (상대 날짜 표현은 쓰지 않음)"""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        day = start + timedelta(days=rng.randrange(days))
+        kind = i % 4
+        if kind == 0:
+            questions.append(f"{day.year}년 {day.month}월에 가장 불안했던 일은?")
+        elif kind == 1:
+            questions.append(f"{day.year}년 {day.month}월 {day.day}일에 무슨 일이 있었어?")
+        elif kind == 2:
+            questions.append(f"{rng.choice(_PEOPLE)}와 {rng.choice(_PLACES)}에서 있었던 일")
+        else:
+            questions.append("기뻤던 날에는 주로 무엇을 했어?")
+    return questions
+
+
+# --- 측정 ---
+def _latency_recorder(latencies):
+    """가짜 채팅 모델 호출 한 번마다 걸린 시간을 기록하는 LangChain 콜백."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class LatencyRecorder(BaseCallbackHandler):
+        def __init__(self):
+            self.started = {}
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self.started[run_id] = time.perf_counter()
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            latencies.append(time.perf_counter() - self.started.pop(run_id))
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self.started.pop(run_id, None)
+
+    return LatencyRecorder()
+
+
+def _timed_embeddings(underlying, latencies):
+    """embed_documents 호출(배치)마다 걸린 시간을 기록하는 Embeddings 래퍼."""
+    from langchain_core.embeddings import Embeddings
+
+    class TimedEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            started = time.perf_counter()
+            vectors = underlying.embed_documents(texts)
+            latencies.append(time.perf_counter() - started)
+            return vectors
+
+        def embed_query(self, text):
+            return underlying.embed_query(text)
+
+    return TimedEmbeddings()
+
+
+def run_stage(results: dict, name: str, func):
+    """func(latencies) → (반환값, 처리 개수)를 실행하며 시간, 지연 시간 백분위, 최대 메모리를 기록합니다.
+
+    단계 안에서 출력되는 진행 메시지는 숨기며, 메모리는 tracemalloc이 추적한 파이썬 할당의 최댓값입니다.
+    """
+    latencies = []
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value, items = func(latencies)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95 = (np.percentile(latencies, [50, 95]) * 1000).tolist() if latencies else (None, None)
+    results[name] = {
+        "items": items,
+        "seconds": round(seconds, 4),
+        "throughput": round(items / seconds, 2) if seconds > 0 else None,
+        "p50_ms": None if p50 is None else round(p50, 3),
+        "p95_ms": None if p95 is None else round(p95, 3),
+        "peak_mb": round(peak / 2 ** 20, 2),
+    }
+    return value
+
+
+def run_benchmark(days: int, seed: int = 0, latency: float = 0.0, error_rate: float = 0.0,
+                  embed_latency: float = 0.0, queries: int = DEFAULT_QUERIES, batch_tokens: int = None,
+                  workdir: str = None, vector_store: str = "flat") -> dict:
+    """합성 일기 days일치로 모든 단계를 실행하고 {단계 이름: 측정값}을 반환합니다."""
+    from analysis_chains import (get_batch_emotion_analysis_chain, get_emotion_analysis_chain,
+                                 get_final_report_chain, get_period_summary_chain)
+    from concurrent_analysis import DEFAULT_BATCH_TOKENS, AdaptiveRateLimiter, analyze_chunks
+    from data_preparer import stream_documents
+    from embedding_cache import CachedEmbeddings
+    from emotion_taxonomy import EmotionTaxonomy
+    from fake_models import FakeEmbeddings, FakeEmotionChatModel
+    from filtered_retriever import FilteredDiaryRetriever, build_emotion_index
+    from keyword_index import HybridRetriever, KeywordIndex
+    from parent_retriever import CHILD_CANDIDATES, ParentChildRetriever, stream_child_documents
+    from report_pipeline import build_final_report
+    from vector_index import chunk_id
+
+    batch_tokens = DEFAULT_BATCH_TOKENS if batch_tokens is None else batch_tokens
+    workdir = workdir or tempfile.mkdtemp(prefix="maum-bench-")
+    data_path = os.path.join(workdir, f"synthetic-diaries-{days}d.txt")
+    with open(data_path, "w", encoding="utf-8") as f:
+        f.write(generate_diary_text(days, seed))
+
+    def rate_limiter():
+        # 가짜 모델에는 요청 한도가 없으므로 한도 대기는 빼고 재시도 간격만 짧게 둡니다.
+        return AdaptiveRateLimiter(rpm=1e9, tpm=1e12, base_delay=0.01, max_delay=0.1)
+
+    def chat_model(latencies):
+        return FakeEmotionChatModel(latency=latency, error_rate=error_rate, seed=seed,
+                                    callbacks=[_latency_recorder(latencies)])
+
+    results = {}
+
+    def prepare(latencies):
+        documents = []
+        last = time.perf_counter()
+        for doc in stream_documents(data_path):
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+            documents.append(doc)
+        return documents, len(documents)
+
+    documents = run_stage(results, "prepare", prepare)
+
+    def analyze(latencies):
+        model = chat_model(latencies)
+        reports = analyze_chunks(
+            documents, get_emotion_analysis_chain(model), rate_limiter=rate_limiter(),
+            batch_chain=get_batch_emotion_analysis_chain(model) if batch_tokens > 0 else None,
+            batch_token_budget=batch_tokens, taxonomy=EmotionTaxonomy(path=None),
+        )
+        return reports, len(documents)
+
+    reports = run_stage(results, "analyze", analyze)
+
+    # 검색 색인은 rag_service와 같이 문장 단위 자식 청크로 만듭니다.
+    parents = {chunk_id(doc): doc for doc in documents}
+
+    def split_children(latencies):
+        children = list(stream_child_documents(documents))
+        return children, len(children)
+
+    children = run_stage(results, "split_children", split_children)
+
+    def embed(latencies):
+        embeddings = CachedEmbeddings(
+            _timed_embeddings(FakeEmbeddings(latency=embed_latency, seed=seed), latencies),
+            namespace="benchmark", cache_dir=os.path.join(workdir, "embeddings"),
+        )
+        embeddings.embed_documents([doc.page_content for doc in children])
+        return embeddings, len(children)
+
+    embeddings = run_stage(results, "embed", embed)
+
+    keyword_index = run_stage(results, "index_keyword",
+                              lambda latencies: (KeywordIndex.build(children), len(children)))
+
+    vectorstore = None
+    try:
+        if vector_store == "chroma":
+            import chromadb  # noqa: F401  (설치되어 있을 때만 Chroma 색인 단계를 잽니다)
+    except ImportError:
+        print("⚠️ chromadb가 없어 벡터 색인 단계는 건너뜁니다. (검색은 keyword 모드)", file=sys.stderr)
+    else:
+        from vector_index import sync_vectorstore
+
+        vectorstore = run_stage(results, "index_vector", lambda latencies: (
+            sync_vectorstore(children, embeddings, persist_directory=os.path.join(workdir, "vectors"),
+                             store=vector_store),
+            len(children),
+        ))
+
+    def retrieve(latencies):
+        k = 3 * CHILD_CANDIDATES
+        filtered = FilteredDiaryRetriever(vectorstore=vectorstore, k=k, emotion_index=build_emotion_index(reports))
+        hybrid = HybridRetriever(keyword_index=keyword_index, vector_retriever=filtered, k=k,
+                                 mode="hybrid" if vectorstore is not None else "keyword")
+        retriever = ParentChildRetriever(child_retriever=hybrid, parents=parents, k=3)
+        questions = generate_questions(queries, days, seed)
+        for question in questions:
+            started = time.perf_counter()
+            retriever.invoke(question)
+            latencies.append(time.perf_counter() - started)
+        return None, len(questions)
+
+    run_stage(results, "retrieve", retrieve)
+
+    def report(latencies):
+        model = chat_model(latencies)
+        content = build_final_report(reports, get_final_report_chain(model), get_period_summary_chain(model),
+                                     rate_limiter=rate_limiter())
+        return content, len(reports)
+
+    run_stage(results, "report", report)
+    return results
+
+
+# --- 기준값 비교 ---
+def check_regressions(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE):
+    """기준값과 비교해 회귀 메시지 목록을 반환합니다. (빈 목록이면 통과)"""
+    problems = []
+    for stage, expected in baseline.items():
+        actual = results.get(stage)
+        if actual is None:
+            problems.append(f"{stage}: 이번 실행에 없는 단계")
+            continue
+        if expected.get("throughput") and actual["throughput"] is not None \
+                and actual["throughput"] < expected["throughput"] * (1 - tolerance):
+            problems.append(f"{stage}: 처리량 {actual['throughput']}/s < 기준 {expected['throughput']}/s")
+        for key, unit in (("p95_ms", "ms"), ("peak_mb", "MB")):
+            if expected.get(key) and actual.get(key) is not None and actual[key] > expected[key] * (1 + tolerance):
+                problems.append(f"{stage}: {key} {actual[key]}{unit} > 기준 {expected[key]}{unit}")
+    return problems
+
+
+def format_table(results: dict) -> str:
+    def show(value):
+        return "-" if value is None else str(value)
+
+    rows = [("단계", "개수", "초", "개/초", "p50 ms", "p95 ms", "최대 MB")]
+    rows += [(stage, show(m["items"]), show(m["seconds"]), show(m["throughput"]), show(m["p50_ms"]),
+              show(m["p95_ms"]), show(m["peak_mb"])) for stage, m in results.items()]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="가짜 모델로 파이프라인 단계별 성능 측정 (API 키 불필요)")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--size", choices=list(SIZES), default="1m", help="합성 일기 기간 (기본: 1m)")
+    size.add_argument("--days", type=int, help="합성 일기 일수 (--size 대신)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="가짜 채팅 모델 호출당 지연 시간(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="가짜 채팅 모델 429 오류 확률")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="가짜 임베딩 배치당 지연 시간(초)")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="검색 단계 질문 수")
+    parser.add_argument("--batch-tokens", type=int, default=None, help="감정 분석 묶음 토큰 예산 (0이면 묶지 않음)")
+    parser.add_argument("--vector-store", choices=["flat", "int8", "chroma"], default="flat",
+                        help="벡터 스토어 (기본: flat)")
+    parser.add_argument("--output", help="측정 결과 JSON 저장 경로")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="기준값 파일")
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준값으로 저장")
+    parser.add_argument("--check", action="store_true", help="기준값보다 느려졌으면 실패")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="허용 오차 비율 (기본 0.3)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    days = args.days or SIZES[args.size]
+    # 기준값은 측정 조건별로 따로 저장합니다.
+    key = (f"{days}d-seed{args.seed}-lat{args.latency}-err{args.error_rate}-emb{args.embed_latency}"
+           f"-q{args.queries}-batch{args.batch_tokens}-{args.vector_store}")
+
+    with tempfile.TemporaryDirectory(prefix="maum-bench-") as workdir:
+        results = run_benchmark(days, args.seed, args.latency, args.error_rate, args.embed_latency,
+                                args.queries, args.batch_tokens, workdir, args.vector_store)
+    print(f"합성 일기 {days}일치 ({key})")
+    print(format_table(results))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": key, "stages": results}, f, ensure_ascii=False, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+    if args.save_baseline:
+        baselines[key] = results
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"✅ 기준값 저장: {args.baseline} [{key}]")
+    if args.check:
+        if key not in baselines:
+            raise SystemExit(f"❌ {args.baseline}에 [{key}] 기준값이 없습니다. 먼저 --save-baseline으로 저장하세요.")
+        problems = check_regressions(results, baselines[key], args.tolerance)
+        if problems:
+            print("❌ 성능 회귀:")
+            for problem in problems:
+                print(f"  - {problem}")
+            raise SystemExit(1)
+        print(f"✅ 기준값 대비 허용 범위(±{args.tolerance:.0%}) 안입니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+# 파일 이름: blog_crawler.py (언더바 사용 필수)
+# 블로그의 실제 글 번호를 먼저 찾은 뒤, 연결을 재사용하는 비동기 클라이언트로 글을 동시에 가져옵니다.
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from urllib.parse import unquote, urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+BASE_URL = "https://blog.naver.com"
+RSS_URL = "https://rss.blog.naver.com/{blog_id}.xml"
+POST_LIST_PATH = "/PostTitleListAsync.naver?blogId={blog_id}&currentPage={page}&countPerPage={per_page}"
+POST_VIEW_PATH = "/PostView.naver?blogId={blog_id}&logNo={log_no}"
+
+POSTS_PER_PAGE = 30          # 네이버 글 목록 API가 한 번에 주는 최대 개수
+MAX_CONCURRENCY = 4          # 동시에 진행할 요청 수
+PER_HOST_INTERVAL = 0.5      # 같은 호스트에 보내는 요청 사이의 최소 간격(초)
+SEEN_STATUSES = ("done", "skipped")   # 다음 실행에서 다시 가져오지 않는 글 상태
+REQUEST_TIMEOUT = 20.0
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+_LOG_NO_PATTERN = re.compile(r'"logNo"\s*:\s*"?(\d+)"?')
+_TOTAL_COUNT_PATTERN = re.compile(r'"totalCount"\s*:\s*"?(\d+)"?')
+_RSS_LINK_PATTERN = re.compile(r"<link>\s*(?:<!\[CDATA\[)?\s*https?://[^<]*?/(\d{6,})\b")
+
+
+class HostRateLimiter:
+    """호스트별로 요청 간격을 보장하는 예의(politeness) 제한기."""
+
+    def __init__(self, interval: float = PER_HOST_INTERVAL):
+        self.interval = interval
+        self.next_slot = {}
+        self.locks = {}
+
+    async def wait(self, url: str):
+        host = urlparse(url).netloc
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self.next_slot.get(host, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_slot[host] = time.monotonic() + self.interval
+
+
+def create_client(max_connections: int = MAX_CONCURRENCY) -> httpx.AsyncClient:
+    """연결 풀을 공유하는 비동기 HTTP 클라이언트를 만듭니다."""
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=REQUEST_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+def parse_post_html(html: str):
+    """글 페이지 HTML에서 날짜, 제목, 본문을 추출합니다. 형식이 맞지 않으면 None."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # [필수 검토] 만약 여기서 오류가 나면 네이버 블로그 디자인이 바뀌었을 가능성이 높습니다.
+    title_element = soup.select_one('.se-viewer .se-title-text')
+    date_element = soup.select_one('.se-viewer .date-info')
+    if not title_element or not date_element:
+        return None
+
+    content_paragraphs = [p.text for p in soup.select('.se-main-container p')]
+    return {
+        "title": title_element.text.strip(),
+        "date": date_element.text.strip(),
+        "content": "\n".join(content_paragraphs),
+    }
+
+
+def format_post(post: dict) -> str:
+    """data_preparer가 읽는 '날짜:/제목:/본문:' 기록 형식으로 바꿉니다."""
+    return f"날짜: {post['date']}\n제목: {post['title']}\n본문:\n{post['content']}\n\n---\n\n"
+
+
+async def _get(client, limiter, url: str) -> httpx.Response:
+    await limiter.wait(url)
+    response = await client.get(url)
+    response.raise_for_status()
+    return response
+
+
+async def discover_post_ids(client, limiter, blog_id: str, base_url: str = BASE_URL,
+                            rss_url: str = RSS_URL, stop_at: str = None):
+    """블로그 글 목록 API를 페이지 단위로 훑어 실제 글 번호(logNo)를 최신순으로 반환합니다.
+
+    stop_at(이미 받은 가장 최근 글 번호)을 만나면 거기서 멈춥니다.
+    목록 API가 실패하면 RSS 피드(최근 글만 포함)로 대신합니다.
+    """
+    found = []
+    seen = set()
+    try:
+        page, total_pages = 1, None
+        while total_pages is None or page <= total_pages:
+            url = base_url + POST_LIST_PATH.format(blog_id=blog_id, page=page, per_page=POSTS_PER_PAGE)
+            text = (await _get(client, limiter, url)).text
+            if total_pages is None:
+                total = _TOTAL_COUNT_PATTERN.search(text)
+                total_pages = math.ceil(int(total.group(1)) / POSTS_PER_PAGE) if total else 1
+            page_ids = [log_no for log_no in _LOG_NO_PATTERN.findall(text) if log_no not in seen]
+            if not page_ids:
+                break  # 마지막 페이지를 넘기면 같은 페이지가 반복됩니다.
+            for log_no in page_ids:
+                if log_no == stop_at:
+                    return found
+                seen.add(log_no)
+                found.append(log_no)
+            page += 1
+    except httpx.HTTPError as e:
+        print(f"❌ 글 목록 조회 실패, RSS로 대체합니다: {e}")
+        text = (await _get(client, limiter, rss_url.format(blog_id=blog_id))).text
+        for log_no in _RSS_LINK_PATTERN.findall(unquote(text)):
+            if log_no == stop_at:
+                break
+            if log_no not in seen:
+                seen.add(log_no)
+                found.append(log_no)
+    return found
+
+
+async def fetch_post(client, limiter, blog_id: str, log_no: str, base_url: str = BASE_URL,
+                     validators: dict = None):
+    """글 하나를 가져와 파싱하고 (상태, 글) 튜플을 반환합니다.
+
+    상태는 'done', 'not_modified'(304), 'skipped'(형식 불일치/비공개), 'failed' 중 하나입니다.
+    validators에 이전 응답의 etag/last_modified를 넘기면 조건부 요청을 보냅니다.
+    """
+    url = base_url + POST_VIEW_PATH.format(blog_id=blog_id, log_no=log_no)
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    try:
+        await limiter.wait(url)
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304:
+            return "not_modified", None
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"❌ 오류 발생: {log_no}번 글 - {e}")
+        return "failed", {"error": str(e)}
+
+    post = parse_post_html(response.text)
+    if post is None:
+        print(f"❌ 실패: {log_no}번 글은 형식이 맞지 않거나 비공개입니다.")
+        return "skipped", None
+    post["log_no"] = log_no
+    post["etag"] = response.headers.get("ETag")
+    post["last_modified"] = response.headers.get("Last-Modified")
+    print(f"✅ 성공: {log_no}번 글 ({post['title']})")
+    return "done", post
+
+
+class CrawlState:
+    """크롤링 진행 상황(마지막으로 본 글 번호, 글별 상태, ETag/Last-Modified)을 저장하는 상태 파일."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {"last_seen_log_no": None, "posts": {}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    @property
+    def last_seen_log_no(self):
+        return self.data.get("last_seen_log_no")
+
+    def status(self, log_no: str):
+        return self.data["posts"].get(log_no, {}).get("status")
+
+    def validators(self, log_no: str) -> dict:
+        return self.data["posts"].get(log_no, {})
+
+    def record(self, log_no: str, status: str, post: dict = None):
+        entry = self.data["posts"].setdefault(log_no, {})
+        entry["status"] = status
+        entry["checked_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if status == "done":
+            entry.pop("error", None)
+        if post:
+            for key in ("etag", "last_modified", "content_hash", "error"):
+                if post.get(key):
+                    entry[key] = post[key]
+
+    def update_last_seen(self, log_nos):
+        candidates = [int(n) for n in log_nos] + ([int(self.last_seen_log_no)] if self.last_seen_log_no else [])
+        if candidates:
+            self.data["last_seen_log_no"] = str(max(candidates))
+
+    def save(self):
+        """임시 파일에 쓴 뒤 교체해서, 저장 중에 멈춰도 상태 파일이 깨지지 않게 합니다."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+
+class JsonlPostWriter:
+    """가져온 글을 도착하는 즉시 한 줄씩 JSONL 파일 끝에 추가하고 바로 flush합니다."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        # 지난 실행이 줄 중간에서 멈췄다면 잘린 줄 뒤에 이어 붙이지 않도록 줄을 바꾸고 시작합니다.
+        needs_newline = False
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self.file = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            self.file.write("\n")
+
+    def write(self, post: dict):
+        record = {key: post[key] for key in ("log_no", "date", "title", "content")}
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    @staticmethod
+    def written_log_nos(path: str):
+        """JSONL 파일에 이미 기록된 글 번호들. (중간에 잘린 마지막 줄은 무시합니다)"""
+        log_nos = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        log_nos.add(json.loads(line)["log_no"])
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+        return log_nos
+
+
+async def _fetch_all(blog_id: str, log_nos, on_result, base_url: str, rss_url: str,
+                     max_concurrency: int, per_host_interval: float, stop_at: str = None,
+                     validators_for=None):
+    """글 번호를 찾고(log_nos가 None일 때) 최대 max_concurrency개씩 가져오며, 끝날 때마다 on_result를 호출합니다."""
+    limiter = HostRateLimiter(per_host_interval)
+    async with create_client(max_concurrency) as client:
+        if log_nos is None:
+            log_nos = await discover_post_ids(client, limiter, blog_id, base_url, rss_url, stop_at)
+            print(f"🔎 글 {len(log_nos)}개를 찾았습니다.")
+        pending = iter(log_nos)
+
+        async def worker():
+            for log_no in pending:
+                validators = validators_for(log_no) if validators_for else None
+                status, post = await fetch_post(client, limiter, blog_id, log_no, base_url, validators)
+                on_result(log_no, status, post)
+
+        await asyncio.gather(*(worker() for _ in range(max_concurrency)))
+    return log_nos
+
+
+async def crawl(blog_id: str, base_url: str = BASE_URL, rss_url: str = RSS_URL,
+                max_concurrency: int = MAX_CONCURRENCY, per_host_interval: float = PER_HOST_INTERVAL,
+                stop_at: str = None):
+    """글 번호를 찾은 뒤 최대 max_concurrency개씩 동시에 가져와, 오래된 글부터 순서대로 반환합니다."""
+    posts = {}
+
+    def collect(log_no, status, post):
+        if status == "done":
+            posts[log_no] = post
+
+    log_nos = await _fetch_all(blog_id, None, collect, base_url, rss_url,
+                               max_concurrency, per_host_interval, stop_at)
+    return [posts[log_no] for log_no in reversed(log_nos) if log_no in posts]
+
+
+async def crawl_incremental(blog_id: str, output_path: str, state_path: str,
+                            since_last: bool = True, refresh: bool = False,
+                            base_url: str = BASE_URL, rss_url: str = RSS_URL,
+                            max_concurrency: int = MAX_CONCURRENCY,
+                            per_host_interval: float = PER_HOST_INTERVAL,
+                            save_every: int = 20) -> dict:
+    """상태 파일을 이용해 이어서/새 글만 크롤링하고, 받은 글은 즉시 JSONL에 추가합니다.
+
+    - since_last: 지난번에 본 가장 최근 글 번호를 만나면 글 목록 조회를 멈춥니다. (새 글만)
+    - refresh: 이미 받은 글도 ETag/Last-Modified 조건부 요청으로 다시 확인합니다. (수정된 글만 다시 기록)
+    중간에 멈춰도 이미 기록된 글과 건너뛴 글(skipped)은 다음 실행에서 다시 가져오지 않고, 실패한 글만 다시 시도합니다.
+    반환값은 상태별 글 개수입니다.
+    """
+    state = CrawlState(state_path)
+    # 상태 파일을 저장하기 전에 멈췄더라도 JSONL에 기록된 글은 완료된 것으로 봅니다.
+    for log_no in JsonlPostWriter.written_log_nos(output_path):
+        if state.status(log_no) != "done":
+            state.record(log_no, "done")
+    writer = JsonlPostWriter(output_path)
+    counts = {"done": 0, "not_modified": 0, "skipped": 0, "failed": 0}
+
+    limiter = HostRateLimiter(per_host_interval)
+    async with create_client(max_concurrency) as client:
+        stop_at = state.last_seen_log_no if since_last and not refresh else None
+        discovered = await discover_post_ids(client, limiter, blog_id, base_url, rss_url, stop_at)
+
+    # 이미 받은 글과 형식 불일치/비공개로 건너뛴 글은 다시 가져오지 않습니다. (refresh이면 조건부 요청으로 다시 확인)
+    targets = [n for n in reversed(discovered) if refresh or state.status(n) not in SEEN_STATUSES]
+    # since_last로 목록 조회를 멈췄더라도 지난번에 실패한 글은 다시 시도합니다.
+    targets += [n for n, entry in state.data["posts"].items()
+                if entry.get("status") == "failed" and n not in targets]
+    print(f"🔎 새로 확인할 글 {len(targets)}개 (목록에서 찾은 글 {len(discovered)}개).")
+
+    def on_result(log_no, status, post):
+        if status == "done":
+            # 서버가 ETag를 주지 않아도 본문 해시가 같으면 다시 기록하지 않습니다.
+            post["content_hash"] = hashlib.sha256(
+                f"{post['date']}\0{post['title']}\0{post['content']}".encode("utf-8")
+            ).hexdigest()
+            if state.validators(log_no).get("content_hash") == post["content_hash"]:
+                status = "not_modified"
+            else:
+                writer.write(post)
+        counts[status] += 1
+        # 304(변경 없음)인 글은 이전에 받은 그대로 완료 상태를 유지합니다.
+        state.record(log_no, "done" if status == "not_modified" else status, post)
+        if sum(counts.values()) % save_every == 0:
+            state.save()
+
+    try:
+        await _fetch_all(blog_id, targets, on_result, base_url, rss_url, max_concurrency, per_host_interval,
+                         validators_for=state.validators if refresh else None)
+        state.update_last_seen(discovered)
+    finally:
+        writer.close()
+        state.save()
+    return counts
@@ -0,0 +1,270 @@
+# 파일 이름: cli.py (언더바 사용 필수)
+# 단계별로 실행할 수 있는 명령줄 도구. 각 명령은 필요한 모듈만 실행 시점에 불러오므로
+# `stats`, `--help`처럼 LLM이 필요 없는 명령은 API 키 없이 바로 실행됩니다.
+# 사용법:
+#   python cli.py ingest [--crawl BLOG_ID]     # 일기 파일 확인 (JSONL이면 블로그에서 새 글도 수집)
+#   python cli.py analyze                      # 청크별 감정 분석 → emotion-reports.jsonl (+ 통계용 .npz)
+#   python cli.py resume | retry-failed        # 중단된 분석 이어하기 / 실패한 청크만 다시 분석
+#   python cli.py report                       # 종합 심리 보고서 → final-psychological-report.md
+#   python cli.py index [--mode keyword]       # 키워드/벡터 색인 동기화
+#   python cli.py ask "질문" | ask --port 8000  # 질의응답 (질문이 없으면 REPL)
+#   python cli.py stats                        # 감정 통계 (LLM 호출 없음)
+#   python cli.py check-startup                # 시작 시간/무거운 모듈 임포트 여부 점검
+#   python cli.py bench --size 1y [--check]    # 가짜 모델로 단계별 성능 측정 (benchmark.py와 같음)
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_REPORTS_PATH = "./emotion-reports.jsonl"  # report_store.DEFAULT_JSONL_PATH와 같은 값
+DEFAULT_REPORT_OUTPUT = "final-psychological-report.md"
+DEFAULT_CRAWL_STATE = "./data_raw/crawl-state.json"
+
+# `--help`/`stats`가 이 시간 안에 끝나야 하며, 아래 모듈을 불러오면 안 됩니다.
+STARTUP_BUDGET_SECONDS = 0.5
+HEAVY_MODULES = ("langchain_core", "langchain_google_genai", "langchain_community", "chromadb", "httpx")
+# 이 명령들은 실행 추적(tracing.py)을 켜고 끝에 단계별 시간/토큰/재시도/캐시 요약 표를 출력합니다.
+TRACED_COMMANDS = ("ingest", "analyze", "resume", "retry-failed", "report", "index", "ask")
+# 일기 파일을 읽는 명령. --data를 생략하면 실행 시점에 data_preparer.DEFAULT_DATA_PATH를 씁니다.
+# (data_preparer는 LangChain을 불러오므로 `--help`/`stats`에서는 임포트하지 않습니다.)
+DATA_COMMANDS = ("ingest", "analyze", "resume", "retry-failed", "report", "index", "ask")
+
+
+def cmd_ingest(args):
+    if args.crawl:
+        if not args.data.endswith(".jsonl"):
+            raise SystemExit("❌ --crawl은 JSONL 파일(--data ./data_raw/....jsonl)에만 저장할 수 있습니다.")
+        import asyncio
+        from blog_crawler import crawl_incremental
+
+        os.makedirs(os.path.dirname(args.data) or ".", exist_ok=True)
+        counts = asyncio.run(crawl_incremental(args.crawl, args.data, args.crawl_state))
+        print(f"✅ 수집 완료: 새 글 {counts['done']}개, 변경 없음 {counts['not_modified']}개, "
+              f"건너뜀 {counts['skipped']}개, 실패 {counts['failed']}개")
+
+    from data_preparer import stream_documents
+
+    entries, chunks, dates = set(), 0, []
+    for doc in stream_documents(args.data):
+        chunks += 1
+        entries.add((doc.metadata["date"], doc.metadata["title"]))
+        if doc.metadata["date"]:
+            dates.append(doc.metadata["date"])
+    period = f"{min(dates)} ~ {max(dates)}" if dates else "날짜 없음"
+    print(f"✅ {args.data}: 일기 {len(entries)}편, 청크 {chunks}개, 기간 {period}")
+
+
+def _run_analysis(args, journal, retry_failed_only: bool = False):
+    from analysis_chains import get_batch_emotion_analysis_chain, get_emotion_analysis_chain
+    from concurrent_analysis import DEFAULT_BATCH_TOKENS, analyze_chunks
+    from data_preparer import stream_documents
+    from emotion_taxonomy import EmotionTaxonomy
+    from embedding_backends import get_embeddings
+    from report_cache import ReportCache
+    from report_store import JsonlReportWriter, export_npz
+
+    report_cache = ReportCache()
+    batch_tokens = DEFAULT_BATCH_TOKENS if args.batch_tokens is None else args.batch_tokens
+    # 이어하기/재시도에서도 실행 기록의 done 청크가 함께 전달되므로, 결과 파일은 처음부터 다시 씁니다.
+    report_writer = JsonlReportWriter(args.reports)
+    reports = analyze_chunks(
+        stream_documents(journal.data_path), get_emotion_analysis_chain(), cache=report_cache,
+        batch_chain=get_batch_emotion_analysis_chain() if batch_tokens > 0 else None,
+        batch_token_budget=batch_tokens, journal=journal, retry_failed_only=retry_failed_only,
+        on_report=report_writer.write, taxonomy=EmotionTaxonomy(embeddings=get_embeddings()),
+    )
+    report_writer.close()
+    report_cache.close()
+    journal.finish()
+    export_npz(reports, _npz_path(args.reports))
+
+    counts = journal.counts()
+    print(f"✅ 실행 {journal.run_id}: 완료 {counts['done']}개, 실패 {counts['failed']}개, "
+          f"미완료 {counts['pending']}개 (새 LLM 분석 {report_cache.misses}건) → {args.reports}, {_npz_path(args.reports)}")
+    for idx, error, attempts in journal.failures():
+        print(f"  [-] 청크 {idx + 1} (시도 {attempts}회): {error}")
+    if counts["failed"]:
+        print("   실패한 청크만 다시 분석하려면: python cli.py retry-failed")
+    journal.close()
+
+
+def _npz_path(reports_path: str) -> str:
+    """결과 파일 옆에 저장하는 통계용 열 형식 파일 경로 (emotion-reports.jsonl → emotion-reports.npz)."""
+    return os.path.splitext(reports_path)[0] + ".npz"
+
+
+def cmd_analyze(args):
+    from run_journal import RunJournal
+
+    _run_analysis(args, RunJournal(data_path=args.data))
+
+
+def _latest_journal():
+    from run_journal import RunJournal
+
+    run_id = RunJournal.latest_run_id()
+    if run_id is None:
+        raise SystemExit("❌ 실행 기록이 없습니다. 먼저 `python cli.py analyze`를 실행하세요.")
+    return RunJournal(run_id)
+
+
+def cmd_resume(args):
+    journal = _latest_journal()
+    print(f"↻ 실행 {journal.run_id} 이어하기 ({journal.data_path}): 완료된 청크는 건너뜁니다.")
+    _run_analysis(args, journal)
+
+
+def cmd_retry_failed(args):
+    journal = _latest_journal()
+    print(f"↻ 실행 {journal.run_id}에서 실패한 청크 {journal.counts()['failed']}개를 다시 분석합니다.")
+    _run_analysis(args, journal, retry_failed_only=True)
+
+
+def cmd_report(args):
+    from analysis_chains import get_final_report_chain, get_period_summary_chain
+    from data_analysis import load_reports
+    from report_cache import SummaryCache
+    from report_pipeline import build_final_report
+
+    summary_cache = SummaryCache()
+    content = build_final_report(
+        load_reports(args.reports), get_final_report_chain(), get_period_summary_chain(), cache=summary_cache
+    )
+    summary_cache.close()
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(content)
+    print(f"✅ 종합 보고서 저장 완료: {args.output}")
+
+
+def cmd_index(args):
+    from rag_service import build_indexes
+
+    build_indexes(args.data, args.mode)
+
+
+def cmd_ask(args):
+    import asyncio
+    from rag_service import build_rag_chain, load_analysis_reports, run
+
+    rag_chain = build_rag_chain(load_analysis_reports(args.reports), args.data, args.mode)
+    if not args.question:
+        asyncio.run(run(rag_chain, port=args.port, interactive=args.port is None))
+        return
+
+    async def answer():
+        async for text in rag_chain.astream(args.question):
+            print(text, end="", flush=True)
+        print()
+
+    try:
+        asyncio.run(answer())
+    finally:
+        rag_chain.cache.close()
+
+
+def cmd_stats(args):
+    from data_analysis import load_frame_from_path, summarize_for_report
+
+    # 열 형식 .npz가 있으면 JSON 파싱 없이 바로 읽습니다.
+    npz_path = _npz_path(args.reports)
+    path = npz_path if os.path.exists(npz_path) else args.reports
+    if not os.path.exists(path):
+        raise SystemExit(f"❌ {args.reports}가 없습니다. 먼저 `python cli.py analyze`를 실행하세요.")
+    print(json.dumps(summarize_for_report(load_frame_from_path(path)), ensure_ascii=False, indent=2))
+
+
+def cmd_check_startup(args):
+    """새 파이썬 프로세스에서 `--help` 실행 시간과 `stats` 경로가 불러오는 모듈을 확인합니다."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    probe = (
+        "import json, sys, time; t = time.perf_counter(); "
+        "import cli, data_analysis; "
+        "print(json.dumps({'seconds': time.perf_counter() - t, "
+        f"'heavy': sorted({{m.split('.')[0] for m in sys.modules}} & set({HEAVY_MODULES!r}))}}))"
+    )
+    result = json.loads(subprocess.run([sys.executable, "-c", probe], cwd=here, check=True,
+                                       capture_output=True, text=True).stdout)
+
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(here, "cli.py"), "--help"], check=True,
+                   capture_output=True, env={**os.environ, "GEMINI_API_KEY": ""})
+    help_seconds = time.perf_counter() - started
+
+    ok = not result["heavy"] and help_seconds < STARTUP_BUDGET_SECONDS
+    print(f"cli + data_analysis 임포트: {result['seconds'] * 1000:.0f}ms, 무거운 모듈: {result['heavy'] or '없음'}")
+    print(f"`cli.py --help` (API 키 없이, 인터프리터 시작 포함): {help_seconds * 1000:.0f}ms "
+          f"(기준 {STARTUP_BUDGET_SECONDS * 1000:.0f}ms)")
+    print("✅ 통과" if ok else "❌ 시작 시간 기준 초과")
+    if not ok:
+        raise SystemExit(1)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="마음 일기 분석 명령줄 도구")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--data", default=None,
+                        help="일기 파일 경로 (.txt 또는 크롤러의 .jsonl, 기본: data_preparer.DEFAULT_DATA_PATH)")
+    common.add_argument("--reports", default=DEFAULT_REPORTS_PATH, help="감정 분석 결과 경로 (.jsonl, 예전 .json도 읽기 가능)")
+    common.add_argument("--no-trace", action="store_true", help="실행 추적/요약 표 끄기")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subcommands.add_parser("ingest", parents=[common], help="일기 파일 확인 (선택: 블로그 수집)")
+    ingest.add_argument("--crawl", metavar="BLOG_ID", help="블로그에서 새 글을 --data(JSONL)에 추가합니다.")
+    ingest.add_argument("--crawl-state", default=DEFAULT_CRAWL_STATE, help="크롤러 상태 파일")
+    ingest.set_defaults(handler=cmd_ingest)
+
+    for name, handler, help_text in (("analyze", cmd_analyze, "청크별 감정 분석 (새 실행)"),
+                                     ("resume", cmd_resume, "중단된 마지막 분석 이어하기"),
+                                     ("retry-failed", cmd_retry_failed, "마지막 분석에서 실패한 청크만 다시 분석")):
+        command = subcommands.add_parser(name, parents=[common], help=help_text)
+        command.add_argument("--batch-tokens", type=int, default=None,
+                             help="한 요청에 묶을 청크 토큰 예산 (0이면 청크마다 따로 요청, 기본: ANALYSIS_BATCH_TOKENS)")
+        command.set_defaults(handler=handler)
+
+    report = subcommands.add_parser("report", parents=[common], help="종합 심리 보고서 생성")
+    report.add_argument("--output", default=DEFAULT_REPORT_OUTPUT)
+    report.set_defaults(handler=cmd_report)
+
+    for name, handler, help_text in (("index", cmd_index, "키워드/벡터 색인 동기화"),
+                                     ("ask", cmd_ask, "일기에 대해 질문하기")):
+        command = subcommands.add_parser(name, parents=[common], help=help_text)
+        command.add_argument("--mode", choices=["hybrid", "keyword", "vector"], default=None,
+                             help="검색 방식 (기본: RETRIEVAL_MODE 환경 변수 또는 hybrid)")
+        command.set_defaults(handler=handler)
+        if name == "ask":
+            command.add_argument("question", nargs="?", help="질문 (생략하면 REPL)")
+            command.add_argument("--port", type=int, default=None, help="HTTP 서버로 실행")
+
+    subcommands.add_parser("stats", parents=[common], help="감정 통계 (LLM 없음)").set_defaults(handler=cmd_stats)
+    subcommands.add_parser("check-startup", help="시작 시간 점검").set_defaults(handler=cmd_check_startup)
+    # 옵션은 main()에서 그대로 benchmark.py에 넘깁니다. (`python cli.py bench --help`)
+    subcommands.add_parser("bench", add_help=False, help="가짜 모델로 단계별 성능 측정 (API 키 불필요)")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["bench"]:
+        from benchmark import main as run_benchmark
+
+        return run_benchmark(argv[1:])
+    args = build_parser().parse_args(argv)
+    if args.command in DATA_COMMANDS and args.data is None:
+        from data_preparer import DEFAULT_DATA_PATH
+
+        args.data = DEFAULT_DATA_PATH
+    # 서버/REPL로 계속 도는 ask는 추적하지 않습니다.
+    if args.command in TRACED_COMMANDS and not args.no_trace and not (args.command == "ask" and not args.question):
+        from tracing import span, trace_run
+
+        with trace_run(f"cli {args.command}"), span(args.command):
+            args.handler(args)
+        return
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+# 파일 이름: concurrent_analysis.py (언더바 사용 필수)
+
+import asyncio
+import os
+import random
+import time
+
+from data_preparer import EmotionAnalysisReport, estimate_tokens # 언더바 파일명으로 임포트
+from report_cache import chain_fingerprint, make_cache_key
+from run_journal import DONE, FAILED
+from tracing import add_event
+
+# --- 요청 한도 설정 (.env 에서 Provider 쿼터에 맞게 조정) ---
+DEFAULT_RPM = float(os.getenv("GEMINI_RPM", "60"))            # 분당 요청 수
+DEFAULT_TPM = float(os.getenv("GEMINI_TPM", "1000000"))       # 분당 토큰 수
+DEFAULT_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "8"))
+DEFAULT_MAX_RETRIES = int(os.getenv("ANALYSIS_MAX_RETRIES", "5"))
+EXPECTED_OUTPUT_TOKENS = 600  # 분석 결과 JSON 한 건의 대략적인 토큰 수
+# 묶음 분석: 한 요청에 넣을 청크 본문 토큰 예산과 최대 청크 수 (ANALYSIS_BATCH_TOKENS=0이면 청크마다 따로 요청)
+DEFAULT_BATCH_TOKENS = int(os.getenv("ANALYSIS_BATCH_TOKENS", "4000"))
+DEFAULT_BATCH_MAX_CHUNKS = int(os.getenv("ANALYSIS_BATCH_MAX_CHUNKS", "12"))
+# -------------------------------------------------------------
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# 상태 코드 속성이 없는 Provider 예외 (google.api_core.exceptions 등) → 상태 코드. 클래스 이름으로 찾으므로 임포트가 필요 없습니다.
+PROVIDER_ERROR_STATUS = {
+    "ResourceExhausted": 429, "TooManyRequests": 429,
+    "InternalServerError": 500, "BadGateway": 502, "ServiceUnavailable": 503, "GatewayTimeout": 504,
+}
+
+
+def _structured_status(error: Exception):
+    for attr in ("status_code", "code", "http_status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return int(value)
+
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return int(value)
+
+    for cls in type(error).__mro__:
+        if cls.__name__ in PROVIDER_ERROR_STATUS:
+            return PROVIDER_ERROR_STATUS[cls.__name__]
+    return None
+
+
+def get_status_code(error: Exception):
+    """예외 객체에서 HTTP 상태 코드를 찾아 반환합니다. 찾지 못하면 None.
+
+    상태 코드 속성(status_code/code/response.status_code)과 Provider 예외 종류만 봅니다.
+    파싱 오류 메시지에는 LLM 응답과 일기 본문이 들어 있으므로('550 원' 등) 메시지 문자열은 보지 않습니다.
+    LangChain이 Provider 예외를 감싸 다시 올린 경우를 위해 원인(__cause__/__context__) 예외도 차례로 확인합니다.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        status = _structured_status(error)
+        if status is not None:
+            return status
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """429(쿼터 초과) 및 5xx(서버 오류)처럼 다시 시도할 가치가 있는 오류인지 판단합니다."""
+    return get_status_code(error) in RETRYABLE_STATUS
+
+
+class TokenBucket:
+    """분당 한도를 초 단위로 채워 넣는 비동기 토큰 버킷."""
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.capacity = float(burst or per_minute)
+        self.base_rate = per_minute / 60.0
+        self.rate = self.base_rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def set_scale(self, scale: float):
+        """적응형 백오프가 현재 채움 속도를 조절할 때 사용합니다."""
+        self.rate = self.base_rate * scale
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """토큰이 충분히 쌓일 때까지 기다린 뒤 amount만큼 소모합니다. (도착 순서대로 처리)"""
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class AdaptiveRateLimiter:
+    """RPM/TPM 토큰 버킷과 429/5xx 적응형 백오프를 묶은 요청 한도 관리자.
+
+    쿼터 초과 응답을 받으면 채움 속도를 절반으로 줄이고 잠시 모든 요청을 멈춘 뒤,
+    성공이 이어질 때마다 조금씩 원래 속도로 회복합니다.
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM,
+                 base_delay: float = 1.0, max_delay: float = 60.0,
+                 min_scale: float = 0.1, recovery_step: float = 0.05):
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_scale = min_scale
+        self.recovery_step = recovery_step
+        self.scale = 1.0
+        self.cooldown_until = 0.0
+
+    def _apply_scale(self):
+        self.request_bucket.set_scale(self.scale)
+        self.token_bucket.set_scale(self.scale)
+
+    async def acquire(self, tokens: int):
+        """쿨다운이 끝나고 요청/토큰 버킷 모두에 여유가 생길 때까지 기다립니다."""
+        await self._wait_cooldown()
+        await self.request_bucket.acquire(1)
+        await self.token_bucket.acquire(tokens)
+        # 버킷을 기다리는 사이 다른 요청이 429를 받았을 수 있으므로 한 번 더 확인합니다.
+        await self._wait_cooldown()
+
+    async def _wait_cooldown(self):
+        delay = self.cooldown_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self):
+        if self.scale < 1.0:
+            self.scale = min(1.0, self.scale + self.recovery_step)
+            self._apply_scale()
+
+    def on_retryable_error(self, attempt: int, error: Exception) -> float:
+        """속도를 낮추고 이번 재시도 전에 기다릴 시간(초)을 반환합니다."""
+        if get_status_code(error) == 429:
+            self.scale = max(self.min_scale, self.scale * 0.5)
+            self._apply_scale()
+
+        retry_after = getattr(error, "retry_after", None)
+        if isinstance(retry_after, (int, float)) and retry_after > 0:
+            delay = float(retry_after)
+        else:
+            delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+            delay *= random.uniform(0.5, 1.0)  # 지터: 동시에 재시도하는 요청 분산
+
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+        return delay
+
+
+async def ainvoke_with_retry(chain, inputs, rate_limiter: AdaptiveRateLimiter, tokens: int,
+                             max_retries: int = DEFAULT_MAX_RETRIES, label: str = "요청"):
+    """요청 한도를 지키며 chain.ainvoke를 실행하고, 429/5xx이면 백오프 후 다시 시도합니다.
+
+    재시도할 수 없는 오류이거나 max_retries를 모두 쓰면 마지막 예외를 그대로 올립니다.
+    """
+    for attempt in range(max_retries + 1):
+        await rate_limiter.acquire(tokens)
+        try:
+            result = await chain.ainvoke(inputs)
+        except Exception as e:
+            if attempt < max_retries and is_retryable_error(e):
+                delay = rate_limiter.on_retryable_error(attempt, e)
+                add_event("retry", label=label, attempt=attempt + 1, delay=delay,
+                          error=f"{type(e).__name__}: {str(e)[:200]}")
+                print(f"  [~] {label} 요청 한도/서버 오류, {delay:.1f}초 후 재시도: {e}")
+                continue
+            raise
+        rate_limiter.on_success()
+        return result
+
+
+def pack_batches(items, token_budget: int = DEFAULT_BATCH_TOKENS, max_chunks: int = DEFAULT_BATCH_MAX_CHUNKS):
+    """(번호, 청크) 이터레이터를 청크 본문 토큰 합이 token_budget을 넘지 않는 묶음으로 나눠 돌려줍니다.
+
+    예산보다 긴 청크는 혼자 한 묶음이 됩니다.
+    """
+    batch, used = [], 0
+    for i, chunk in items:
+        tokens = estimate_tokens(chunk.page_content)
+        if batch and (used + tokens > token_budget or len(batch) >= max_chunks):
+            yield batch
+            batch, used = [], 0
+        batch.append((i, chunk))
+        used += tokens
+    if batch:
+        yield batch
+
+
+def batch_entry_id(i: int, chunk) -> int:
+    """묶음 안에서 결과를 짝지을 청크 번호. stream_documents()의 entry_id, 없으면 입력 순서."""
+    return chunk.metadata.get("entry_id", i + 1)
+
+
+def format_batch(batch) -> str:
+    return "\n\n".join(f"[청크 {batch_entry_id(i, chunk)}]\n{chunk.page_content}" for i, chunk in batch)
+
+
+async def analyze_chunks_async(chunks, emotion_chain,
+                               max_concurrency: int = DEFAULT_CONCURRENCY,
+                               rate_limiter: AdaptiveRateLimiter = None,
+                               max_retries: int = DEFAULT_MAX_RETRIES,
+                               cache=None, batch_chain=None,
+                               batch_token_budget: int = DEFAULT_BATCH_TOKENS,
+                               batch_max_chunks: int = DEFAULT_BATCH_MAX_CHUNKS,
+                               journal=None, retry_failed_only: bool = False, on_report=None,
+                               taxonomy=None):
+    """청크들을 동시에(최대 max_concurrency개) 분석하고, 입력 순서대로 결과를 반환합니다.
+
+    chunks는 리스트뿐 아니라 data_preparer.stream_documents()의 제너레이터도 받을 수 있으며,
+    작업자들이 필요할 때마다 하나씩 꺼내 가므로 파일을 다 읽기 전에 분석이 시작됩니다.
+    반환값은 기존 main.py와 같은 형태(`model_dump()` + `metadata`)의 딕셔너리 목록이며,
+    재시도 끝에 실패한 청크는 오류를 출력하고 결과에서 제외합니다.
+    cache(report_cache.ReportCache)를 넘기면 같은 내용의 청크는 LLM 호출 없이 캐시에서 가져옵니다.
+    batch_chain(analysis_chains.get_batch_emotion_analysis_chain())을 넘기면 짧은 청크들을
+    batch_token_budget 안에서 묶어 한 요청으로 분석합니다. 묶음 결과를 파싱하지 못하거나 빠진 청크가 있으면
+    묶음을 반으로 나눠 다시 분석하고, 한 개만 남으면 emotion_chain으로 분석합니다.
+    journal(run_journal.RunJournal)을 넘기면 청크마다 요청 전 pending, 끝나면 done(결과 포함)/failed(사유 포함)를
+    바로 기록하고, 이미 done인 청크는 기록된 결과를 그대로 씁니다. (중단된 실행 이어하기)
+    retry_failed_only=True이면 journal에서 failed인 청크만 다시 분석합니다.
+    on_report(report_store.JsonlReportWriter.write 등)를 넘기면 각 청크의 결과가 나오는 즉시 호출합니다.
+    taxonomy(emotion_taxonomy.EmotionTaxonomy)를 넘기면 결과의 감정 이름을 대표 감정 + 정수 ID(emotion_id)로 맞춥니다.
+    """
+    rate_limiter = rate_limiter or AdaptiveRateLimiter()
+
+    # 파서의 format_instructions는 한 번만 계산해서 모든 요청에 재사용합니다.
+    format_instructions = emotion_chain.steps[-1].get_format_instructions()
+    prompt_overhead = estimate_tokens(format_instructions) + EXPECTED_OUTPUT_TOKENS
+    fingerprint = chain_fingerprint(emotion_chain) if cache is not None else None
+    if batch_chain is not None and batch_token_budget > 0:
+        batch_instructions = batch_chain.steps[-1].get_format_instructions()
+        batch_overhead = estimate_tokens(batch_instructions)
+        # 묶음 모드의 결과(묶음에서 떨어져 나와 단독으로 분석한 청크 포함)는 두 체인 지문을 합친 키로 저장합니다.
+        if cache is not None:
+            fingerprint = fingerprint + chain_fingerprint(batch_chain)
+    else:
+        batch_chain = None
+
+    def to_report_data(analysis_result, chunk):
+        report_data = analysis_result.model_dump()
+        report_data['metadata'] = chunk.metadata
+        if taxonomy is not None:
+            taxonomy.canonicalize_report(report_data)
+        return report_data
+
+    def cached_report(i, chunk):
+        cached = cache.get(make_cache_key(chunk.page_content, fingerprint))
+        if cached is None:
+            return None
+        print(f"  [=] 청크 {i+1} 캐시 사용.")
+        return to_report_data(cached, chunk)
+
+    def record_done(i, chunk, analysis_result):
+        if cache is not None:
+            cache.put(make_cache_key(chunk.page_content, fingerprint), analysis_result)
+        report_data = to_report_data(analysis_result, chunk)
+        if journal is not None:
+            journal.mark_done(i, chunk, report_data)
+        print(f"  [+] 청크 {i+1} 분석 완료.")
+        return report_data
+
+    def record_failed(i, chunk, label, error):
+        print(f"  [-] {label} 분석 오류: {error}")
+        if journal is not None:
+            journal.mark_failed(i, chunk, f"{type(error).__name__}: {error}")
+        return None
+
+    async def analyze_one(i, chunk):
+        if journal is not None:
+            journal.mark_pending(i, chunk)
+        inputs = {"diary_chunk": chunk.page_content, "format_instructions": format_instructions}
+        tokens = prompt_overhead + estimate_tokens(chunk.page_content)
+
+        try:
+            analysis_result = await ainvoke_with_retry(
+                emotion_chain, inputs, rate_limiter, tokens, max_retries, label=f"청크 {i+1}"
+            )
+        except Exception as e:
+            return record_failed(i, chunk, f"청크 {i+1}", e)
+        return record_done(i, chunk, analysis_result)
+
+    async def analyze_batch(batch):
+        """묶음 하나를 한 요청으로 분석해 {번호: 보고서 딕셔너리}를 반환합니다."""
+        if len(batch) == 1:
+            i, chunk = batch[0]
+            return {i: await analyze_one(i, chunk)}
+
+        if journal is not None:
+            for i, chunk in batch:
+                journal.mark_pending(i, chunk)
+        label = f"청크 {batch[0][0]+1}~{batch[-1][0]+1} 묶음({len(batch)}개)"
+        inputs = {"diary_chunks": format_batch(batch), "format_instructions": batch_instructions}
+        tokens = (batch_overhead + sum(estimate_tokens(chunk.page_content) for _, chunk in batch)
+                  + EXPECTED_OUTPUT_TOKENS * len(batch))
+        reports = {}
+        try:
+            batch_result = await ainvoke_with_retry(batch_chain, inputs, rate_limiter, tokens, max_retries, label=label)
+            reports = {report.entry_id: report for report in batch_result.reports}
+        except Exception as e:
+            if is_retryable_error(e):
+                return {i: record_failed(i, chunk, label, e) for i, chunk in batch}
+            print(f"  [~] {label} 결과를 해석하지 못해 나눠서 다시 분석합니다: {e}")
+
+        done, missing = {}, []
+        for i, chunk in batch:
+            report = reports.get(batch_entry_id(i, chunk))
+            if report is None:
+                missing.append((i, chunk))
+                continue
+            analysis_result = EmotionAnalysisReport(summary=report.summary, emotion_tags=report.emotion_tags)
+            done[i] = record_done(i, chunk, analysis_result)
+
+        if missing:
+            # 전부 실패했으면 반으로 나누고, 일부만 빠졌으면 빠진 청크만 다시 묶어 분석합니다.
+            if len(missing) == len(batch):
+                middle = len(missing) // 2
+                parts = [missing[:middle], missing[middle:]]
+            else:
+                parts = [missing]
+            for part in await asyncio.gather(*(analyze_batch(part) for part in parts)):
+                done.update(part)
+        return done
+
+    results = {}
+
+    def deliver(i, report_data):
+        results[i] = report_data
+        if on_report is not None and report_data is not None:
+            on_report(report_data)
+
+    def todo(items):
+        """실행 기록/캐시에서 결과를 찾을 수 있는 청크는 건너뛰고, 분석이 필요한 청크만 돌려줍니다."""
+        for i, chunk in items:
+            status = journal.status(i, chunk) if journal is not None else None
+            if status == DONE:
+                report_data = journal.report(i)
+                if taxonomy is not None and report_data is not None:
+                    taxonomy.canonicalize_reports([report_data])
+                deliver(i, report_data)
+                continue
+            if retry_failed_only and status != FAILED:
+                continue
+            cached = cached_report(i, chunk) if cache is not None else None
+            if cached is None:
+                yield i, chunk
+                continue
+            if journal is not None:
+                journal.mark_done(i, chunk, cached)
+            deliver(i, cached)
+
+    pending = todo(enumerate(chunks))
+
+    async def worker():
+        # 여러 작업자가 같은 이터레이터를 공유합니다. (next 호출 사이에 await가 없으므로 안전)
+        if batch_chain is None:
+            for i, chunk in pending:
+                deliver(i, await analyze_one(i, chunk))
+            return
+        for batch in batches:
+            for i, report_data in (await analyze_batch(batch)).items():
+                deliver(i, report_data)
+
+    if batch_chain is not None:
+        batches = pack_batches(pending, batch_token_budget, batch_max_chunks)
+
+    await asyncio.gather(*(worker() for _ in range(max_concurrency)))
+    return [results[i] for i in sorted(results) if results[i] is not None]
+
+
+def analyze_chunks(chunks, emotion_chain, **kwargs):
+    """동기 코드(main.py 등)에서 호출하기 위한 analyze_chunks_async 래퍼."""
+    return asyncio.run(analyze_chunks_async(chunks, emotion_chain, **kwargs))
@@ -0,0 +1,140 @@
+# 파일 이름: context_assembler.py (언더바 사용 필수)
+# RAG 프롬프트의 '맥락 정보'를 토큰 예산 안에서 조립합니다.
+# 검색된 일기를 통째로 이어 붙이지 않고 (1) 거의 같은 구절은 하나만 남기고 (2) 예산을 넘으면 질문과 관련 깊은 문장만 고르며
+# (3) 일기마다 이미 계산해 둔 분석 요약(summary)과 감정 원인(reason)을 짧은 대용 정보로 씁니다.
+# 일기가 길어져도 프롬프트 크기가 예산을 넘지 않으므로 답변 지연 시간과 비용이 일정합니다.
+
+import math
+import os
+from typing import Dict, List
+
+from data_preparer import entry_header, estimate_tokens, parse_diary_record, split_by_tokens # 언더바 파일명으로 임포트
+from keyword_index import tokenize
+from parent_retriever import CHILD_MAX_TOKENS, join_pieces
+import tracing
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", "1200"))
+DUPLICATE_THRESHOLD = 0.8     # 구절의 문장이 이 비율 이상 앞 구절에 이미 있으면 같은 구절로 봅니다.
+DOCUMENT_SEPARATOR = "\n\n"
+
+
+def report_key(metadata: dict):
+    """분석 결과와 검색된 일기를 짝짓는 키. 여러 청크로 나뉜 일기는 entry_no로 한데 묶습니다.
+
+    (entry_no가 없는 예전 결과/색인은 청크 번호 entry_id로 짝짓습니다.)
+    """
+    if metadata.get("entry_no") is not None:
+        return "entry", metadata["entry_no"]
+    if metadata.get("entry_id") is not None:
+        return "chunk", metadata["entry_id"]
+    return None
+
+
+def format_report_surrogate(reports: List[dict]) -> str:
+    """일기 한 편의 분석 결과(청크별, part 순서)를 한 줄 요약으로 (일기 본문 대신 넣는 압축 정보)."""
+    summaries = " ".join(report.get("summary", "") for report in reports if report.get("summary"))
+    tags = "; ".join(f"{tag['emotion']}({tag['intensity']:.1f}) - {tag['reason']}"
+                     for report in reports for tag in report.get("emotion_tags", []))
+    line = f"[분석 요약] {summaries}"
+    return f"{line} / 감정: {tags}" if tags else line
+
+
+def _normalize_sentence(sentence: str) -> str:
+    return " ".join(sentence.split())
+
+
+class ContextAssembler:
+    """검색된 Document 목록과 질문으로 토큰 예산 안의 맥락 문자열을 만듭니다.
+
+    전체가 예산 안이면 예전 format_docs처럼 그대로 잇고, 넘으면 일기마다 최소 정보
+    (분석 요약이 있으면 요약, 없으면 가장 관련 깊은 문장 하나)를 먼저 넣은 뒤
+    남은 예산을 질문과의 n-gram 겹침 점수가 높은 문장 순으로 채웁니다. 문장은 원래 순서대로 이어 붙입니다.
+    """
+
+    def __init__(self, all_analysis_reports=(), max_tokens: int = CONTEXT_TOKEN_BUDGET,
+                 duplicate_threshold: float = DUPLICATE_THRESHOLD):
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.reports: Dict[tuple, List[dict]] = {}   # report_key → 일기의 청크별 분석 결과 (part 순서)
+        for report in all_analysis_reports:
+            key = report_key(report.get("metadata", {}))
+            if key is not None:
+                self.reports.setdefault(key, []).append(report)
+        for reports in self.reports.values():
+            reports.sort(key=lambda report: report.get("metadata", {}).get("part", 0))
+
+    def __call__(self, docs, question: str) -> str:
+        return self.assemble(docs, question)
+
+    def deduplicate(self, docs) -> List:
+        """앞 순위 구절과 거의 같은 구절(겹치는 청크, 같은 일기의 다른 구간 등)을 뺍니다.
+
+        구절의 문장 중 duplicate_threshold 이상이 이미 앞 구절에 나온 문장이면 중복으로 봅니다.
+        """
+        kept, seen = [], set()
+        for doc in docs:
+            sentences = {_normalize_sentence(sentence) for sentence in
+                         split_by_tokens(parse_diary_record(doc.page_content)["body"], CHILD_MAX_TOKENS)}
+            if sentences and len(sentences & seen) / len(sentences) >= self.duplicate_threshold:
+                continue
+            kept.append(doc)
+            seen |= sentences
+        return kept
+
+    def assemble(self, docs, question: str) -> str:
+        docs = self.deduplicate(docs)
+        separators = estimate_tokens(DOCUMENT_SEPARATOR) * max(len(docs) - 1, 0)
+        if sum(estimate_tokens(doc.page_content) for doc in docs) + separators <= self.max_tokens:
+            return DOCUMENT_SEPARATOR.join(doc.page_content for doc in docs)
+
+        query_terms = set(tokenize(question))
+        budget = self.max_tokens
+        plans, candidates, seen = [], [], set()
+        for rank, doc in enumerate(docs):
+            fields = parse_diary_record(doc.page_content)
+            header = entry_header(fields)
+            sentences = split_by_tokens(fields["body"], CHILD_MAX_TOKENS)
+            reports = self.reports.get(report_key(doc.metadata))
+            surrogate = format_report_surrogate(reports) if reports else ""
+
+            scores = []
+            for sentence in sentences:
+                terms = set(tokenize(sentence))
+                # 질문과 겹치는 n-gram 수를 문장 길이로 나눠 긴 문장이 유리하지 않게 하고, 앞 순위 일기를 약간 우대합니다.
+                scores.append(len(query_terms & terms) / math.sqrt(len(terms) + 1) + 0.01 / (rank + 1))
+            selected = set()
+            if surrogate:
+                minimum = estimate_tokens(header) + estimate_tokens(surrogate)
+            elif sentences:
+                best = max(range(len(sentences)), key=scores.__getitem__)
+                selected.add(best)
+                minimum = estimate_tokens(header) + estimate_tokens(sentences[best])
+            else:
+                continue
+            if minimum + separators > budget:
+                continue   # 이 일기는 최소 정보도 들어갈 자리가 없습니다.
+            budget -= minimum
+            seen.update(_normalize_sentence(sentences[i]) for i in selected)
+            plans.append((header, sentences, selected, surrogate))
+            candidates.extend((score, rank, i, len(plans) - 1) for i, score in enumerate(scores) if i not in selected)
+
+        budget -= separators
+        for score, _, i, plan_index in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+            sentence = plans[plan_index][1][i]
+            tokens = estimate_tokens(sentence) + 1
+            if tokens > budget or _normalize_sentence(sentence) in seen:
+                continue
+            plans[plan_index][2].add(i)
+            seen.add(_normalize_sentence(sentence))
+            budget -= tokens
+
+        blocks = []
+        for header, sentences, selected, surrogate in plans:
+            lines = [join_pieces(sentences, selected)] if selected else []
+            if surrogate:
+                lines.append(surrogate)
+            blocks.append(header + "\n".join(lines))
+        context = DOCUMENT_SEPARATOR.join(blocks)
+        tracing.add_event("context_trimmed", documents=len(plans), budget=self.max_tokens,
+                          tokens=estimate_tokens(context), surrogates=sum(1 for plan in plans if plan[3]))
+        return context
@@ -0,0 +1,228 @@
+# 파일 이름: data_analysis.py (언더바 사용 필수)
+# 감정 분석 결과(JSON)를 NumPy 열(column) 배열로 불러와 통계를 계산합니다. LLM 호출 없이 동작합니다.
+
+import json
+import os
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from emotion_taxonomy import EmotionTaxonomy
+from report_store import decode_reasons, decode_summaries, load_npz, read_jsonl_reports, tag_columns
+
+DAILY_SERIES_LIMIT = 62   # 날짜 수가 이보다 많으면 일별 대신 주별 시계열을 보고서에 넣습니다.
+ROLLING_WINDOW = 7
+
+
+@dataclass
+class EmotionFrame:
+    """감정 태그 하나당 한 행인 열 기반(columnar) 데이터."""
+    entry_index: np.ndarray    # int32, 태그가 속한 보고서 번호 (0부터)
+    day: np.ndarray            # datetime64[D], 보고서 날짜 (모르면 NaT)
+    emotion_code: np.ndarray   # int32, labels의 인덱스
+    intensity: np.ndarray      # float32
+    labels: List[str]          # 감정 코드 → 감정 이름
+    reasons: List[str]         # 태그별 원인 문장
+    entry_dates: np.ndarray    # datetime64[D], 보고서별 날짜
+    entry_summaries: List[str]
+
+    @property
+    def n_entries(self) -> int:
+        return len(self.entry_summaries)
+
+
+def load_reports(path: str = "./emotion-reports.jsonl"):
+    """분석 결과 파일(JSONL 또는 예전 형식의 JSON 배열)을 읽어 보고서 딕셔너리 목록을 반환합니다.
+    대표 감정 ID가 없는 예전 결과는 읽으면서 emotion_taxonomy로 감정 이름을 맞춥니다."""
+    if path.endswith(".jsonl"):
+        reports = read_jsonl_reports(path)
+    else:
+        with open(path, encoding="utf-8") as f:
+            reports = json.load(f)
+    return EmotionTaxonomy().canonicalize_reports(reports)
+
+
+def load_frame(all_analysis_reports) -> EmotionFrame:
+    """보고서 딕셔너리 목록을 EmotionFrame(열 배열)으로 변환합니다."""
+    entry_dates = np.asarray([report.get("metadata", {}).get("date") or "NaT" for report in all_analysis_reports],
+                             dtype="datetime64[D]")
+    entry_index, emotion_code, intensity, reasons, labels = tag_columns(all_analysis_reports)
+    return EmotionFrame(
+        entry_index=entry_index,
+        day=entry_dates[entry_index] if len(entry_index) else np.asarray([], dtype="datetime64[D]"),
+        emotion_code=emotion_code,
+        intensity=intensity,
+        labels=labels,
+        reasons=reasons,
+        entry_dates=entry_dates,
+        entry_summaries=[report.get("summary", "") for report in all_analysis_reports],
+    )
+
+
+def load_frame_npz(path: str = "./emotion-reports.npz") -> EmotionFrame:
+    """report_store.export_npz()로 저장한 열 형식 파일을 JSON 파싱 없이 EmotionFrame으로 읽습니다."""
+    arrays = load_npz(path)
+    entry_index = arrays["tag_entry"]
+    entry_dates = arrays["entry_date"]
+    return EmotionFrame(
+        entry_index=entry_index,
+        day=entry_dates[entry_index],
+        emotion_code=arrays["tag_emotion"],
+        intensity=arrays["tag_intensity"],
+        labels=arrays["labels"].tolist(),
+        reasons=decode_reasons(arrays),
+        entry_dates=entry_dates,
+        entry_summaries=decode_summaries(arrays),
+    )
+
+
+def load_frame_from_path(path: str) -> EmotionFrame:
+    """.npz면 열 형식 그대로, 아니면 JSON/JSONL 보고서를 읽어 EmotionFrame을 만듭니다."""
+    if path.endswith(".npz"):
+        return load_frame_npz(path)
+    return load_frame(load_reports(path))
+
+
+# --- 1. 빈도 / 강도 집계 ---
+def calculate_emotion_frequency(frame: EmotionFrame) -> np.ndarray:
+    """감정 코드별 등장 횟수 (길이 = 감정 종류 수)."""
+    return np.bincount(frame.emotion_code, minlength=len(frame.labels))
+
+
+def emotion_intensity_stats(frame: EmotionFrame):
+    """감정 코드별 (평균 강도, 최대 강도)."""
+    n_labels = len(frame.labels)
+    counts = np.bincount(frame.emotion_code, minlength=n_labels)
+    sums = np.bincount(frame.emotion_code, weights=frame.intensity, minlength=n_labels)
+    maxima = np.zeros(n_labels, dtype=np.float32)
+    np.maximum.at(maxima, frame.emotion_code, frame.intensity)
+    return sums / np.maximum(counts, 1), maxima
+
+
+def entry_intensity_stats(frame: EmotionFrame):
+    """보고서(청크)별 (태그 수, 평균 강도, 최대 강도)."""
+    counts = np.bincount(frame.entry_index, minlength=frame.n_entries)
+    sums = np.bincount(frame.entry_index, weights=frame.intensity, minlength=frame.n_entries)
+    maxima = np.zeros(frame.n_entries, dtype=np.float32)
+    np.maximum.at(maxima, frame.entry_index, frame.intensity)
+    return counts, sums / np.maximum(counts, 1), maxima
+
+
+def daily_intensity(frame: EmotionFrame):
+    """날짜별 (날짜 배열, 태그 수, 평균 강도, 최대 강도). 날짜를 모르는 태그는 제외합니다."""
+    known = ~np.isnat(frame.day)
+    days, day_index = np.unique(frame.day[known], return_inverse=True)
+    values = frame.intensity[known]
+    counts = np.bincount(day_index, minlength=len(days))
+    sums = np.bincount(day_index, weights=values, minlength=len(days))
+    maxima = np.zeros(len(days), dtype=np.float32)
+    np.maximum.at(maxima, day_index, values)
+    return days, counts, sums / np.maximum(counts, 1), maxima
+
+
+def co_occurrence_matrix(frame: EmotionFrame) -> np.ndarray:
+    """같은 보고서에 함께 등장한 감정 쌍의 횟수 행렬 (감정 수 x 감정 수)."""
+    presence = np.zeros((frame.n_entries, len(frame.labels)), dtype=np.float32)
+    presence[frame.entry_index, frame.emotion_code] = 1.0
+    return (presence.T @ presence).astype(np.int32)
+
+
+# --- 2. 시계열 ---
+def rolling_mean(values, window: int = ROLLING_WINDOW) -> np.ndarray:
+    """누적합을 이용한 이동 평균. (길이 = len(values) - window + 1)"""
+    values = np.asarray(values, dtype=np.float64)
+    window = max(1, min(window, len(values)))
+    if not len(values):
+        return values
+    cumsum = np.cumsum(np.insert(values, 0, 0.0))
+    return (cumsum[window:] - cumsum[:-window]) / window
+
+
+def rolling_volatility(values, window: int = ROLLING_WINDOW) -> np.ndarray:
+    """이동 표준편차 (감정 기복의 크기)."""
+    values = np.asarray(values, dtype=np.float64)
+    mean = rolling_mean(values, window)
+    mean_sq = rolling_mean(values ** 2, window)
+    return np.sqrt(np.clip(mean_sq - mean ** 2, 0.0, None))
+
+
+# --- 3. 보고서 체인에 넘길 요약 ---
+def summarize_for_report(frame: EmotionFrame, top_k: int = 10, exemplars: int = 2, top_pairs: int = 8) -> dict:
+    """종합 보고서 프롬프트에 넣을 작은 통계 요약(딕셔너리)을 만듭니다.
+
+    원본 JSON 대신 이 요약과 감정별 대표 원인 문장 몇 개만 넘기면 프롬프트가 훨씬 짧아지고,
+    수치는 LLM이 아닌 코드로 계산되므로 정확하고 재현 가능합니다.
+    """
+    if not len(frame.emotion_code):
+        return {"entries": frame.n_entries, "tags": 0}
+
+    frequency = calculate_emotion_frequency(frame)
+    mean_intensity, max_intensity = emotion_intensity_stats(frame)
+    top_codes = np.argsort(-frequency, kind="stable")[:top_k]
+
+    # 감정별로 강도가 높은 순서대로 정렬한 태그 인덱스
+    order = np.lexsort((-frame.intensity, frame.emotion_code))
+    starts = np.searchsorted(frame.emotion_code[order], np.arange(len(frame.labels)))
+
+    top_emotions = []
+    for code in top_codes:
+        picked = order[starts[code]:starts[code] + min(exemplars, frequency[code])]
+        top_emotions.append({
+            "emotion": frame.labels[code],
+            "count": int(frequency[code]),
+            "mean_intensity": round(float(mean_intensity[code]), 2),
+            "max_intensity": round(float(max_intensity[code]), 2),
+            "examples": [frame.reasons[i] for i in picked],
+        })
+
+    co_matrix = co_occurrence_matrix(frame)
+    upper_i, upper_j = np.triu_indices(len(frame.labels), k=1)
+    pair_counts = co_matrix[upper_i, upper_j]
+    best_pairs = np.argsort(-pair_counts, kind="stable")[:top_pairs]
+
+    _, entry_means, entry_maxima = entry_intensity_stats(frame)
+    peak_entries = np.argsort(-entry_maxima, kind="stable")[:3]
+
+    summary = {
+        "entries": frame.n_entries,
+        "tags": int(len(frame.emotion_code)),
+        "distinct_emotions": len(frame.labels),
+        "mean_intensity": round(float(frame.intensity.mean()), 3),
+        "top_emotions": top_emotions,
+        "co_occurring_pairs": [
+            [frame.labels[upper_i[p]], frame.labels[upper_j[p]], int(pair_counts[p])]
+            for p in best_pairs if pair_counts[p] > 1
+        ],
+        "peak_entries": [
+            {"date": str(frame.entry_dates[i]) if not np.isnat(frame.entry_dates[i]) else "",
+             "summary": frame.entry_summaries[i],
+             "max_intensity": round(float(entry_maxima[i]), 2)}
+            for i in peak_entries
+        ],
+    }
+
+    days, day_counts, day_means, _ = daily_intensity(frame)
+    if len(days):
+        summary["period"] = [str(days[0]), str(days[-1])]
+        if len(days) > DAILY_SERIES_LIMIT:
+            # 기간이 길면 주 단위로 묶어서 넘깁니다.
+            week_index = (days - days[0]).astype(np.int64) // 7
+            week_sums = np.bincount(week_index, weights=day_means * day_counts)
+            week_counts = np.bincount(week_index, weights=day_counts)
+            series = week_sums / np.maximum(week_counts, 1)
+            summary["weekly_mean_intensity"] = [round(float(v), 2) for v in series]
+        else:
+            series = day_means
+            summary["daily_mean_intensity"] = {str(d): round(float(v), 2) for d, v in zip(days, day_means)}
+        volatility = rolling_volatility(series)
+        summary["volatility"] = {
+            "latest": round(float(volatility[-1]), 3),
+            "mean": round(float(volatility.mean()), 3),
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    frame = load_frame_npz() if os.path.exists("./emotion-reports.npz") else load_frame(load_reports())
+    print(json.dumps(summarize_for_report(frame), ensure_ascii=False, indent=2))
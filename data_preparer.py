@@ -1,11 +1,13 @@
 # 파일 이름: data_preparer.py (언더바 사용 필수)
 
+import json
 import os
+import re
+from datetime import date
 from typing import List
 from pydantic import BaseModel, Field
 
-from langchain_community.document_loaders import TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 
 # --- Pydantic 스키마 정의 ---
 class EmotionTag(BaseModel):
@@ -16,30 +18,240 @@ class EmotionTag(BaseModel):
 class EmotionAnalysisReport(BaseModel):
     summary: str = Field(description="해당 일기 청크의 핵심 내용 요약 (30자 이내).")
     emotion_tags: List[EmotionTag] = Field(description="일기 청크에서 발견된 모든 감정 태그 목록.")
+
+# 여러 청크를 한 번에 분석할 때 쓰는 스키마 (청크 번호로 결과를 짝지음)
+class BatchedEmotionReport(EmotionAnalysisReport):
+    entry_id: int = Field(description="분석한 청크의 번호 (입력의 '[청크 N]'에서 N).")
+
+class EmotionAnalysisBatch(BaseModel):
+    reports: List[BatchedEmotionReport] = Field(description="입력된 모든 청크에 대한 분석 결과 (청크마다 정확히 하나).")
 # -------------------------------------------------------------
 
 
-def prepare_data(file_path: str = "./data_raw/my-diaries-7days.txt"):
+def extract_entry_date(text: str) -> str:
+    """청크 본문에서 크롤러가 기록한 '날짜:' 값을 찾아 반환합니다. 없으면 빈 문자열."""
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("날짜:"):
+            return line[len("날짜:"):].strip()
+    return ""
+
+
+_DATE_PATTERN = re.compile(r"(\d{4})\s*[.\-/년]\s*(\d{1,2})\s*[.\-/월]\s*(\d{1,2})")
+
+
+def parse_entry_date(value: str):
+    """'2025. 11. 3. 22:10', '2025-11-03', '2025년 11월 3일' 같은 날짜 문자열을 date로 변환합니다.
+
+    '3시간 전'처럼 해석할 수 없는 값이면 None을 반환합니다.
     """
-    일기 데이터를 로드하고 LangChain Document 객체 목록으로 분할합니다.
+    match = _DATE_PATTERN.search(value or "")
+    if not match:
+        return None
+    try:
+        return date(*(int(part) for part in match.groups()))
+    except ValueError:
+        return None
+
+
+def date_to_num(value: date) -> int:
+    """date를 벡터 스토어에서 범위 비교($gte/$lte)할 수 있는 정수(YYYYMMDD)로 바꿉니다."""
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+DEFAULT_DATA_PATH = "./data_raw/my-diaries-7days.txt"
+RECORD_SEPARATOR = "---"
+MAX_ENTRY_TOKENS = 500    # 이보다 긴 일기만 문장 경계에서 여러 청크로 나눕니다. (예전 1000자 기준과 비슷)
+
+# 문장 끝: 마침표/물음표/느낌표/말줄임표/물결 뒤의 공백, 또는 줄바꿈
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?。…~])[ \t]+|\s*\n\s*")
+
+
+def estimate_tokens(text: str) -> int:
+    """한국어 텍스트의 토큰 수를 대략 추정합니다. (글자 2개당 토큰 1개 기준)"""
+    return max(1, (len(text) + 1) // 2)
+
+
+def _sentence_spans(text: str):
+    """문장마다 (시작, 끝) 위치를 돌려줍니다."""
+    start = 0
+    for match in _SENTENCE_BREAK.finditer(text):
+        if text[start:match.start()].strip():
+            yield start, match.start()
+        start = match.end()
+    if text[start:].strip():
+        yield start, len(text)
+
+
+def _limit_span(text: str, start: int, end: int, max_tokens: int):
+    """한 문장이 max_tokens보다 길면 공백 위치에서 자릅니다. (공백이 없으면 글자 수로)"""
+    max_chars = max_tokens * 2
+    while end - start > max_chars:
+        cut = text.rfind(" ", start + 1, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        yield start, cut
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        yield start, end
+
+
+def split_by_tokens(text: str, max_tokens: int) -> List[str]:
+    """text를 문장 경계에서 max_tokens(추정) 이하의 조각으로 나눕니다.
+
+    연속된 문장을 예산 안에서 최대한 묶고, 원문의 줄바꿈/띄어쓰기는 그대로 둡니다.
+    문장 중간에서는 자르지 않으며, 한 문장이 max_tokens보다 길 때만 예외입니다.
+    """
+    pieces = []
+    group_start = group_end = None
+    group_tokens = 0
+    for sentence_start, sentence_end in _sentence_spans(text):
+        for start, end in _limit_span(text, sentence_start, sentence_end, max_tokens):
+            tokens = estimate_tokens(text[start:end])
+            if group_start is not None and group_tokens + tokens > max_tokens:
+                pieces.append(text[group_start:group_end])
+                group_start, group_tokens = None, 0
+            if group_start is None:
+                group_start = start
+            group_end = end
+            group_tokens += tokens
+    if group_start is not None:
+        pieces.append(text[group_start:group_end])
+    return pieces
+
+
+def entry_header(fields: dict) -> str:
+    """청크 앞에 붙이는 '날짜:/제목:/본문:' 머리말. 날짜와 제목이 모두 없으면 빈 문자열."""
+    if fields["date_text"] or fields["title"]:
+        return f"날짜: {fields['date_text']}\n제목: {fields['title']}\n본문:\n"
+    return ""
+
+
+def iter_diary_records(file_path: str):
+    """크롤러가 '---' 줄로 구분해 저장한 일기 기록을 한 편씩 문자열로 돌려주는 제너레이터.
+
+    파일을 줄 단위로 읽으므로 파일 크기와 상관없이 메모리 사용량이 일정합니다.
+    """
+    with open(file_path, encoding="utf-8") as f:
+        lines = []
+        for line in f:
+            if line.strip() == RECORD_SEPARATOR:
+                record = "".join(lines).strip()
+                if record:
+                    yield record
+                lines = []
+            else:
+                lines.append(line)
+        record = "".join(lines).strip()
+        if record:
+            yield record
+
+
+def iter_jsonl_posts(file_path: str):
+    """크롤러가 한 줄에 한 글씩 추가한 JSONL 파일을 읽어 글 딕셔너리를 하나씩 돌려주는 제너레이터.
+
+    같은 글(log_no)이 다시 기록된 경우(수정된 글 재수집) 마지막 기록만 사용합니다.
+    첫 번째 훑기에서는 글 번호별 마지막 줄 위치만 기억하므로 메모리 사용량은 글 개수에만 비례합니다.
+    """
+    last_line = {}
+    with open(file_path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            try:
+                last_line[json.loads(line).get("log_no", line_no)] = line_no
+            except json.JSONDecodeError:
+                continue  # 크롤러가 쓰는 도중 멈춰서 잘린 줄
+    keep = set(last_line.values())
+
+    with open(file_path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            if line_no in keep:
+                yield json.loads(line)
+
+
+def parse_diary_record(record: str) -> dict:
+    """'날짜:/제목:/본문:' 형식의 기록을 {'date_text', 'title', 'body'} 딕셔너리로 나눕니다.
+
+    형식이 맞지 않는 기록(직접 작성한 일기 등)은 전체를 본문으로 취급합니다.
+    """
+    date_text, title, body_lines = "", "", []
+    in_body = False
+    for line in record.splitlines():
+        stripped = line.strip()
+        if not in_body and stripped.startswith("날짜:"):
+            date_text = stripped[len("날짜:"):].strip()
+        elif not in_body and stripped.startswith("제목:"):
+            title = stripped[len("제목:"):].strip()
+        elif not in_body and stripped.startswith("본문:"):
+            in_body = True
+            rest = stripped[len("본문:"):].strip()
+            if rest:
+                body_lines.append(rest)
+        else:
+            body_lines.append(line)
+    if not in_body and not date_text and not title:
+        return {"date_text": "", "title": "", "body": record}
+    return {"date_text": date_text, "title": title, "body": "\n".join(body_lines).strip()}
+
+
+def iter_diary_fields(file_path: str):
+    """파일 형식(.jsonl 또는 '---' 구분 텍스트)에 맞게 {'date_text', 'title', 'body'}를 하나씩 돌려줍니다."""
+    if file_path.endswith(".jsonl"):
+        for post in iter_jsonl_posts(file_path):
+            yield {"date_text": post.get("date", ""), "title": post.get("title", ""), "body": post.get("content", "")}
+    else:
+        for record in iter_diary_records(file_path):
+            yield parse_diary_record(record)
+
+
+def stream_documents(file_path: str = DEFAULT_DATA_PATH, max_tokens: int = MAX_ENTRY_TOKENS):
+    """일기 파일(텍스트 또는 크롤러의 JSONL)을 기록 단위로 읽어 Document를 하나씩 돌려주는 제너레이터를 반환합니다.
+
+    각 Document에는 실제 일기 날짜(`date`: ISO 형식, `date_num`: 정렬/범위 검색용 YYYYMMDD 정수)와
+    제목(`title`)이 메타데이터로 들어가며,
+    max_tokens보다 긴 일기만 문장 경계에서 여러 청크로 나눕니다. (나뉜 청크에도 날짜/제목 머리말을 붙입니다.)
+    `entry_id`는 청크 번호(분석 결과와 짝짓는 키), `entry_no`는 일기 번호(나뉜 청크끼리 같음), `part`는 일기 안의 순서입니다.
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"❌ 오류: 데이터 파일을 찾을 수 없습니다. 경로를 확인하세요: {file_path}")
 
-    loader = TextLoader(file_path, encoding='utf-8')
-    documents = loader.load()
+    def generate():
+        entry_id = 0
+        for entry_no, fields in enumerate(iter_diary_fields(file_path), start=1):
+            first_line = fields["body"].splitlines()[0] if fields["body"] else ""
+            entry_date = parse_entry_date(fields["date_text"]) or parse_entry_date(first_line)
+            # 날짜를 읽지 못한 일기는 앞 일기의 날짜를 물려받지 않고 날짜 없음("", 0)으로 둡니다.
+            # (물려받으면 기간 필터와 보고서에서 엉뚱한 날로 집계됩니다.)
+            current_date = entry_date.isoformat() if entry_date else ""
+            current_date_num = date_to_num(entry_date) if entry_date else 0
+
+            header = entry_header(fields)
+            body = fields["body"]
+            pieces = [body] if estimate_tokens(body) <= max_tokens else split_by_tokens(body, max_tokens)
+
+            for part, piece in enumerate(pieces):
+                entry_id += 1
+                yield Document(
+                    page_content=header + piece,
+                    metadata={
+                        "source": file_path,
+                        "doc_type": "diary_entry",
+                        "entry_id": entry_id,
+                        "entry_no": entry_no,
+                        "date": current_date,
+                        "date_num": current_date_num,
+                        "title": fields["title"],
+                        "part": part,
+                    },
+                )
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        separators=["---", "\n\n", "\n", " "],
-        chunk_size=1000,
-        chunk_overlap=0,
-    )
-    chunks = text_splitter.split_documents(documents)
+    return generate()
 
-    processed_documents = []
-    for i, chunk in enumerate(chunks):
-        chunk.metadata['doc_type'] = 'diary_entry'
-        chunk.metadata['entry_id'] = i + 1
-        processed_documents.append(chunk)
 
-    return processed_documents
\ No newline at end of file
+def prepare_data(file_path: str = DEFAULT_DATA_PATH):
+    """
+    일기 데이터를 로드하고 LangChain Document 객체 목록으로 분할합니다.
+    (큰 파일은 stream_documents()로 한 편씩 처리하는 것이 좋습니다.)
+    """
+    return list(stream_documents(file_path))
@@ -0,0 +1,225 @@
+# 파일 이름: embedding_backends.py (언더바 사용 필수)
+# 임베딩 백엔드 선택. EMBEDDING_BACKEND 환경 변수(또는 get_embeddings(backend=...))로 고릅니다.
+#   - google : Gemini embedding-001 (API 키 필요, 네트워크 왕복)
+#   - onnx   : 로컬 ONNX 문장 인코더 (int8 양자화 모델 권장). EMBEDDING_MODEL_DIR에 model*.onnx + tokenizer.json이
+#              있을 때만 사용하며, onnxruntime/tokenizers 패키지가 필요합니다. CPU 배치 추론, 스레드 수는 EMBEDDING_THREADS.
+#   - hashing: 문자 n-gram 해시 임베딩. NumPy만 있으면 어디서나 오프라인으로 동작합니다.
+#   - auto(기본): onnx 모델이 있으면 onnx → Gemini API 키가 있으면 google → 아니면 hashing
+# 어떤 백엔드든 CachedEmbeddings로 감싸므로 같은 텍스트는 다시 임베딩하지 않습니다.
+
+import hashlib
+import os
+import re
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings
+
+DEFAULT_BACKEND = "auto"
+DEFAULT_MODEL_DIR = "./models/embedding"
+DEFAULT_HASHING_DIM = 512
+GOOGLE_MODEL = "models/embedding-001"
+ONNX_MODEL_FILES = ("model_int8.onnx", "model_quantized.onnx", "model_qint8_avx512_vnni.onnx", "model.onnx")
+ONNX_BATCH_SIZE = 32
+ONNX_MAX_LENGTH = 256
+HASHING_VERSION = 1
+
+EMBEDDING_BACKENDS = {}
+
+
+def register_backend(name: str):
+    """백엔드 생성 함수 등록 데코레이터. 생성 함수는 (api_key) → CachedEmbeddings를 반환합니다."""
+    def decorator(factory):
+        EMBEDDING_BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+# --- hashing ---
+class HashingEmbeddings(Embeddings):
+    """문자 1~3-gram을 부호 있는 해시(feature hashing)로 dim차원에 모은 임베딩.
+
+    모델 가중치나 네트워크 없이 NumPy 연산만으로 계산하며, 같은 텍스트는 항상 같은 벡터입니다.
+    글자 조각이 많이 겹칠수록 가까워지므로 한국어 일기처럼 단어 형태가 다양한 텍스트에도 무난합니다.
+    """
+
+    def __init__(self, dim: int = DEFAULT_HASHING_DIM, ngram_sizes=(1, 2, 3)):
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+
+    def _embed(self, text: str) -> np.ndarray:
+        compact = re.sub(r"\s+", " ", text.strip())
+        codes = np.frombuffer(compact.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        hashed = []
+        for n in self.ngram_sizes:
+            count = len(codes) - n + 1
+            if count <= 0:
+                continue
+            grams = np.full(count, n, dtype=np.uint64)   # n을 섞어 길이가 다른 n-gram끼리 겹치지 않게 합니다.
+            for offset in range(n):
+                grams = grams * np.uint64(1_000_003) + codes[offset:offset + count]
+            hashed.append(grams * np.uint64(0x9E3779B97F4A7C15))   # 곱셈 해시 (uint64에서 자연스럽게 넘침)
+        if not hashed:
+            return np.zeros(self.dim, dtype=np.float32)
+        hashed = np.concatenate(hashed)
+        signs = np.where((hashed >> np.uint64(31)) & np.uint64(1), 1.0, -1.0)
+        buckets = ((hashed >> np.uint64(32)) % np.uint64(self.dim)).astype(np.int64)
+        vector = np.bincount(buckets, weights=signs, minlength=self.dim)
+        vector = np.sign(vector) * np.log1p(np.abs(vector))   # 자주 나오는 조각의 영향을 줄입니다.
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text).tolist()
+
+
+# --- onnx ---
+def find_onnx_model(model_dir: str = DEFAULT_MODEL_DIR):
+    """model_dir(또는 그 아래 onnx/)에서 ONNX 가중치와 tokenizer.json을 찾습니다. 없으면 None."""
+    for directory in (model_dir, os.path.join(model_dir, "onnx")):
+        for name in ONNX_MODEL_FILES:
+            path = os.path.join(directory, name)
+            if os.path.exists(path) and os.path.exists(os.path.join(model_dir, "tokenizer.json")):
+                return path
+    return None
+
+
+class OnnxEmbeddings(Embeddings):
+    """로컬 ONNX 문장 인코더 (sentence-transformers 계열을 ONNX로 내보낸 모델).
+
+    텍스트를 길이순으로 정렬해 batch_size씩 묶어 추론하고(패딩 낭비 감소), 마지막 은닉 상태를
+    attention mask로 평균 풀링한 뒤 정규화합니다. num_threads로 onnxruntime 연산 스레드 수를 제한합니다.
+    e5 계열처럼 접두어가 필요한 모델은 query_prefix/document_prefix를 지정합니다.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_MODEL_DIR, batch_size: int = ONNX_BATCH_SIZE,
+                 num_threads: int = None, max_length: int = ONNX_MAX_LENGTH,
+                 query_prefix: str = "", document_prefix: str = ""):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = find_onnx_model(model_dir)
+        if model_path is None:
+            raise FileNotFoundError(f"{model_dir}에 ONNX 모델(model*.onnx)과 tokenizer.json이 없습니다.")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads or os.cpu_count() or 1
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.query_prefix = query_prefix
+        self.document_prefix = document_prefix
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        output = np.zeros((len(texts), 0), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in rows])
+            input_ids = np.asarray([encoding.ids for encoding in encodings], dtype=np.int64)
+            mask = np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            hidden = self.session.run(None, feeds)[0]
+            if hidden.ndim == 3:   # (배치, 토큰, 차원) → 평균 풀링
+                weights = mask[:, :, None].astype(np.float32)
+                hidden = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            hidden = hidden / np.maximum(np.linalg.norm(hidden, axis=1, keepdims=True), 1e-12)
+            if output.shape[1] == 0:
+                output = np.zeros((len(texts), hidden.shape[1]), dtype=np.float32)
+            output[rows] = hidden
+        return output
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode([self.document_prefix + text for text in texts]).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([self.query_prefix + text])[0].tolist()
+
+
+# --- 등록된 백엔드 ---
+@register_backend("google")
+def _google_backend(api_key: str = None):
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    from analysis_chains import get_api_key
+
+    embeddings = GoogleGenerativeAIEmbeddings(model=GOOGLE_MODEL, api_key=api_key or get_api_key())
+    # 네트워크 요청이므로 배치 여러 개를 동시에 보냅니다.
+    return CachedEmbeddings(embeddings, namespace=GOOGLE_MODEL)
+
+
+@register_backend("onnx")
+def _onnx_backend(api_key: str = None):
+    model_dir = os.getenv("EMBEDDING_MODEL_DIR", DEFAULT_MODEL_DIR)
+    threads = int(os.getenv("EMBEDDING_THREADS", "0")) or None
+    embeddings = OnnxEmbeddings(
+        model_dir, num_threads=threads,
+        query_prefix=os.getenv("EMBEDDING_QUERY_PREFIX", ""),
+        document_prefix=os.getenv("EMBEDDING_DOCUMENT_PREFIX", ""),
+    )
+    stat = os.stat(embeddings.model_path)
+    # 모델 파일이나 접두어가 바뀌면 다른 캐시/컬렉션을 쓰도록 이름에 넣습니다.
+    namespace = (f"onnx:{os.path.abspath(embeddings.model_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+                 f":{embeddings.query_prefix}:{embeddings.document_prefix}")
+    # onnxruntime이 코어를 나눠 쓰므로 배치는 하나씩 보냅니다. (스레드 과다 방지)
+    return CachedEmbeddings(embeddings, namespace=namespace, batch_size=embeddings.batch_size * 8, max_workers=1)
+
+
+@register_backend("hashing")
+def _hashing_backend(api_key: str = None):
+    dim = int(os.getenv("EMBEDDING_DIM", str(DEFAULT_HASHING_DIM)))
+    return CachedEmbeddings(HashingEmbeddings(dim), namespace=f"hashing-v{HASHING_VERSION}-{dim}",
+                            batch_size=1000, max_workers=1)
+
+
+def resolve_backend(backend: str = None, api_key: str = None) -> str:
+    """auto를 실제 백엔드 이름으로 바꿉니다."""
+    backend = backend or os.getenv("EMBEDDING_BACKEND", DEFAULT_BACKEND)
+    if backend != "auto":
+        return backend
+    if find_onnx_model(os.getenv("EMBEDDING_MODEL_DIR", DEFAULT_MODEL_DIR)) is not None:
+        try:
+            import onnxruntime  # noqa: F401
+            import tokenizers  # noqa: F401
+            return "onnx"
+        except ImportError:
+            pass
+    if api_key:
+        return "google"
+    from analysis_chains import get_api_key
+
+    try:
+        get_api_key()
+        return "google"
+    except ValueError:
+        return "hashing"
+
+
+def get_embeddings(backend: str = None, api_key: str = None) -> CachedEmbeddings:
+    """설정된 임베딩 백엔드를 디스크 캐시로 감싸 반환합니다."""
+    name = resolve_backend(backend, api_key)
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"알 수 없는 임베딩 백엔드: {name} (선택: auto, {', '.join(EMBEDDING_BACKENDS)})")
+    embeddings = EMBEDDING_BACKENDS[name](api_key)
+    embeddings.backend = name
+    return embeddings
+
+
+def vector_collection_name(embeddings, base: str) -> str:
+    """임베딩 공간마다 다른 벡터 컬렉션 이름. (Gemini는 예전 이름을 그대로 써서 기존 색인을 유지합니다.)"""
+    namespace = getattr(embeddings, "namespace", GOOGLE_MODEL)
+    if namespace == GOOGLE_MODEL:
+        return base
+    return f"{base}-{getattr(embeddings, 'backend', 'local')}-{hashlib.sha256(namespace.encode('utf-8')).hexdigest()[:12]}"
@@ -0,0 +1,160 @@
+# 파일 이름: embedding_cache.py (언더바 사용 필수)
+
+import hashlib
+import json
+import os
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+import tracing
+
+DEFAULT_CACHE_DIR = "./.cache/embeddings"
+DEFAULT_BATCH_SIZE = 100      # Gemini batchEmbedContents 한 번에 보낼 수 있는 최대 개수
+DEFAULT_MAX_WORKERS = 4       # 동시에 보낼 배치 요청 수
+KEY_BYTES = 16
+
+
+class CachedEmbeddings(Embeddings):
+    """임의의 LangChain Embeddings를 감싸 중복 제거 + 배치 병렬 요청 + 디스크 캐시를 제공합니다.
+
+    벡터는 float32 원시 파일(vectors.f32)에 행 단위로 이어 붙이고 np.memmap으로 읽으며,
+    해시→행 번호 색인은 고정 길이 바이트 파일(keys.bin)로 저장합니다.
+    덕분에 수만 개의 벡터도 JSON 파싱이나 벡터별 객체 생성 없이 바로 열 수 있습니다.
+    """
+
+    def __init__(self, underlying: Embeddings, namespace: str = "default",
+                 cache_dir: str = DEFAULT_CACHE_DIR,
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.underlying = underlying
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+        safe_name = hashlib.sha256(namespace.encode("utf-8")).hexdigest()[:12]
+        self.cache_dir = os.path.join(cache_dir, safe_name)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+        self.keys_path = os.path.join(self.cache_dir, "keys.bin")
+        self.meta_path = os.path.join(self.cache_dir, "meta.json")
+
+        self.dim = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        self.index = {}
+        self._vectors = None
+        self._lock = threading.Lock()  # 서비스 모드에서 여러 요청이 동시에 파일에 이어 쓰지 않도록
+        self._load_index()
+
+    # --- 디스크 색인 ---
+    def _load_index(self):
+        if self.dim is None:
+            return
+        with self._lock:
+            keys = (np.fromfile(self.keys_path, dtype=f"S{KEY_BYTES}") if os.path.exists(self.keys_path)
+                    else np.zeros(0, dtype=f"S{KEY_BYTES}"))
+            vector_rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+            # 벡터를 먼저 쓰고 키를 나중에 쓰므로, 중간에 끊겼다면 짝이 맞는 행 수로 두 파일을 모두 자릅니다.
+            # (남은 벡터 행 뒤에 새 벡터를 이어 쓰면 행 번호가 어긋나 다른 텍스트의 벡터를 돌려주게 됩니다.)
+            rows = min(len(keys), vector_rows)
+            self._truncate_locked(rows)
+            self.index = {key: row for row, key in enumerate(keys[:rows].tolist())}
+
+    def _truncate_locked(self, rows: int):
+        """벡터/키 파일을 정확히 rows 행으로 자릅니다."""
+        for path, row_bytes in ((self.vectors_path, 4 * self.dim), (self.keys_path, KEY_BYTES)):
+            if os.path.exists(path) and os.path.getsize(path) != rows * row_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * row_bytes)
+
+    @property
+    def vectors(self):
+        """캐시된 전체 벡터 행렬 (행 수 x 차원, float32 memmap)."""
+        if self._vectors is None and self.index:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                      shape=(len(self.index), self.dim))
+        return self._vectors
+
+    def _key(self, kind: str, text: str) -> bytes:
+        digest = hashlib.sha256(f"{self.namespace}\0{kind}\0{text}".encode("utf-8")).digest()
+        return digest[:KEY_BYTES]
+
+    def _append(self, keys: List[bytes], vectors: List[List[float]]):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._append_locked(keys, matrix)
+
+    def _append_locked(self, keys: List[bytes], matrix):
+        # 다른 요청이 먼저 같은 텍스트를 저장했다면 건너뜁니다. (행 번호 = 색인 크기를 유지)
+        fresh = [i for i, key in enumerate(keys) if key not in self.index]
+        if len(fresh) < len(keys):
+            keys, matrix = [keys[i] for i in fresh], matrix[fresh]
+        if not keys:
+            return
+        if self.dim is None:
+            self.dim = int(matrix.shape[1])
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"namespace": self.namespace, "dim": self.dim}, f)
+        # 행 번호는 실제 벡터 파일 크기로 정합니다. 색인과 파일이 어긋나 있으면 먼저 맞춥니다.
+        start = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+        if start != len(self.index):
+            self._truncate_locked(len(self.index))
+            start = len(self.index)
+        with open(self.vectors_path, "ab") as f:
+            matrix.tofile(f)
+        with open(self.keys_path, "ab") as f:
+            f.write(b"".join(keys))
+        for offset, key in enumerate(keys):
+            self.index[key] = start + offset
+        self._vectors = None  # 행이 늘었으므로 memmap을 다시 엽니다.
+
+    # --- 임베딩 ---
+    def _embed_missing(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+
+        # 캐시에 없는 텍스트만, 중복 없이 모읍니다.
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.index and key not in missing:
+                missing[key] = text
+
+        if len(set(keys)) > len(missing):
+            tracing.add_event("cache_hit", cache="embedding", count=len(set(keys)) - len(missing))
+        if missing:
+            missing_keys = list(missing)
+            batches = [missing_keys[i:i + self.batch_size] for i in range(0, len(missing_keys), self.batch_size)]
+
+            def embed_batch(batch_keys):
+                batch_texts = [missing[key] for key in batch_keys]
+                with tracing.span("embedding", **{"embedding.texts": len(batch_texts),
+                                                  "embedding.chars": sum(map(len, batch_texts))}):
+                    if kind == "query":
+                        return [self.underlying.embed_query(text) for text in batch_texts]
+                    return self.underlying.embed_documents(batch_texts)
+
+            # 작업 스레드에서도 호출한 쪽의 추적 구간(단계) 아래에 기록되도록 컨텍스트를 복사해 넘깁니다.
+            contexts = [contextvars.copy_context() for _ in batches]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = executor.map(lambda context, batch_keys: context.run(embed_batch, batch_keys),
+                                       contexts, batches)
+                for batch_keys, batch_vectors in zip(batches, results):
+                    self._append(batch_keys, batch_vectors)
+
+        with self._lock:
+            vectors = self.vectors
+            rows = [self.index[key] for key in keys]
+        return vectors[rows].tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed_missing("document", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        # Gemini는 문서/질의 임베딩의 task_type이 다르므로 따로 캐시합니다.
+        return self._embed_missing("query", [text])[0]
@@ -0,0 +1,178 @@
+# 파일 이름: emotion_taxonomy.py (언더바 사용 필수)
+# LLM이 자유롭게 붙인 감정 이름("걱정", "내적갈등", "소외감" ...)을 정해진 대표 감정과 정수 ID로 맞춥니다.
+# 순서: 이미 본 이름(매핑 표) → 대표 감정과 정확히 일치 → 동의어 → 대표 감정/동의어로 끝나는 이름(부정 접두 제외)
+#       → (임베딩이 있으면) 가장 가까운 대표 감정 → 그래도 없으면 새 대표 감정으로 추가.
+# 매핑 표는 디스크에 저장되므로 새 이름이 처음 나왔을 때만 표가 늘어나고, 임베딩도 그때 한 번만 계산합니다.
+
+import json
+import os
+import re
+
+import numpy as np
+
+DEFAULT_TAXONOMY_PATH = "./.cache/emotion-taxonomy.json"
+DEFAULT_SIMILARITY_THRESHOLD = 0.85
+TAXONOMY_VERSION = 2   # 2: 포함 관계 대신 접미 일치 + 부정 접두 검사 (1의 매핑 표는 다시 계산)
+# 이 글자로 끝나는 앞부분이 붙으면 뜻이 반대가 됩니다. ("불안정감" ≠ "안정감", "무기대" ≠ "기대")
+NEGATION_PREFIXES = ("불", "무", "비", "안", "못", "미")
+# 명사형 꼬리. 떼어 낸 형태로도 비교합니다. ("극심한 불안감" → "극심한불안" → "불안")
+NOUN_SUFFIXES = ("감", "함", "심")
+
+# 대표 감정. 목록 안의 위치가 감정 ID이므로 순서를 바꾸지 말고 뒤에만 추가합니다.
+CANONICAL_EMOTIONS = [
+    "기쁨", "평온", "감사", "설렘", "뿌듯함", "사랑", "안도", "그리움",
+    "슬픔", "우울", "외로움", "불안", "두려움", "분노", "짜증", "실망", "서운함",
+    "후회", "죄책감", "수치심", "무력감", "피로", "스트레스", "혼란", "내적 갈등",
+]
+
+# 자주 나오는 다른 표현 → 대표 감정
+SYNONYMS = {
+    "행복": "기쁨", "행복감": "기쁨", "즐거움": "기쁨", "신남": "기쁨", "기쁨과 행복": "기쁨",
+    "편안함": "평온", "편안": "평온", "안정감": "평온", "여유": "평온", "차분함": "평온",
+    "고마움": "감사", "감사함": "감사",
+    "기대": "설렘", "기대감": "설렘", "두근거림": "설렘", "희망": "설렘",
+    "만족": "뿌듯함", "만족감": "뿌듯함", "성취감": "뿌듯함", "자부심": "뿌듯함", "보람": "뿌듯함",
+    "애정": "사랑", "따뜻함": "사랑", "유대감": "사랑", "친밀감": "사랑",
+    "안심": "안도", "홀가분함": "안도", "해방감": "안도",
+    "향수": "그리움", "아련함": "그리움",
+    "슬픔과 아쉬움": "슬픔", "서글픔": "슬픔", "상실감": "슬픔", "눈물": "슬픔",
+    "우울감": "우울", "침울함": "우울", "허탈감": "우울",
+    "소외감": "외로움", "고독": "외로움", "고독감": "외로움", "쓸쓸함": "외로움", "고립감": "외로움",
+    "걱정": "불안", "초조함": "불안", "초조": "불안", "긴장": "불안", "긴장감": "불안", "조급함": "불안",
+    "공포": "두려움", "무서움": "두려움", "겁": "두려움",
+    "화": "분노", "억울함": "분노", "울분": "분노", "격분": "분노",
+    "짜증남": "짜증", "답답함": "짜증", "불쾌감": "짜증", "귀찮음": "짜증",
+    "실망감": "실망", "좌절": "실망", "좌절감": "실망",
+    "섭섭함": "서운함", "서러움": "서운함",
+    "아쉬움": "후회", "미련": "후회",
+    "자책": "죄책감", "자책감": "죄책감", "미안함": "죄책감",
+    "부끄러움": "수치심", "창피함": "수치심", "민망함": "수치심",
+    "무기력": "무력감", "무기력감": "무력감", "허무함": "무력감", "허무감": "무력감", "절망": "무력감",
+    "피곤함": "피로", "피곤": "피로", "지침": "피로", "탈진": "피로", "번아웃": "피로",
+    "부담감": "스트레스", "압박감": "스트레스", "부담": "스트레스",
+    "혼란스러움": "혼란", "당황": "혼란", "당혹감": "혼란", "막막함": "혼란",
+    "갈등": "내적 갈등", "양가감정": "내적 갈등", "망설임": "내적 갈등", "고민": "내적 갈등",
+}
+
+
+def normalize_label(label: str) -> str:
+    """비교용 키: 공백 제거 + 소문자. ("내적 갈등" == "내적갈등")"""
+    return re.sub(r"\s+", "", str(label)).lower()
+
+
+class EmotionTaxonomy:
+    """원래 감정 이름 → 대표 감정 ID 매핑 표.
+
+    labels[ID]가 대표 감정 이름이며, 임베딩으로도 가까운 대표 감정을 찾지 못한 새 이름은
+    labels 끝에 새 대표 감정으로 추가됩니다. (이미 붙은 ID는 바뀌지 않습니다.)
+    embeddings(LangChain Embeddings, CachedEmbeddings 권장)가 없으면 임베딩 단계는 건너뜁니다.
+    """
+
+    def __init__(self, path: str = DEFAULT_TAXONOMY_PATH, embeddings=None,
+                 similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.path = path
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.labels = list(CANONICAL_EMOTIONS)
+        self.mapping = {}
+        self._dirty = False
+        self._label_vectors = None
+
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            # 대표 감정 목록이 바뀌었으면 예전 ID와 맞지 않으므로 매핑 표를 새로 만듭니다.
+            # 찾는 규칙만 바뀐 예전 버전이면 대표 감정(ID)은 유지하고 매핑 표만 다시 계산합니다.
+            if saved.get("labels", [])[:len(CANONICAL_EMOTIONS)] == CANONICAL_EMOTIONS:
+                self.labels = saved["labels"]
+                if saved.get("version") == TAXONOMY_VERSION:
+                    self.mapping = saved["mapping"]
+                else:
+                    self._dirty = True
+
+        self._exact = {normalize_label(label): i for i, label in enumerate(self.labels)}
+        self._exact.update({normalize_label(raw): self._exact[normalize_label(label)]
+                            for raw, label in SYNONYMS.items()})
+        # 접미 일치로 찾을 때는 긴 표현부터 봅니다. ("극심한 불안감" → "불안")
+        self._surface_forms = sorted(
+            ((key, i) for key, i in self._exact.items() if len(key) >= 2), key=lambda item: -len(item[0])
+        )
+
+    def canonical_id(self, label: str) -> int:
+        key = normalize_label(label)
+        if key in self.mapping:
+            return self.mapping[key]
+        emotion_id = self._lookup(key, str(label).strip())
+        self.mapping[key] = emotion_id
+        self._dirty = True
+        # 새 이름은 드물게만 나오므로 바로 저장합니다. (실행 기록에 남은 ID와 어긋나지 않도록)
+        self.save()
+        return emotion_id
+
+    def canonical_label(self, label: str) -> str:
+        return self.labels[self.canonical_id(label)]
+
+    def _lookup(self, key: str, label: str) -> int:
+        if key in self._exact:
+            return self._exact[key]
+        emotion_id = self._suffix_match(key)
+        if emotion_id is not None:
+            return emotion_id
+        if self.embeddings is not None and label:
+            emotion_id, similarity = self._nearest(label)
+            if similarity >= self.similarity_threshold:
+                return emotion_id
+        # 정말 새로운 감정: 새 대표 감정으로 등록합니다.
+        self.labels.append(label or "기타")
+        self._exact[key] = len(self.labels) - 1
+        self._label_vectors = None
+        return len(self.labels) - 1
+
+    def _suffix_match(self, key: str):
+        """대표 감정/동의어로 끝나는 이름의 ID. ("극심한불안" → 불안)
+
+        중간에 들어 있기만 한 경우는 보지 않고, 앞부분이 부정 접두(불/무/비/안…)로 끝나면 뜻이 반대이므로 건너뜁니다.
+        """
+        stems = [key] + [key[:-len(suffix)] for suffix in NOUN_SUFFIXES if key.endswith(suffix) and len(key) > len(suffix)]
+        for form, emotion_id in self._surface_forms:
+            for stem in stems:
+                if stem.endswith(form) and not stem[:-len(form)].endswith(NEGATION_PREFIXES):
+                    return emotion_id
+        return None
+
+    def _nearest(self, label: str):
+        """임베딩 코사인 유사도로 가장 가까운 대표 감정 (ID, 유사도)."""
+        if self._label_vectors is None:
+            vectors = np.asarray(self.embeddings.embed_documents(self.labels), dtype=np.float32)
+            self._label_vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query = np.asarray(self.embeddings.embed_documents([label])[0], dtype=np.float32)
+        similarities = self._label_vectors @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
+
+    def canonicalize_report(self, report_data: dict) -> dict:
+        """보고서의 감정 태그마다 emotion을 대표 감정으로 바꾸고 emotion_id/raw_emotion을 붙입니다."""
+        for tag in report_data.get("emotion_tags", []):
+            raw = tag.get("raw_emotion", tag["emotion"])
+            emotion_id = self.canonical_id(raw)
+            tag["raw_emotion"] = raw
+            tag["emotion"] = self.labels[emotion_id]
+            tag["emotion_id"] = emotion_id
+        return report_data
+
+    def canonicalize_reports(self, all_analysis_reports):
+        """emotion_id가 없는 (예전) 보고서만 대표 감정으로 바꿉니다."""
+        for report in all_analysis_reports:
+            if any("emotion_id" not in tag for tag in report.get("emotion_tags", [])):
+                self.canonicalize_report(report)
+        return all_analysis_reports
+
+    def save(self):
+        """새 이름이 매핑 표에 추가됐을 때만 파일에 씁니다."""
+        if not self._dirty or not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": TAXONOMY_VERSION, "labels": self.labels, "mapping": self.mapping},
+                      f, ensure_ascii=False, indent=1)
+        self._dirty = False
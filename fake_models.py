@@ -0,0 +1,118 @@
+# 파일 이름: fake_models.py (언더바 사용 필수)
+# 실제 Gemini API 없이 파이프라인을 실행/검증하기 위한 가짜 LLM 모델 모음입니다.
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from embedding_backends import HashingEmbeddings
+
+
+FAKE_EMOTIONS = ("평온", "기쁨", "불안", "슬픔", "피로", "감사", "짜증", "외로움")
+
+
+class FakeRateLimitError(Exception):
+    """Provider의 429/5xx 응답을 흉내 내는 예외."""
+
+    def __init__(self, message: str = "429 RESOURCE_EXHAUSTED (fake)", status_code: int = 429):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeEmotionChatModel(BaseChatModel):
+    """지연 시간과 요청 한도 오류를 시뮬레이션하는 가짜 채팅 모델.
+
+    항상 EmotionAnalysisReport 형식의 JSON을 돌려주므로 감정 분석 체인에 그대로 꽂아 쓸 수 있습니다.
+    입력에 '[청크 N]' 머리말이 있으면 묶음 분석 체인용 EmotionAnalysisBatch 형식으로 답합니다.
+    """
+
+    latency: float = 0.0            # 호출당 지연 시간(초)
+    error_rate: float = 0.0         # 429 오류를 낼 확률 (0.0 ~ 1.0)
+    server_error_rate: float = 0.0  # 503 오류를 낼 확률 (0.0 ~ 1.0)
+    seed: int = 0
+    call_count: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-emotion-chat"
+
+    def _next_response(self, messages: List[BaseMessage]) -> AIMessage:
+        self.call_count += 1
+        rng = random.Random(f"{self.seed}-{self.call_count}")
+        roll = rng.random()
+        if roll < self.error_rate:
+            raise FakeRateLimitError()
+        if roll < self.error_rate + self.server_error_rate:
+            raise FakeRateLimitError("503 Service Unavailable (fake)", status_code=503)
+
+        text = str(messages[-1].content) if messages else ""
+        parts = re.split(r"^\[청크 (\d+)\]$", text, flags=re.MULTILINE)
+        if len(parts) > 1:
+            reports = [dict(self._fake_report(body, rng), entry_id=int(entry_id))
+                       for entry_id, body in zip(parts[1::2], parts[2::2])]
+            return AIMessage(content=json.dumps({"reports": reports}, ensure_ascii=False))
+        return AIMessage(content=json.dumps(self._fake_report(text, rng), ensure_ascii=False))
+
+    @staticmethod
+    def _fake_report(text: str, rng: random.Random) -> dict:
+        return {
+            "summary": text.strip().splitlines()[-1][:30] if text.strip() else "",
+            "emotion_tags": [
+                {"emotion": rng.choice(FAKE_EMOTIONS), "intensity": round(rng.random(), 2),
+                 "reason": text.strip()[-40:]}
+                for _ in range(1 + int(rng.random() < 0.5))
+            ],
+        }
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_response(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_response(messages))])
+
+
+class FakeEmbeddings(HashingEmbeddings):
+    """embedding_backends.HashingEmbeddings에 호출(배치)당 지연 시간과 429 오류 확률을 더한 가짜 임베딩.
+
+    벡터는 해시 임베딩과 같으므로 결정적(deterministic)이고, 글자가 많이 겹치는 텍스트끼리 가까워져
+    검색 결과도 그럴듯하게 나옵니다. 오류는 FakeEmotionChatModel과 같은 방식으로 흉내 냅니다.
+    """
+
+    def __init__(self, size: int = 256, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(dim=size)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.call_count = 0
+        self._lock = threading.Lock()   # CachedEmbeddings가 여러 스레드에서 호출합니다.
+
+    def _check_call(self):
+        with self._lock:
+            self.call_count += 1
+            roll = random.Random(f"{self.seed}-{self.call_count}").random()
+        if self.latency:
+            time.sleep(self.latency)
+        if roll < self.error_rate:
+            raise FakeRateLimitError()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._check_call()
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._check_call()
+        return super().embed_query(text)
@@ -0,0 +1,162 @@
+# 파일 이름: filtered_retriever.py (언더바 사용 필수)
+# "지난주", "3월에" 같은 시간 표현과 감정 표현을 질문에서 찾아 벡터 검색 전에 범위를 좁힙니다.
+
+import re
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from data_preparer import date_to_num # 언더바 파일명으로 임포트
+
+# 질문에 자주 나오는 감정 표현 → 분석 결과의 감정 이름
+EMOTION_KEYWORDS = {
+    "기뻤": ["기쁨", "행복", "즐거움"], "기쁜": ["기쁨", "행복", "즐거움"], "기쁨": ["기쁨"],
+    "행복": ["행복", "기쁨"], "즐거": ["즐거움", "기쁨"],
+    "슬펐": ["슬픔"], "슬픈": ["슬픔"], "우울": ["우울", "슬픔"],
+    "화가": ["분노"], "화났": ["분노"], "짜증": ["짜증", "분노"],
+    "불안": ["불안"], "걱정": ["걱정", "불안"], "무서": ["두려움"], "두려": ["두려움"],
+    "외로": ["외로움", "소외감"], "서운": ["서운함", "실망"], "실망": ["실망"],
+    "감사": ["감사"], "고마": ["감사"], "편안": ["평온", "안도"], "평온": ["평온"],
+}
+
+
+def _shift_month(value: date, months: int) -> date:
+    month_index = value.year * 12 + (value.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _month_range(year: int, month: int):
+    start = date(year, month, 1)
+    return start, _shift_month(start, 1) - timedelta(days=1)
+
+
+def _latest_year(month: int, day: int, today: date) -> int:
+    """연도가 없는 'N월 (N일)'을 오늘 기준으로 가장 최근의 해로 해석합니다."""
+    return today.year if (month, day) <= (today.month, today.day) else today.year - 1
+
+
+def parse_time_range(question: str, today: date = None):
+    """질문 속 시간 표현을 (시작일, 종료일)로 바꿉니다. 시간 표현이 없거나 잘못된 날짜면 None."""
+    try:
+        return _parse_time_range(question, today or date.today())
+    except ValueError:  # '2월 30일' 같은 존재하지 않는 날짜
+        return None
+
+
+def _parse_time_range(question: str, today: date):
+    if m := re.search(r"(\d{4})\s*년\s*(\d{1,2})\s*월\s*(\d{1,2})\s*일", question):
+        day = date(int(m[1]), int(m[2]), int(m[3]))
+        return day, day
+    if m := re.search(r"(\d{4})\s*년\s*(\d{1,2})\s*월", question):
+        return _month_range(int(m[1]), int(m[2]))
+    if m := re.search(r"(\d{1,2})\s*월\s*(\d{1,2})\s*일", question):
+        month, day = int(m[1]), int(m[2])
+        day = date(_latest_year(month, day, today), month, day)
+        return day, day
+    if m := re.search(r"(\d{1,2})\s*월", question):
+        month = int(m[1])
+        if 1 <= month <= 12:
+            return _month_range(_latest_year(month, 1, today), month)
+    if m := re.search(r"(\d{4})\s*년", question):
+        return date(int(m[1]), 1, 1), date(int(m[1]), 12, 31)
+
+    if m := re.search(r"(?:최근|지난)\s*(\d+)\s*(일|주|개월|달)", question):
+        amount, unit = int(m[1]), m[2]
+        if unit == "일":
+            return today - timedelta(days=amount - 1), today
+        if unit == "주":
+            return today - timedelta(weeks=amount) + timedelta(days=1), today
+        return _shift_month(today, -amount + 1), today
+
+    monday = today - timedelta(days=today.weekday())
+    if "그저께" in question or "그제" in question:
+        day = today - timedelta(days=2)
+        return day, day
+    if "어제" in question:
+        day = today - timedelta(days=1)
+        return day, day
+    if "오늘" in question:
+        return today, today
+    if re.search(r"(지난|저번)\s*주", question):
+        return monday - timedelta(days=7), monday - timedelta(days=1)
+    if re.search(r"이번\s*주|금주", question):
+        return monday, today
+    if re.search(r"(지난|저번)\s*달", question):
+        start = _shift_month(today, -1)
+        return start, _shift_month(today, 0) - timedelta(days=1)
+    if re.search(r"이번\s*달", question):
+        return _shift_month(today, 0), today
+    if "작년" in question or "지난해" in question:
+        return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+    if "올해" in question or "금년" in question:
+        return date(today.year, 1, 1), today
+    return None
+
+
+def parse_emotions(question: str, known_labels) -> List[str]:
+    """질문에 등장하는 감정 이름(분석 결과에 실제로 있는 것만)을 찾아 반환합니다."""
+    found = set()
+    for keyword, labels in EMOTION_KEYWORDS.items():
+        if keyword in question:
+            found.update(labels)
+    found.update(label for label in known_labels if len(label) >= 2 and label in question)
+    return sorted(found & set(known_labels))
+
+
+def build_emotion_index(all_analysis_reports) -> Dict[str, List[int]]:
+    """감정 이름 → 그 감정이 나온 청크의 entry_id 목록 (벡터 스토어 밖의 보조 색인)."""
+    index = defaultdict(set)
+    for report in all_analysis_reports:
+        entry_id = report.get("metadata", {}).get("entry_id")
+        if entry_id is None:
+            continue
+        for tag in report.get("emotion_tags", []):
+            index[tag["emotion"]].add(entry_id)
+    return {label: sorted(ids) for label, ids in index.items()}
+
+
+def build_where(time_range=None, entry_ids=None):
+    """시간 범위와 entry_id 목록을 Chroma `where` 조건으로 바꿉니다. 조건이 없으면 None."""
+    conditions = []
+    if time_range:
+        start, end = time_range
+        conditions.append({"date_num": {"$gte": date_to_num(start)}})
+        conditions.append({"date_num": {"$lte": date_to_num(end)}})
+    if entry_ids is not None:
+        conditions.append({"entry_id": {"$in": list(entry_ids)}})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+class FilteredDiaryRetriever(BaseRetriever):
+    """질문의 날짜 범위/감정 조건을 벡터 스토어 필터로 먼저 적용한 뒤 유사도 검색을 하는 리트리버.
+
+    검색 대상이 해당 기간(또는 감정)의 청크로 줄어들기 때문에 일기가 쌓여도 질문 범위만큼만 검색합니다.
+    """
+
+    vectorstore: Any
+    k: int = 3
+    emotion_index: Dict[str, List[int]] = {}
+    today: Optional[date] = None
+
+    def get_conditions(self, query: str):
+        """질문에서 (시간 범위, entry_id 목록)을 뽑습니다. 조건이 없으면 각각 None."""
+        time_range = parse_time_range(query, self.today)
+        entry_ids = None
+        emotions = parse_emotions(query, self.emotion_index)
+        if emotions:
+            entry_ids = sorted({i for label in emotions for i in self.emotion_index[label]})
+        return time_range, entry_ids
+
+    def get_filter(self, query: str):
+        return build_where(*self.get_conditions(query))
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        where = self.get_filter(query)
+        if where is None:
+            return self.vectorstore.similarity_search(query, k=self.k)
+        return self.vectorstore.similarity_search(query, k=self.k, filter=where)
@@ -11,11 +11,13 @@ from pydantic import BaseModel, Field
 # LangChain 및 Google GenAI 라이브러리
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser # 수정: 최신 모듈 경로 사용
-from langchain_community.vectorstores import Chroma
 from langchain_core.runnables import RunnablePassthrough
+from report_cache import ReportCache, chain_fingerprint, make_cache_key
+from embedding_backends import get_embeddings
+from flat_vector_store import FlatVectorStore
 
 # --- Pydantic 스키마 정의 ---
 class EmotionTag(BaseModel):
@@ -94,10 +96,22 @@ print("🧠 일괄 감정 분석 시작: 모든 일기 청크 분석 중...")
 print("==============================================")
 
 all_analysis_reports = []
+report_cache = ReportCache()
+cache_fingerprint = chain_fingerprint(emotion_chain)
 
 for i, chunk in enumerate(processed_documents):
     entry_id = chunk.metadata.get('entry_id', 'Unknown')
     print(f"--- [분석 중] 청크 번호: {i+1}/{len(processed_documents)} ---")
+
+    # 같은 내용의 청크를 이미 분석했다면 LLM을 호출하지 않습니다.
+    cache_key = make_cache_key(chunk.page_content, cache_fingerprint)
+    cached_result = report_cache.get(cache_key)
+    if cached_result is not None:
+        report_data = cached_result.model_dump()
+        report_data['metadata'] = chunk.metadata
+        all_analysis_reports.append(report_data)
+        print(f"✅ 캐시 사용 (ID: {entry_id})")
+        continue
     
     try:
         analysis_result = emotion_chain.invoke(
@@ -106,6 +120,7 @@ for i, chunk in enumerate(processed_documents):
                 "format_instructions": parser.get_format_instructions(),
             }
         )
+        report_cache.put(cache_key, analysis_result)
         report_data = analysis_result.model_dump()
         report_data['metadata'] = chunk.metadata
         all_analysis_reports.append(report_data)
@@ -116,6 +131,7 @@ for i, chunk in enumerate(processed_documents):
     
     time.sleep(1) 
 
+report_cache.close()
 print("\n🎉 모든 일기 분석 완료!")
 output_file_path = "./emotion-reports.json" # 파일명 하이픈 적용
 try:
@@ -177,12 +193,11 @@ print("🔍 RAG 시스템 구축 및 테스트 시작...")
 print("==============================================")
 
 try:
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        api_key=GEMINI_API_KEY
-    )
+    # EMBEDDING_BACKEND 환경 변수로 Gemini/로컬 ONNX/해시 임베딩 중 선택 (기본: auto)
+    embeddings = get_embeddings(api_key=GEMINI_API_KEY)
 
-    vectorstore = Chroma.from_documents(
+    # 청크 수백 개의 top-3 검색이므로 DB 없이 메모리 안의 벡터 행렬로 검색합니다.
+    vectorstore = FlatVectorStore.from_documents(
         documents=processed_documents, 
         embedding=embeddings
     )
@@ -217,9 +232,8 @@ try:
     print(rag_response.content)
     print("------------------\n")
         
-    vectorstore.delete_collection()
-    print("✅ RAG 시스템 테스트 완료. 메모리 정리.")
+    print("✅ RAG 시스템 테스트 완료.")
 
 except Exception as e:
     print(f"❌ RAG 실행 중 오류 발생: {e}")
-    print("Embedding 모델(embedding-001) 권한 또는 라이브러리 설치를 확인하세요.")
\ No newline at end of file
+    print("임베딩 백엔드(EMBEDDING_BACKEND) 설정, 모델 권한 또는 라이브러리 설치를 확인하세요.")
\ No newline at end of file
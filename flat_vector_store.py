@@ -0,0 +1,487 @@
+# 파일 이름: flat_vector_store.py (언더바 사용 필수)
+# Chroma 대신 쓰는 가벼운 프로세스 내 벡터 스토어 (LangChain VectorStore 인터페이스).
+# 일기 청크 수천~수만 개의 top-k 검색은 행렬 곱 한 번이면 충분하므로, 서버/DB 없이
+# 디스크의 벡터 행렬을 np.memmap으로 열고 NumPy 내적 + argpartition으로 정확한(exact) 검색을 합니다.
+#
+# 저장 형식 (디렉터리 하나 = 컬렉션 하나, 모두 뒤에 이어 쓰기만 하는 파일):
+#   meta.json     : 버전, 차원, 저장 자료형(float32 | int8)
+#   vectors.f32/.i8: 정규화된 벡터 행렬 (int8이면 행별 배율 scales.f32와 함께 저장, 메모리 1/4)
+#   ids.txt       : 행 번호 순서의 문서 ID
+#   columns.i64   : 필터용 숫자 열 (date_num, entry_id)
+#   alive.u8      : 삭제 표시 비트맵 (삭제는 0으로 바꾸기만 하고, 죽은 행이 더 많아지면 compact()로 다시 씁니다)
+#   records.jsonl : 본문 + 메타데이터 (offsets.u64의 행별 위치로 검색 결과만 읽습니다)
+# compact()는 compact.tmp/에 새 파일을 다 쓴 뒤 compact.done/으로 이름을 바꾸고 하나씩 os.replace합니다.
+# 옮기는 도중 끊겨도 다음 _load()가 compact.done/의 나머지를 마저 옮깁니다.
+
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+STORE_VERSION = 1
+FILTER_COLUMNS = ("date_num", "entry_id")   # Chroma `where` 조건으로 거를 수 있는 메타데이터
+MISSING = np.iinfo(np.int64).min            # 필터 열에 값이 없는 행
+SEARCH_BLOCK_ROWS = 512                     # int8 행렬을 float32로 바꿔 곱할 때 한 번에 처리할 행 수 (CPU 캐시 크기)
+DTYPES = {"float32": (np.float32, "vectors.f32"), "int8": (np.int8, "vectors.i8")}
+STORE_FILES = ("records.jsonl", "vectors.f32", "vectors.i8", "scales.f32", "columns.i64",
+               "alive.u8", "offsets.u64", "ids.txt", "meta.json")
+COMPACT_TMP, COMPACT_DONE = "compact.tmp", "compact.done"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _quantize(matrix: np.ndarray):
+    """행마다 최댓값 기준 대칭 int8 양자화. (정수 행렬, 행별 배율)"""
+    scales = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127.0
+    quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def _compare(values: np.ndarray, op: str, operand) -> np.ndarray:
+    present = values != MISSING
+    if op == "$eq":
+        return present & (values == operand)
+    if op == "$ne":
+        return values != operand
+    if op == "$gt":
+        return present & (values > operand)
+    if op == "$gte":
+        return present & (values >= operand)
+    if op == "$lt":
+        return present & (values < operand)
+    if op == "$lte":
+        return present & (values <= operand)
+    if op == "$in":
+        return present & np.isin(values, np.asarray(list(operand), dtype=np.int64))
+    if op == "$nin":
+        return ~np.isin(values, np.asarray(list(operand), dtype=np.int64))
+    raise ValueError(f"지원하지 않는 필터 연산자: {op}")
+
+
+class FlatVectorStore(VectorStore):
+    """memmap 벡터 행렬 + NumPy top-k로 검색하는 프로세스 내 벡터 스토어.
+
+    유사도는 코사인 유사도(클수록 가까움)이며, 필터는 Chroma `where` 문법 중
+    $and/$or와 FILTER_COLUMNS 열의 비교($eq, $ne, $gt, $gte, $lt, $lte, $in, $nin)를 지원합니다.
+    persist_directory가 None이면 디스크에 저장하지 않고 메모리에서만 동작합니다.
+    """
+
+    def __init__(self, embedding_function: Embeddings, persist_directory: Optional[str] = None,
+                 dtype: str = "float32"):
+        if dtype not in DTYPES:
+            raise ValueError(f"알 수 없는 벡터 자료형: {dtype} (선택: {', '.join(DTYPES)})")
+        self.embedding_function = embedding_function
+        self.persist_directory = persist_directory
+        self.dtype = dtype
+        self.dim = None
+
+        self.ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self.columns = np.zeros((0, len(FILTER_COLUMNS)), dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.offsets = np.zeros(0, dtype=np.uint64)
+        self._records: List[dict] = []      # 메모리 모드에서만 사용
+        self._matrix = None                 # 메모리 모드의 벡터 행렬 (디스크 모드는 memmap)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._vectors = None
+        self._lock = threading.Lock()
+        if persist_directory:
+            os.makedirs(persist_directory, exist_ok=True)
+            self._load()
+
+    # --- 디스크 ---
+    def _path(self, name: str) -> str:
+        return os.path.join(self.persist_directory, name)
+
+    def _finish_compaction(self):
+        """끝까지 쓰인 compact.done/이 남아 있으면 나머지 파일을 옮기고, 쓰다 만 compact.tmp/는 버립니다."""
+        done = self._path(COMPACT_DONE)
+        if os.path.isdir(done):
+            with open(os.path.join(done, "files.json"), encoding="utf-8") as f:
+                names = json.load(f)
+            for name in STORE_FILES:
+                if name in names:
+                    if os.path.exists(os.path.join(done, name)):   # 이미 옮긴 파일은 건너뜁니다.
+                        os.replace(os.path.join(done, name), self._path(name))
+                elif os.path.exists(self._path(name)):
+                    os.remove(self._path(name))   # 새 스토어에는 없는 파일 (살아 있는 행이 없으면 meta.json까지)
+            shutil.rmtree(done)
+        shutil.rmtree(self._path(COMPACT_TMP), ignore_errors=True)
+
+    def _truncate(self, name: str, size: int):
+        path = self._path(name)
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+    def _read_array(self, name: str, dtype) -> np.ndarray:
+        path = self._path(name)
+        return np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.zeros(0, dtype=dtype)
+
+    def _load(self):
+        self._finish_compaction()
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION or meta.get("dtype") != self.dtype:
+            raise ValueError(f"{self.persist_directory}는 다른 형식의 벡터 스토어입니다: {meta}")
+        self.dim = meta["dim"]
+        np_dtype, vectors_name = DTYPES[self.dtype]
+
+        # meta.json은 첫 행보다 먼저 쓰이므로, 행 파일이 아직 없으면 0행으로 봅니다.
+        ids = []
+        if os.path.exists(self._path("ids.txt")):
+            with open(self._path("ids.txt"), encoding="utf-8") as f:
+                ids = f.read().split("\n")[:-1]
+        columns = self._read_array("columns.i64", np.int64).reshape(-1, len(FILTER_COLUMNS))
+        alive = self._read_array("alive.u8", np.uint8).astype(bool)
+        offsets = self._read_array("offsets.u64", np.uint64)
+        vectors_size = os.path.getsize(self._path(vectors_name)) if os.path.exists(self._path(vectors_name)) else 0
+        rows = min(len(ids), len(columns), len(alive), len(offsets),
+                   vectors_size // (np.dtype(np_dtype).itemsize * self.dim))
+        if self.dtype == "int8":
+            self._scales = self._read_array("scales.f32", np.float32)
+            rows = min(rows, len(self._scales))
+            self._scales = self._scales[:rows]
+        # 벡터를 먼저 쓰고 나머지를 나중에 쓰므로, 중간에 끊겼다면 모든 파일에 다 있는 행까지만 씁니다.
+        # 디스크의 파일도 같은 행 수로 잘라야 다음 이어 쓰기의 행 번호가 파일마다 어긋나지 않습니다.
+        self._truncate(vectors_name, rows * np.dtype(np_dtype).itemsize * self.dim)
+        if self.dtype == "int8":
+            self._truncate("scales.f32", rows * np.dtype(np.float32).itemsize)
+        self._truncate("columns.i64", rows * columns.itemsize * len(FILTER_COLUMNS))
+        self._truncate("alive.u8", rows)
+        self._truncate("offsets.u64", rows * offsets.itemsize)
+        self._truncate("ids.txt", sum(len(doc_id.encode("utf-8")) + 1 for doc_id in ids[:rows]))
+        self.ids = ids[:rows]
+        self.columns, self.alive, self.offsets = columns[:rows], alive[:rows], offsets[:rows]
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self.ids) if self.alive[row]}
+
+    def _write_meta(self):
+        with open(self._path("meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_VERSION, "dim": self.dim, "dtype": self.dtype}, f)
+
+    def _append_file(self, name: str, data: bytes):
+        with open(self._path(name), "ab") as f:
+            f.write(data)
+
+    def _write_at(self, name: str, row: int, item: np.ndarray):
+        with open(self._path(name), "r+b") as f:
+            f.seek(row * item.nbytes)
+            f.write(item.tobytes())
+
+    @property
+    def vectors(self):
+        """저장된 전체 벡터 행렬 (행 수 x 차원). 디스크 모드에서는 읽기 전용 memmap."""
+        if not self.persist_directory:
+            return self._matrix
+        if self._vectors is None and self.ids:
+            np_dtype, vectors_name = DTYPES[self.dtype]
+            self._vectors = np.memmap(self._path(vectors_name), dtype=np_dtype, mode="r",
+                                      shape=(len(self.ids), self.dim))
+        return self._vectors
+
+    def _read_records(self, rows: Iterable[int]) -> List[dict]:
+        rows = list(rows)
+        if not rows:
+            return []
+        if not self.persist_directory:
+            return [self._records[int(self.offsets[row])] for row in rows]
+        records = []
+        with open(self._path("records.jsonl"), "rb") as f:
+            for row in rows:
+                f.seek(int(self.offsets[row]))
+                records.append(json.loads(f.readline()))
+        return records
+
+    def _append_records(self, records: List[dict]) -> np.ndarray:
+        """본문/메타데이터를 records.jsonl에 이어 쓰고 각 줄의 시작 위치를 반환합니다."""
+        if not self.persist_directory:
+            start = len(self._records)
+            self._records.extend(records)
+            return np.arange(start, start + len(records), dtype=np.uint64)
+        lines = [json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records]
+        path = self._path("records.jsonl")
+        start = os.path.getsize(path) if os.path.exists(path) else 0
+        offsets = start + np.cumsum([0] + [len(line) for line in lines[:-1]], dtype=np.uint64)
+        self._append_file("records.jsonl", b"".join(lines))
+        return offsets.astype(np.uint64)
+
+    @staticmethod
+    def _filter_values(metadata: dict) -> List[int]:
+        values = []
+        for name in FILTER_COLUMNS:
+            value = (metadata or {}).get(name)
+            values.append(int(value) if isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+                          else MISSING)
+        return values
+
+    # --- 쓰기 (모두 뒤에 이어 쓰기) ---
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [doc_id or uuid.uuid4().hex for doc_id in ids] if ids else [uuid.uuid4().hex for _ in texts]
+        if any("\n" in doc_id for doc_id in ids):
+            raise ValueError("문서 ID에는 줄바꿈을 쓸 수 없습니다.")
+        matrix = _normalize(self.embedding_function.embed_documents(texts))
+        with self._lock:
+            self._append_rows(ids, texts, metadatas, matrix)
+        return ids
+
+    def _append_rows(self, ids, texts, metadatas, matrix):
+        if self.dim is None:
+            self.dim = int(matrix.shape[1])
+            if self.persist_directory:
+                self._write_meta()
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"벡터 차원이 다릅니다: 저장된 {self.dim}, 새 벡터 {matrix.shape[1]}")
+
+        # 같은 ID가 이미 있으면 예전 행은 삭제 표시만 하고 새 행을 뒤에 붙입니다.
+        self._mark_deleted([self._row_of[doc_id] for doc_id in ids if doc_id in self._row_of])
+        columns = np.asarray([self._filter_values(metadata) for metadata in metadatas], dtype=np.int64)
+        offsets = self._append_records([{"id": doc_id, "text": text, "metadata": metadata}
+                                        for doc_id, text, metadata in zip(ids, texts, metadatas)])
+        stored, scales = (_quantize(matrix) if self.dtype == "int8" else (matrix, None))
+
+        if self.persist_directory:
+            # 벡터를 먼저 쓰고 ID를 마지막에 씁니다. (중간에 끊기면 _load()가 짧은 쪽에 맞춥니다)
+            self._append_file(DTYPES[self.dtype][1], stored.tobytes())
+            if scales is not None:
+                self._append_file("scales.f32", scales.tobytes())
+            self._append_file("columns.i64", columns.tobytes())
+            self._append_file("alive.u8", np.ones(len(ids), dtype=np.uint8).tobytes())
+            self._append_file("offsets.u64", offsets.tobytes())
+            self._append_file("ids.txt", "".join(f"{doc_id}\n" for doc_id in ids).encode("utf-8"))
+        else:
+            self._matrix = stored if self._matrix is None else np.concatenate([self._matrix, stored])
+
+        start = len(self.ids)
+        self.ids.extend(ids)
+        self._row_of.update((doc_id, start + i) for i, doc_id in enumerate(ids))
+        self.columns = np.concatenate([self.columns, columns])
+        self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+        self.offsets = np.concatenate([self.offsets, offsets])
+        if scales is not None:
+            self._scales = np.concatenate([self._scales, scales])
+        self._vectors = None   # 행이 늘었으므로 memmap을 다시 엽니다.
+
+    def _mark_deleted(self, rows: List[int]):
+        if not rows:
+            return
+        alive = self.alive.copy()   # 검색 중인 스레드가 보던 배열은 그대로 둡니다.
+        alive[rows] = False
+        self.alive = alive
+        for row in rows:
+            self._row_of.pop(self.ids[row], None)
+            if self.persist_directory:
+                self._write_at("alive.u8", row, np.zeros(1, dtype=np.uint8))
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """삭제 표시만 합니다. 죽은 행이 살아 있는 행보다 많아지면 파일을 다시 써서 공간을 회수합니다."""
+        if ids is None:
+            ids = list(self._row_of)
+        with self._lock:
+            self._mark_deleted([self._row_of[doc_id] for doc_id in ids if doc_id in self._row_of])
+            if len(self.ids) - len(self._row_of) > len(self._row_of):
+                self._compact_locked()
+        return True
+
+    def update_metadata(self, ids: List[str], metadatas: List[dict]):
+        """임베딩은 그대로 두고 메타데이터(필터 열 포함)만 바꿉니다."""
+        with self._lock:
+            pairs = [(self._row_of[doc_id], metadata) for doc_id, metadata in zip(ids, metadatas)
+                     if doc_id in self._row_of]
+            if not pairs:
+                return
+            rows = [row for row, _ in pairs]
+            records = self._read_records(rows)
+            offsets = self._append_records([{**record, "metadata": metadata}
+                                            for record, (_, metadata) in zip(records, pairs)])
+            columns, new_offsets = self.columns.copy(), self.offsets.copy()
+            for (row, metadata), offset in zip(pairs, offsets):
+                columns[row] = self._filter_values(metadata)
+                new_offsets[row] = offset
+                if self.persist_directory:
+                    self._write_at("columns.i64", row, columns[row])
+                    self._write_at("offsets.u64", row, new_offsets[row:row + 1])
+            self.columns, self.offsets = columns, new_offsets
+
+    def compact(self):
+        """삭제 표시된 행과 예전 메타데이터 줄을 빼고 모든 파일을 다시 씁니다."""
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        rows = np.flatnonzero(self.alive)
+        records = self._read_records(rows.tolist())
+        vectors = np.asarray(self.vectors[rows]) if len(rows) else None
+        scales = self._scales[rows] if self.dtype == "int8" else None
+        # int8 행은 다시 양자화하지 않도록 배율을 곱해 float32로 되돌린 뒤 붙입니다. (같은 값으로 양자화됩니다)
+        matrix = vectors.astype(np.float32) * scales[:, None] if scales is not None and len(rows) else vectors
+
+        if not self.persist_directory:
+            self._reset()
+            if matrix is not None:
+                self._append_rows([record["id"] for record in records], [record["text"] for record in records],
+                                  [record["metadata"] for record in records], matrix)
+            return
+
+        # 살아 있는 파일은 그대로 둔 채 compact.tmp/에 새 스토어를 다 쓰고,
+        # 디렉터리 이름 바꾸기(원자적)로 완성 표시를 한 뒤 파일을 하나씩 os.replace합니다.
+        tmp = self._path(COMPACT_TMP)
+        shutil.rmtree(tmp, ignore_errors=True)
+        compacted = FlatVectorStore(self.embedding_function, tmp, self.dtype)
+        if matrix is not None:
+            compacted._append_rows([record["id"] for record in records], [record["text"] for record in records],
+                                   [record["metadata"] for record in records], matrix)
+        with open(os.path.join(tmp, "files.json"), "w", encoding="utf-8") as f:
+            json.dump([name for name in STORE_FILES if os.path.exists(os.path.join(tmp, name))], f)
+        os.replace(tmp, self._path(COMPACT_DONE))
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.dim = None
+        self.ids, self._row_of, self._records = [], {}, []
+        self.columns = np.zeros((0, len(FILTER_COLUMNS)), dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.offsets = np.zeros(0, dtype=np.uint64)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._matrix = self._vectors = None
+
+    # --- 읽기 ---
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> dict:
+        """Chroma `get()`과 같은 모양({"ids", "metadatas", "documents"})으로 살아 있는 문서를 돌려줍니다."""
+        include = include or ["metadatas", "documents"]
+        with self._lock:
+            doc_ids = list(self._row_of) if ids is None else [i for i in ids if i in self._row_of]
+            records = (self._read_records(self._row_of[i] for i in doc_ids)
+                       if {"metadatas", "documents"} & set(include) else [])
+        result = {"ids": doc_ids}
+        if "metadatas" in include:
+            result["metadatas"] = [record["metadata"] for record in records]
+        if "documents" in include:
+            result["documents"] = [record["text"] for record in records]
+        return result
+
+    def get_by_ids(self, ids, /) -> List[Document]:
+        with self._lock:
+            rows = [self._row_of[i] for i in ids if i in self._row_of]
+            records = self._read_records(rows)
+        return [Document(id=r["id"], page_content=r["text"], metadata=r["metadata"]) for r in records]
+
+    def _filter_mask(self, where: Optional[dict], columns: np.ndarray, alive: np.ndarray) -> np.ndarray:
+        if not where:
+            return alive
+        mask = np.ones(len(alive), dtype=bool)
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                parts = [self._filter_mask(part, columns, alive) for part in condition]
+                combined = np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts)
+                mask &= combined
+                continue
+            if key not in FILTER_COLUMNS:
+                raise ValueError(f"필터할 수 없는 메타데이터: {key} (선택: {', '.join(FILTER_COLUMNS)})")
+            values = columns[:, FILTER_COLUMNS.index(key)]
+            if isinstance(condition, dict):
+                for op, operand in condition.items():
+                    mask &= _compare(values, op, operand)
+            else:
+                mask &= _compare(values, "$eq", condition)
+        return mask & alive
+
+    def _search(self, query_vector, k: int, where: Optional[dict]) -> List[Tuple[int, float]]:
+        with self._lock:   # 쓰기 중이 아닐 때의 배열들을 한꺼번에 잡아 둡니다.
+            vectors, scales, columns, alive = self.vectors, self._scales, self.columns, self.alive
+        if vectors is None or k <= 0:
+            return []
+        query = _normalize(query_vector)
+        mask = self._filter_mask(where, columns, alive)
+        if mask.all():
+            rows = None
+        else:
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                return []
+
+        # 후보가 적으면 그 행만 모아서, 많으면 전체를 곱한 뒤 걸러진 행을 지웁니다.
+        gather = rows is not None and len(rows) * 4 < len(mask)
+        matrix = vectors[rows] if gather else vectors
+        if self.dtype == "int8":
+            # 캐시에 들어가는 작은 블록 단위로 float32 버퍼에 옮겨 곱합니다. (전체 복사본을 만들지 않음)
+            scores = np.empty(len(matrix), dtype=np.float32)
+            buffer = np.empty((min(SEARCH_BLOCK_ROWS, len(matrix)), self.dim), dtype=np.float32)
+            for start in range(0, len(matrix), SEARCH_BLOCK_ROWS):
+                block = matrix[start:start + SEARCH_BLOCK_ROWS]
+                converted = buffer[:len(block)]
+                converted[...] = block
+                scores[start:start + len(block)] = converted @ query
+            scores *= scales[rows] if gather else scales
+        else:
+            scores = np.asarray(matrix @ query, dtype=np.float32)
+        if rows is not None and not gather:
+            scores = np.where(mask, scores, -np.inf)
+            candidates = len(rows)
+        else:
+            candidates = len(scores)
+
+        k = min(k, candidates)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        result_rows = rows[top] if gather else top
+        return [(int(row), float(scores[i])) for row, i in zip(result_rows, top)]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        """(문서, 코사인 유사도) 목록. 유사도가 큰 순서입니다."""
+        hits = self._search(embedding, k, filter)
+        with self._lock:
+            records = self._read_records(row for row, _ in hits)
+        return [(Document(id=record["id"], page_content=record["text"], metadata=record["metadata"]), score)
+                for record, (_, score) in zip(records, hits)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0   # 코사인 유사도 [-1, 1] → [0, 1]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, persist_directory: Optional[str] = None,
+                   dtype: str = "float32", **kwargs: Any) -> "FlatVectorStore":
+        store = cls(embedding, persist_directory=persist_directory, dtype=dtype)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
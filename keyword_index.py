@@ -0,0 +1,180 @@
+# 파일 이름: keyword_index.py (언더바 사용 필수)
+# 임베딩 API 없이 동작하는 한국어 문자 n-gram BM25 키워드 색인과, 벡터 검색 결과와의 하이브리드 결합.
+
+import os
+import pickle
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from data_preparer import date_to_num # 언더바 파일명으로 임포트
+from vector_index import chunk_id
+
+# 벡터 스토어(flat/chroma) 폴더와 따로 둡니다. (어떤 벡터 스토어를 쓰든, keyword 모드여도 같은 위치)
+DEFAULT_INDEX_PATH = "./.cache/keyword/keyword-index.pkl"
+INDEX_VERSION = 1
+RRF_K = 60
+RETRIEVAL_MODES = ("hybrid", "keyword", "vector")
+
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+")
+
+
+def tokenize(text: str, ngram_sizes=(2, 3)) -> List[str]:
+    """한국어는 어절 안에서 문자 2/3-gram으로, 영문/숫자는 단어 그대로 나눕니다.
+
+    조사가 붙어도('찰리가', '찰리를') '찰리' 같은 이름을 찾을 수 있도록 형태소 분석 대신 n-gram을 씁니다.
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text):
+        if not ("가" <= token[0] <= "힣") or len(token) == 1:
+            terms.append(token)
+            continue
+        for n in ngram_sizes:
+            terms.extend(token[i:i + n] for i in range(len(token) - n + 1))
+    return terms
+
+
+class KeywordIndex:
+    """메모리 안의 BM25 역색인. 검색은 미리 계산한 BM25 가중치를 더하기만 하므로 1ms 이내로 끝납니다."""
+
+    def __init__(self):
+        self.ids = []
+        self.documents = []
+        self.postings = {}     # term -> (문서 번호 배열, BM25 가중치 배열)
+        self.date_num = np.zeros(0, dtype=np.int32)
+        self.entry_id = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def build(cls, documents, k1: float = 1.5, b: float = 0.75):
+        index = cls()
+        index.documents = list(documents)
+        index.ids = [chunk_id(doc) for doc in index.documents]
+        n_docs = len(index.documents)
+
+        term_docs = defaultdict(list)
+        term_tfs = defaultdict(list)
+        lengths = np.zeros(n_docs, dtype=np.float32)
+        for i, doc in enumerate(index.documents):
+            counts = Counter(tokenize(doc.page_content))
+            lengths[i] = sum(counts.values())
+            for term, tf in counts.items():
+                term_docs[term].append(i)
+                term_tfs[term].append(tf)
+
+        avg_length = float(lengths.mean()) if n_docs else 1.0
+        norm = k1 * (1 - b + b * lengths / max(avg_length, 1.0))
+        for term, docs in term_docs.items():
+            docs = np.asarray(docs, dtype=np.int32)
+            tfs = np.asarray(term_tfs[term], dtype=np.float32)
+            idf = np.log(1.0 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            index.postings[term] = (docs, (idf * tfs * (k1 + 1) / (tfs + norm[docs])).astype(np.float32))
+
+        index.date_num = np.asarray([doc.metadata.get("date_num", 0) for doc in index.documents], dtype=np.int32)
+        index.entry_id = np.asarray([doc.metadata.get("entry_id", -1) for doc in index.documents], dtype=np.int64)
+        return index
+
+    def search(self, query: str, k: int = 3, time_range=None, entry_ids=None):
+        """(Document, 점수) 목록을 점수 순으로 반환합니다. time_range/entry_ids로 후보를 먼저 제한할 수 있습니다."""
+        if not self.documents:
+            return []
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                np.add.at(scores, posting[0], posting[1])
+
+        if time_range:
+            start, end = time_range
+            scores[(self.date_num < date_to_num(start)) | (self.date_num > date_to_num(end))] = 0.0
+        if entry_ids is not None:
+            scores[~np.isin(self.entry_id, np.asarray(list(entry_ids), dtype=np.int64))] = 0.0
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def save(self, path: str = DEFAULT_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump({"version": INDEX_VERSION, "index": self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str = DEFAULT_INDEX_PATH):
+        """저장된 색인을 불러옵니다. 없거나 버전이 다르면 None."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        return data["index"] if data.get("version") == INDEX_VERSION else None
+
+
+def sync_keyword_index(documents, path: str = DEFAULT_INDEX_PATH) -> KeywordIndex:
+    """저장된 키워드 색인을 불러오고, 청크 구성이 바뀌었으면 다시 만들어 저장합니다."""
+    documents = list(documents)
+    index = KeywordIndex.load(path)
+    if (index is not None and index.ids == [chunk_id(doc) for doc in documents]
+            and [doc.metadata for doc in index.documents] == [doc.metadata for doc in documents]):
+        return index
+    index = KeywordIndex.build(documents)
+    index.save(path)
+    print(f"✅ 키워드 색인 생성 완료: 청크 {len(documents)}개, 용어 {len(index.postings)}개.")
+    return index
+
+
+def reciprocal_rank_fusion(result_lists, k: int = RRF_K) -> List[Document]:
+    """여러 검색 결과 목록을 순위 역수 합(RRF)으로 합칩니다. 같은 청크는 하나로 모읍니다."""
+    scores = defaultdict(float)
+    documents = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            doc_id = chunk_id(doc)
+            scores[doc_id] += 1.0 / (k + rank + 1)
+            documents.setdefault(doc_id, doc)
+    return [documents[doc_id] for doc_id in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """BM25 키워드 검색과 벡터 검색을 RRF로 합치는 리트리버.
+
+    mode가 'keyword'이면 임베딩 API를 전혀 호출하지 않으므로 오프라인에서도 동작합니다.
+    vector_retriever로 filtered_retriever.FilteredDiaryRetriever를 넘기면 날짜/감정 조건이 양쪽에 모두 적용됩니다.
+    """
+
+    keyword_index: Any
+    vector_retriever: Optional[Any] = None
+    k: int = 3
+    mode: str = "hybrid"   # 'hybrid' | 'keyword' | 'vector'
+
+    def model_post_init(self, __context) -> None:
+        # 검색할 때가 아니라 만들 때 잘못된 조합을 알려 줍니다.
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"알 수 없는 검색 방식: {self.mode} (선택: {', '.join(RETRIEVAL_MODES)})")
+        if self.mode == "vector" and self.vector_retriever is None:
+            raise ValueError("vector 검색 방식에는 vector_retriever가 필요합니다. (임베딩 없이 검색하려면 keyword)")
+        if self.keyword_index is None and self.vector_retriever is None:
+            raise ValueError("keyword_index와 vector_retriever 중 하나는 있어야 합니다.")
+        if self.mode == "keyword" and self.keyword_index is None:
+            raise ValueError("keyword 검색 방식에는 keyword_index가 필요합니다.")
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        time_range, entry_ids = None, None
+        if self.vector_retriever is not None and hasattr(self.vector_retriever, "get_conditions"):
+            time_range, entry_ids = self.vector_retriever.get_conditions(query)
+
+        if self.mode == "vector" or (self.mode == "hybrid" and self.keyword_index is None):
+            return self.vector_retriever.invoke(query)[:self.k]
+
+        candidates = self.k * 2
+        keyword_docs = [doc for doc, _ in self.keyword_index.search(query, candidates, time_range, entry_ids)]
+        if self.mode == "keyword" or self.vector_retriever is None:
+            return keyword_docs[:self.k]
+
+        vector_docs = self.vector_retriever.invoke(query)
+        return reciprocal_rank_fusion([vector_docs, keyword_docs])[:self.k]
@@ -1,83 +1,75 @@
 # 파일 이름: main.py (언더바 파일들을 임포트)
 
-import json
-import time
-from data_preparer import prepare_data # 언더바 파일에서 임포트
-from analysis_chains import get_emotion_analysis_chain, get_final_report_chain # 언더바 파일에서 임포트
-from langchain_community.vectorstores import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_core.runnables import RunnablePassthrough
-from dotenv import load_dotenv
-import os
-
-# 환경 변수 로드
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY를 .env 파일에 정확히 입력했는지 확인하세요.")
-
-# 🌟🌟🌟 추가할 코드 🌟🌟🌟
-# Google SDK가 기본적으로 찾는 환경 변수 이름에도 키를 설정합니다.
-os.environ["GOOGLE_API_KEY"] = GEMINI_API_KEY 
-# 🌟🌟🌟🌟🌟🌟🌟🌟🌟🌟🌟🌟
-
-def format_docs(docs):
-    """RAG 검색 결과를 하나의 문자열로 합치는 헬퍼 함수"""
-    return "\n\n".join(doc.page_content for doc in docs)
+def main():
+    """모든 단계를 실행하고 결과를 출력/저장합니다. (단계별 실행은 `python cli.py --help` 참고)"""
 
+    # 무거운 라이브러리(LangChain, Gemini SDK, Chroma)는 임포트 시점이 아니라 실행할 때 불러옵니다.
+    from data_preparer import DEFAULT_DATA_PATH, stream_documents # 언더바 파일에서 임포트
+    from analysis_chains import get_api_key, get_batch_emotion_analysis_chain, get_emotion_analysis_chain, get_final_report_chain, get_period_summary_chain # 언더바 파일에서 임포트
+    from concurrent_analysis import analyze_chunks
+    from report_cache import ReportCache, SummaryCache
+    from run_journal import RunJournal
+    from report_store import DEFAULT_JSONL_PATH, DEFAULT_NPZ_PATH, JsonlReportWriter, export_npz
+    from report_pipeline import build_final_report
+    from rag_service import build_rag_chain
+    from embedding_backends import get_embeddings
+    from emotion_taxonomy import EmotionTaxonomy
+    from tracing import span
 
-def main():
-    """모든 단계를 실행하고 결과를 출력/저장합니다."""
+    # 환경 변수 로드 (.env의 GEMINI_API_KEY, 없으면 오류)
+    GEMINI_API_KEY = get_api_key()
     
-    # 1. 데이터 준비 
+    # 1. 데이터 준비 (파일을 일기 단위로 읽으며 필요할 때마다 Document를 만듭니다)
     print("1. 데이터 준비 중...")
     try:
-        processed_documents = prepare_data()
+        processed_documents = stream_documents(DEFAULT_DATA_PATH)
     except FileNotFoundError as e:
         print(f"❌ 오류: {e}")
         return
-        
-    print(f"✅ 데이터 로딩 완료. 총 {len(processed_documents)}개 청크.")
     
     # 2. 분석 체인 로드 
     emotion_chain = get_emotion_analysis_chain()
     final_report_chain = get_final_report_chain()
     
-    # 3. 일괄 분석
+    # 3. 일괄 분석 (요청 한도 안에서 동시 실행)
     print("\n2. 일괄 감정 분석 시작...")
-    all_analysis_reports = []
-    
-    for i, chunk in enumerate(processed_documents):
-        try:
-            # Pydantic Output Parser의 format_instructions를 가져오는 방식 변경
-            analysis_result = emotion_chain.invoke(
-                {
-                    "diary_chunk": chunk.page_content,
-                    "format_instructions": emotion_chain.steps[-1].get_format_instructions(), # 파서에서 명령어 가져오기
-                }
-            )
-            report_data = analysis_result.model_dump()
-            report_data['metadata'] = chunk.metadata
-            all_analysis_reports.append(report_data)
-            print(f"  [+] 청크 {i+1} 분석 완료.")
-        except Exception as e:
-            print(f"  [-] 청크 {i+1} 분석 오류: {e}")
-        time.sleep(1) 
+    report_cache = ReportCache()
+    # 짧은 청크는 토큰 예산(ANALYSIS_BATCH_TOKENS) 안에서 여러 개를 묶어 한 번에 분석합니다.
+    # 청크별 진행 상태와 결과는 실행 기록에 바로 저장되므로, 중간에 멈추면 `python cli.py resume`으로 이어갈 수 있습니다.
+    # 결과는 청크 분석이 끝날 때마다 JSONL에 한 줄씩 바로 추가됩니다.
+    journal = RunJournal(data_path=DEFAULT_DATA_PATH)
+    report_writer = JsonlReportWriter(DEFAULT_JSONL_PATH)
+    with span("analyze"):
+        all_analysis_reports = analyze_chunks(
+            processed_documents, emotion_chain, cache=report_cache, batch_chain=get_batch_emotion_analysis_chain(),
+            journal=journal, on_report=report_writer.write,
+            # 감정 이름은 대표 감정 + 정수 ID로 맞춥니다. (처음 보는 이름만 임베딩으로 가장 가까운 감정을 찾음)
+            taxonomy=EmotionTaxonomy(embeddings=get_embeddings(api_key=GEMINI_API_KEY)),
+        )
+    report_writer.close()
+    journal.finish()
+    failed_count = journal.counts()["failed"]
+    journal.close()
+    if failed_count:
+        print(f"⚠️ 분석에 실패한 청크 {failed_count}개는 `python cli.py retry-failed`로 다시 분석할 수 있습니다.")
+    print(f"✅ 분석 완료. 총 {len(all_analysis_reports)}개 청크. "
+          f"(캐시 사용 {report_cache.hits}건, 새 LLM 분석 {report_cache.misses}건)")
+    report_cache.close()
 
-    # 4. JSON 저장
-    output_file_path = "./emotion-reports.json" # 출력 파일은 하이픈 사용
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        json.dump(all_analysis_reports, f, ensure_ascii=False, indent=4)
-    print(f"✅ 분석 결과 JSON 저장 완료: {output_file_path}")
+    # 4. 저장 (JSONL은 분석 중에 이미 기록됨, 통계용 열 형식 .npz 추가)
+    export_npz(all_analysis_reports, DEFAULT_NPZ_PATH)
+    print(f"✅ 분석 결과 저장 완료: {DEFAULT_JSONL_PATH} (통계용: {DEFAULT_NPZ_PATH})")
 
     
     # 5. 종합 보고서 생성 및 저장
     print("\n3. 종합 심리 보고서 생성 중...")
-    reports_string = json.dumps(all_analysis_reports, ensure_ascii=False, indent=2)
-
-    final_report = final_report_chain.invoke({"analysis_data": reports_string})
-    report_content = final_report.content
+    # 주 → 월 → 전체 순서로 요약해 프롬프트 크기를 기간 수에 맞춰 제한합니다.
+    summary_cache = SummaryCache()
+    with span("report"):
+        report_content = build_final_report(
+            all_analysis_reports, final_report_chain, get_period_summary_chain(), cache=summary_cache
+        )
+    summary_cache.close()
     
     report_output_file = "final-psychological-report.md" # 출력 파일은 하이픈 사용
     with open(report_output_file, 'w', encoding='utf-8') as f:
@@ -86,37 +78,27 @@ def main():
     
     # 6. RAG 시스템 구축 및 테스트
     print("\n4. RAG 시스템 구축 및 테스트 시작...")
-    
-    # 이 부분은 main.py 파일 맨 위에서 import 되었어야 합니다.
-    # from dotenv import load_dotenv, os
-    # load_dotenv()
-    # GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-    # 🌟 수정된 코드: embeddings 객체 생성 시 api_key 변수를 명시적으로 전달합니다.
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001", 
-        api_key=GEMINI_API_KEY # <-- 키를 명시적으로 전달
-    )
-    
-    vectorstore = Chroma.from_documents(documents=processed_documents, embedding=embeddings)
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-    
-    # RAG 체인 구축
-    rag_chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
-        | final_report_chain 
-    )
+    # 키워드/벡터 색인 동기화 + 답변 캐시가 붙은 RAG 체인 (RETRIEVAL_MODE 환경 변수로 검색 방식 선택)
+    # 여러 질문을 이어서 하려면 `python rag_service.py`(REPL) 또는 `--port 8000`(HTTP)을 사용하세요.
+    with span("index"):
+        rag_chain = build_rag_chain(all_analysis_reports, DEFAULT_DATA_PATH, api_key=GEMINI_API_KEY)
     
     test_question = "내가 일주일 동안 가장 기뻤던 사건은 무엇이며, 그 날짜는 언제야?"
-    rag_response = rag_chain.invoke({"question": test_question})
+    with span("ask"):
+        rag_response = rag_chain.invoke(test_question)
+    rag_chain.cache.close()
     
     print(f"\n--- RAG 답변 (질문: {test_question}) ---")
     print(rag_response.content)
     print("------------------------------------------")
     
-    vectorstore.delete_collection()
     print("✅ RAG 시스템 테스트 완료. 모듈화된 프로젝트 완성!")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # 단계별 시간/토큰/재시도/캐시 사용을 ./.cache/traces/latest-trace.json에 기록하고 요약 표를 출력합니다.
+    from tracing import trace_run
+
+    with trace_run("main"):
+        main()
\ No newline at end of file
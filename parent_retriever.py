@@ -0,0 +1,138 @@
+# 파일 이름: parent_retriever.py (언더바 사용 필수)
+# 부모-자식 검색: 일기 한 편(부모)을 문장 1~3개짜리 자식 청크로 나눠 색인하고,
+# 검색은 자식 단위로 정확하게 맞춘 뒤 LLM에는 중복 없는 부모 일기(길면 맞은 문장 주변 구간)를 넘깁니다.
+# 큰 청크를 통째로 임베딩하면 여러 사건이 한 벡터에 섞여 k=3 검색이 느슨해지는 문제를 줄입니다.
+
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from data_preparer import entry_header, estimate_tokens, parse_diary_record, split_by_tokens # 언더바 파일명으로 임포트
+from vector_index import chunk_id
+
+CHILD_MAX_TOKENS = 60        # 자식 청크(임베딩 단위) 최대 토큰: 문장 1~3개
+PARENT_WINDOW_TOKENS = 250   # LLM에 넘길 부모 일기 한 편의 최대 토큰 (넘으면 맞은 문장 주변만)
+CHILD_CANDIDATES = 4         # 부모 k개를 채우기 위해 자식을 k x 4개까지 검색합니다.
+WINDOW_GAP = " … "
+
+
+def split_children(parent: Document, max_tokens: int = CHILD_MAX_TOKENS) -> List[str]:
+    """부모 청크의 본문(머리말 제외)을 max_tokens 이하의 문장 묶음으로 나눕니다."""
+    return split_by_tokens(parse_diary_record(parent.page_content)["body"], max_tokens)
+
+
+def join_pieces(pieces: List[str], selected) -> str:
+    """pieces 중 selected 번호만 원래 순서대로 잇습니다. 중간에 빠진 부분은 ' … '로 표시합니다."""
+    parts, previous = [], None
+    for i in sorted(selected):
+        if previous is not None:
+            parts.append(" " if i == previous + 1 else WINDOW_GAP)
+        parts.append(pieces[i])
+        previous = i
+    return "".join(parts)
+
+
+def entry_key(doc: Document) -> str:
+    """일기 한 편을 가리키는 키. 500토큰이 넘어 여러 청크(part)로 나뉜 일기도 같은 키입니다."""
+    entry_no = doc.metadata.get("entry_no")
+    return f"entry:{entry_no}" if entry_no is not None else chunk_id(doc)
+
+
+def group_entries(parents) -> Dict[str, List[Document]]:
+    """부모 청크들을 일기별로 모읍니다. {entry_key: [part 순서의 청크, ...]}"""
+    entries: Dict[str, List[Document]] = {}
+    for parent in parents:
+        entries.setdefault(entry_key(parent), []).append(parent)
+    for pieces in entries.values():
+        pieces.sort(key=lambda doc: doc.metadata.get("part", 0))
+    return entries
+
+
+def stream_child_documents(parents, max_tokens: int = CHILD_MAX_TOKENS):
+    """부모 Document마다 자식 Document를 돌려주는 제너레이터.
+
+    자식은 부모의 메타데이터(date_num, entry_id 등)를 그대로 가지므로 날짜/감정 필터가 자식 검색에도 적용되고,
+    parent_id(부모의 chunk_id)와 child(부모 안의 순서)로 부모를 다시 찾습니다.
+    자식 ID는 문장 해시가 아니라 '{parent_id}:{child}'입니다. 같은 문장이 여러 일기에 있어도 일기마다 따로 색인되고,
+    부모 내용이 바뀌면 parent_id가 바뀌므로 자식도 다시 임베딩됩니다.
+    """
+    for parent in parents:
+        parent_id = chunk_id(parent)
+        for i, text in enumerate(split_children(parent, max_tokens)):
+            yield Document(id=f"{parent_id}:{i}", page_content=text, metadata={
+                **parent.metadata, "doc_type": "diary_sentence", "parent_id": parent_id, "child": i,
+            })
+
+
+class ParentChildRetriever(BaseRetriever):
+    """자식 청크 검색 결과를 부모 일기로 바꿔 돌려주는 리트리버.
+
+    child_retriever(HybridRetriever 등)가 돌려준 순서대로 부모 일기를 모으고 같은 일기는 한 번만 넣습니다.
+    긴 일기가 여러 청크(part)로 나뉘어 있어도 일기(entry_no) 단위로 묶어 한 Document로 돌려줍니다.
+    일기가 max_tokens보다 길면 검색에 맞은 문장부터, 가까운 이웃 문장 순으로 예산 안에서 골라 원래 순서대로 잇습니다.
+    """
+
+    child_retriever: Any
+    parents: Dict[str, Document] = {}          # chunk_id → 부모 청크
+    entries: Dict[str, List[Document]] = {}    # entry_key → 일기의 청크들 (비어 있으면 parents로 만듭니다)
+    k: int = 3
+    max_tokens: int = PARENT_WINDOW_TOKENS
+    child_max_tokens: int = CHILD_MAX_TOKENS
+
+    def model_post_init(self, __context) -> None:
+        if not self.entries:
+            self.entries = group_entries(self.parents.values())
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        matched = {}   # entry_key -> 맞은 (부모 chunk_id, 자식 번호) 목록 (검색 순위 순)
+        for child in self.child_retriever.invoke(query):
+            parent = self.parents.get(child.metadata.get("parent_id"))
+            if parent is None:
+                continue
+            key = entry_key(parent)
+            if key not in matched and len(matched) >= self.k:
+                continue
+            matched.setdefault(key, []).append((child.metadata["parent_id"], child.metadata.get("child", 0)))
+        return [self.window(self.entries[key], hits) for key, hits in matched.items()]
+
+    def window(self, pieces: List[Document], matched_children: List[Tuple[str, int]]) -> Document:
+        """일기가 예산 안이면 통째로, 길면 맞은 자식 주변 구간만 담은 Document.
+
+        pieces는 한 일기의 청크들(part 순서), matched_children은 맞은 (청크 chunk_id, 청크 안 자식 번호)입니다.
+        """
+        fields = parse_diary_record(pieces[0].page_content)
+        header = entry_header(fields)
+        if len(pieces) == 1 and estimate_tokens(pieces[0].page_content) <= self.max_tokens:
+            return pieces[0]
+
+        # 청크마다 자식으로 나눠 일기 전체의 자식 목록으로 잇고, 맞은 자식 번호를 전체 번호로 바꿉니다.
+        children, spans = [], {}
+        for piece in pieces:
+            piece_children = split_children(piece, self.child_max_tokens)
+            spans[chunk_id(piece)] = (len(children), len(piece_children))
+            children.extend(piece_children)
+        hits = [spans[parent_id][0] + i for parent_id, i in matched_children
+                if parent_id in spans and 0 <= i < spans[parent_id][1]]
+        hits = list(dict.fromkeys(hits)) or [0]
+        metadata = {**pieces[0].metadata, "part": 0, "parts": len(pieces)}
+
+        if estimate_tokens(header) + sum(estimate_tokens(child) for child in children) <= self.max_tokens:
+            return Document(page_content=header + join_pieces(children, range(len(children))), metadata=metadata)
+
+        # 맞은 자식(순위 순) → 맞은 자식과 가까운 이웃 순으로 예산이 허락하는 만큼 고릅니다.
+        neighbours = sorted((i for i in range(len(children)) if i not in hits),
+                            key=lambda i: (min(abs(i - hit) for hit in hits), i))
+        budget = self.max_tokens - estimate_tokens(header)
+        selected = []
+        for i in hits + neighbours:
+            tokens = estimate_tokens(children[i])
+            if tokens > budget:
+                if i in hits and not selected:
+                    selected.append(i)   # 첫 번째로 맞은 자식은 예산을 넘어도 넣습니다.
+                continue
+            selected.append(i)
+            budget -= tokens
+
+        return Document(page_content=header + join_pieces(children, selected),
+                        metadata={**metadata, "window_children": ",".join(map(str, sorted(selected)))})
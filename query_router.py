@@ -0,0 +1,267 @@
+# 파일 이름: query_router.py (언더바 사용 필수)
+# "가장 기뻤던 일은?", "3월에 불안했던 날이 몇 번이야?", "요즘 우울한 감정 추이는?" 같은 질문은
+# 검색 + LLM 생성이 아니라 감정 분석 결과에 대한 집계(최댓값/개수/시계열)입니다.
+# 이런 질문은 미리 만들어 둔 감정 색인(날짜, 대표 감정, 강도)에서 바로 계산해 답하고,
+# 나머지 질문만 RAG 체인으로 보냅니다. 답은 코드로 계산하므로 정확하고 몇 ms 안에 끝납니다.
+
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.messages import AIMessage
+
+from data_analysis import EmotionFrame, load_frame # 언더바 파일명으로 임포트
+from filtered_retriever import EMOTION_KEYWORDS, parse_emotions, parse_time_range
+from report_pipeline import iso_week_key
+import tracing
+
+SUPERLATIVE_WORDS = re.compile(r"가장|제일|최고로")
+SUPERLATIVE_DISTANCE = 8      # '가장'과 감정 표현 사이 최대 글자 수 ("가장 크게 불안했던")
+LEAST_WORDS = re.compile(r"덜|약했|낮았|적었")
+FREQUENCY_PATTERN = re.compile(r"(많이|자주)\s*\S*\s*감정|감정\S*\s*(가장|제일)\s*(많|자주)")
+COUNT_PATTERN = re.compile(r"몇\s*(번|회|일|날|건)|며칠|얼마나\s*자주|횟수")
+TREND_PATTERN = re.compile(r"추이|추세|변화|변했|흐름|나아졌|좋아졌|나빠졌|늘었|줄었|늘어|줄어")
+TOP_RESULTS = 3
+TREND_BUCKETS = 12
+WEEKLY_TREND_DAYS = 92        # 기간이 이보다 짧으면 주별, 길면 월별로 묶습니다.
+
+
+@dataclass
+class RoutedAnswer:
+    """라우터가 계산한 답. text는 그대로 보여 줄 수 있는 문장, data는 계산 결과."""
+    kind: str                 # 'superlative' | 'count' | 'trend' | 'top_emotions'
+    text: str
+    data: dict = field(default_factory=dict)
+
+
+class EmotionIndex:
+    """감정 분석 결과에 대한 미리 계산된 색인.
+
+    태그를 (대표 감정, 강도 내림차순)으로 정렬해 두어 감정별 최댓값은 구간의 첫 원소로 바로 찾고,
+    날짜 조건은 태그 날짜 배열에 대한 비교 한 번으로 거릅니다.
+    """
+
+    def __init__(self, frame: EmotionFrame):
+        self.frame = frame
+        self.order = np.lexsort((-frame.intensity, frame.emotion_code))
+        self.starts = np.searchsorted(frame.emotion_code[self.order], np.arange(len(frame.labels) + 1))
+        self.code_of = {label: code for code, label in enumerate(frame.labels)}
+
+    @classmethod
+    def from_reports(cls, all_analysis_reports) -> "EmotionIndex":
+        return cls(load_frame(all_analysis_reports))
+
+    def tags_in_range(self, time_range=None) -> np.ndarray:
+        """날짜 조건에 맞는 태그 마스크. 조건이 없으면 모든 태그."""
+        if not time_range:
+            return np.ones(len(self.frame.emotion_code), dtype=bool)
+        start, end = (np.datetime64(value, "D") for value in time_range)
+        return ~np.isnat(self.frame.day) & (self.frame.day >= start) & (self.frame.day <= end)
+
+    def strongest(self, labels: List[str], time_range=None, top: int = TOP_RESULTS) -> np.ndarray:
+        """labels 감정 태그 중 강도가 가장 높은 태그 번호들 (보고서마다 하나씩, 강도 순)."""
+        mask = self.tags_in_range(time_range)
+        segments = [self.order[self.starts[code]:self.starts[code + 1]] for code in map(self.code_of.get, labels)]
+        tags = np.concatenate(segments) if segments else np.zeros(0, dtype=np.int64)
+        tags = tags[mask[tags]]
+        tags = tags[np.argsort(-self.frame.intensity[tags], kind="stable")]
+        _, first = np.unique(self.frame.entry_index[tags], return_index=True)
+        return tags[np.sort(first)][:top]
+
+    def period_text(self, time_range=None) -> str:
+        if time_range:
+            start, end = time_range
+            return f"{start.isoformat()} ~ {end.isoformat()}" if start != end else start.isoformat()
+        known = self.frame.entry_dates[~np.isnat(self.frame.entry_dates)]
+        return f"전체 기간({known.min()} ~ {known.max()})" if len(known) else "전체 기간"
+
+
+class QueryRouter:
+    """질문이 최댓값/개수/추이/최다 감정 질문이면 EmotionIndex로 답을 계산합니다. 아니면 None."""
+
+    def __init__(self, index: EmotionIndex, today: Optional[date] = None):
+        self.index = index
+        self.today = today
+
+    def route(self, question: str) -> Optional[RoutedAnswer]:
+        if not len(self.index.frame.emotion_code):
+            return None
+        time_range = parse_time_range(question, self.today)
+        labels = parse_emotions(question, self.index.code_of)
+        if TREND_PATTERN.search(question) and labels:
+            return self._trend(labels, time_range)
+        if COUNT_PATTERN.search(question) and labels:
+            return self._count(labels, time_range)
+        if FREQUENCY_PATTERN.search(question):
+            return self._top_emotions(time_range)
+        if labels and self._is_superlative(question) and not LEAST_WORDS.search(question):
+            return self._superlative(labels, time_range)
+        return None
+
+    def _is_superlative(self, question: str) -> bool:
+        """'가장/제일' 바로 뒤(몇 글자 안)에 감정 표현이 오는지. ('가장 친한 친구'처럼 감정과 무관한 최상급은 제외)"""
+        words = list(EMOTION_KEYWORDS) + list(self.index.code_of)
+        for match in SUPERLATIVE_WORDS.finditer(question):
+            window = question[match.end():match.end() + SUPERLATIVE_DISTANCE]
+            if any(word in window for word in words if len(word) >= 2):
+                return True
+        return False
+
+    def _superlative(self, labels, time_range) -> RoutedAnswer:
+        frame, period = self.index.frame, self.index.period_text(time_range)
+        tags = self.index.strongest(labels, time_range)
+        names = ", ".join(labels)
+        if not len(tags):
+            return RoutedAnswer("superlative", f"{period}에 '{names}' 감정이 기록된 일기가 없습니다.")
+        results = []
+        for tag in tags:
+            entry = frame.entry_index[tag]
+            results.append({
+                "date": "" if np.isnat(frame.day[tag]) else str(frame.day[tag]),
+                "emotion": frame.labels[frame.emotion_code[tag]],
+                "intensity": round(float(frame.intensity[tag]), 2),
+                "reason": frame.reasons[tag],
+                "summary": frame.entry_summaries[entry],
+            })
+        best = results[0]
+        lines = [f"{period}에 '{names}' 감정이 가장 강했던 기록은 {best['date'] or '날짜 미상'}입니다. "
+                 f"({best['emotion']}, 강도 {best['intensity']:.2f})",
+                 f"- 사건: {best['reason']}", f"- 그날 요약: {best['summary']}"]
+        if len(results) > 1:
+            lines.append("그다음: " + "; ".join(f"{r['date'] or '날짜 미상'} {r['reason']} (강도 {r['intensity']:.2f})"
+                                               for r in results[1:]))
+        return RoutedAnswer("superlative", "\n".join(lines), {"period": period, "results": results})
+
+    def _count(self, labels, time_range) -> RoutedAnswer:
+        frame, period = self.index.frame, self.index.period_text(time_range)
+        mask = self.index.tags_in_range(time_range)
+        codes = [self.index.code_of[label] for label in labels]
+        matched = mask & np.isin(frame.emotion_code, codes)
+        entries = np.unique(frame.entry_index[matched])
+        days = np.unique(frame.day[matched & ~np.isnat(frame.day)])
+        total = len(np.unique(frame.entry_index[mask]))
+        names = ", ".join(labels)
+        share = f", 전체 기록 {total}건 중 {len(entries) / total:.0%}" if total else ""
+        text = f"{period}에 '{names}' 감정이 나온 기록은 {len(entries)}건(서로 다른 날 {len(days)}일{share})입니다."
+        return RoutedAnswer("count", text, {"period": period, "entries": int(len(entries)),
+                                            "days": int(len(days)), "total_entries": int(total)})
+
+    def _trend(self, labels, time_range) -> RoutedAnswer:
+        frame, period = self.index.frame, self.index.period_text(time_range)
+        mask = self.index.tags_in_range(time_range) & ~np.isnat(frame.day)
+        names = ", ".join(labels)
+        if not mask.any():
+            return RoutedAnswer("trend", f"{period}에 날짜가 있는 감정 기록이 없습니다.")
+        span = int((frame.day[mask].max() - frame.day[mask].min()).astype(np.int64))
+        days = frame.day[mask]
+        if span <= WEEKLY_TREND_DAYS:
+            # datetime64[W]는 1970-01-01(목요일)부터 센 주라서 쓰지 않고, 날짜마다 그 ISO 주의 월요일로 묶습니다.
+            unit = "주별"
+            buckets = days - ((days.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+        else:
+            unit, buckets = "월별", days.astype("datetime64[M]")
+        keys, bucket_index = np.unique(buckets, return_inverse=True)
+        # 주 이름은 report_pipeline.period_keys와 같은 'YYYY-Www' 형식입니다.
+        periods = [iso_week_key(key.astype(date)) if unit == "주별" else str(key) for key in keys]
+
+        # 구간마다 (전체 기록 수, 해당 감정이 나온 기록 수, 해당 감정 평균 강도)
+        entry_bucket = np.full(frame.n_entries, -1)
+        entry_bucket[frame.entry_index[mask]] = bucket_index
+        totals = np.bincount(entry_bucket[entry_bucket >= 0], minlength=len(keys))
+        matched = mask & np.isin(frame.emotion_code, [self.index.code_of[label] for label in labels])
+        matched_index = bucket_index[matched[mask]]
+        matched_entries = np.zeros(frame.n_entries, dtype=bool)
+        matched_entries[frame.entry_index[matched]] = True
+        hits = np.bincount(entry_bucket[matched_entries], minlength=len(keys))
+        intensity_sums = np.bincount(matched_index, weights=frame.intensity[matched], minlength=len(keys))
+        intensity_counts = np.bincount(matched_index, minlength=len(keys))
+        ratios = hits / np.maximum(totals, 1)
+        means = intensity_sums / np.maximum(intensity_counts, 1)
+
+        series = [{"period": key, "entries": int(total), "matched": int(hit),
+                   "ratio": round(float(ratio), 3), "mean_intensity": round(float(mean), 2)}
+                  for key, total, hit, ratio, mean in zip(periods, totals, hits, ratios, means)]
+        half = len(keys) // 2
+        if half:
+            before, after = float(ratios[:half].mean()), float(ratios[half:].mean())
+            direction = "증가" if after > before * 1.1 else "감소" if after < before * 0.9 else "비슷"
+            summary = f"앞쪽 평균 {before:.0%} → 뒤쪽 평균 {after:.0%} ({direction})"
+        else:
+            direction, summary = "", "구간이 하나뿐이라 변화를 비교할 수 없습니다."
+        lines = [f"{period} '{names}' 감정 추이 ({unit}, 해당 감정이 나온 기록 비율 / 평균 강도):"]
+        lines += [f"- {item['period']}: {item['matched']}/{item['entries']}건 ({item['ratio']:.0%}), "
+                  f"평균 강도 {item['mean_intensity']:.2f}" for item in series[-TREND_BUCKETS:]]
+        lines.append(summary)
+        return RoutedAnswer("trend", "\n".join(lines), {"period": period, "unit": unit, "series": series,
+                                                        "direction": direction})
+
+    def _top_emotions(self, time_range) -> RoutedAnswer:
+        frame, period = self.index.frame, self.index.period_text(time_range)
+        mask = self.index.tags_in_range(time_range)
+        counts = np.bincount(frame.emotion_code[mask], minlength=len(frame.labels))
+        top = [code for code in np.argsort(-counts, kind="stable")[:TOP_RESULTS] if counts[code]]
+        if not top:
+            return RoutedAnswer("top_emotions", f"{period}에 기록된 감정이 없습니다.")
+        ranking = [{"emotion": frame.labels[code], "count": int(counts[code])} for code in top]
+        text = f"{period}에 가장 많이 나온 감정: " + ", ".join(f"{r['emotion']} {r['count']}회" for r in ranking)
+        return RoutedAnswer("top_emotions", text, {"period": period, "ranking": ranking})
+
+
+class RoutedRagChain:
+    """QueryRouter를 RAG 체인(CachedRagChain) 앞에 둡니다. 사용법(invoke/ainvoke/astream, cache)은 같습니다.
+
+    phrase_chain(analysis_chains.get_answer_phrasing_chain)을 넘기면 계산된 답을 짧은 LLM 호출 한 번으로
+    자연스러운 문장으로 다듬고, 실패하면 계산된 문장을 그대로 돌려줍니다.
+    """
+
+    def __init__(self, rag_chain, router: QueryRouter, phrase_chain=None):
+        self.rag_chain = rag_chain
+        self.router = router
+        self.phrase_chain = phrase_chain
+
+    @property
+    def cache(self):
+        return self.rag_chain.cache
+
+    def _route(self, question: str) -> Optional[RoutedAnswer]:
+        routed = self.router.route(question)
+        if routed is not None:
+            tracing.add_event("routed", kind=routed.kind)
+        return routed
+
+    def invoke(self, question: str):
+        routed = self._route(question)
+        if routed is None:
+            return self.rag_chain.invoke(question)
+        if self.phrase_chain is not None:
+            try:
+                return AIMessage(content=self.phrase_chain.invoke({"question": question, "facts": routed.text}))
+            except Exception as e:
+                print(f"⚠️ 답변 문장 다듬기 실패, 계산 결과를 그대로 보여 줍니다: {e}")
+        return AIMessage(content=routed.text)
+
+    async def ainvoke(self, question: str):
+        parts = [text async for text in self.astream(question)]
+        return AIMessage(content="".join(parts))
+
+    async def astream(self, question: str):
+        routed = self._route(question)
+        if routed is None:
+            async for text in self.rag_chain.astream(question):
+                yield text
+            return
+        if self.phrase_chain is not None:
+            streamed = False
+            try:
+                async for text in self.phrase_chain.astream({"question": question, "facts": routed.text}):
+                    streamed = True
+                    yield text
+                return
+            except Exception as e:
+                # 이미 일부를 보냈다면 계산 결과를 이어 붙이면 답이 두 번 나오므로 오류를 그대로 올립니다.
+                if streamed:
+                    raise
+                print(f"⚠️ 답변 문장 다듬기 실패, 계산 결과를 그대로 보여 줍니다: {e}")
+        yield routed.text
@@ -0,0 +1,242 @@
+# 파일 이름: rag_service.py (언더바 사용 필수)
+# 색인, 체인, 캐시를 한 번만 준비해 두고 여러 질문에 답하는 서비스 모드 (대화형 REPL + 로컬 HTTP).
+# 사용법:
+#   python rag_service.py               # 터미널에서 계속 질문하기
+#   python rag_service.py --port 8000   # http://127.0.0.1:8000/ask?q=질문 (POST /ask {"question": ...}도 가능)
+
+import argparse
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs, urlsplit
+
+from data_preparer import DEFAULT_DATA_PATH, stream_documents # 언더바 파일명으로 임포트
+from analysis_chains import get_answer_phrasing_chain, get_api_key, get_rag_chain
+from answer_cache import AnswerCache, CachedRagChain, index_fingerprint
+from context_assembler import ContextAssembler
+from filtered_retriever import FilteredDiaryRetriever, build_emotion_index
+from keyword_index import HybridRetriever, sync_keyword_index
+from parent_retriever import CHILD_CANDIDATES, ParentChildRetriever, stream_child_documents
+from query_router import EmotionIndex, QueryRouter, RoutedRagChain
+from vector_index import chunk_id
+
+DEFAULT_REPORTS_PATH = "./emotion-reports.jsonl"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+
+def build_indexes(data_path: str = DEFAULT_DATA_PATH, retrieval_mode: str = None, api_key: str = None,
+                  retrieval_unit: str = None):
+    """키워드 색인과 (keyword 모드가 아니면) 벡터 스토어를 일기 파일과 같은 상태로 맞춥니다.
+
+    임베딩 백엔드는 EMBEDDING_BACKEND 환경 변수로 고르며(embedding_backends.py), 백엔드마다 벡터 컬렉션이 따로 있습니다.
+    retrieval_unit: sentence(기본, 문장 단위 자식 청크를 색인하고 부모 일기를 돌려줌) | chunk(일기 청크를 그대로 색인)
+    (기본값은 RETRIEVAL_UNIT 환경 변수)
+
+    반환값: (keyword_index, vectorstore, embeddings, parents). keyword 모드에서는 vectorstore/embeddings가 None이고,
+    chunk 단위에서는 parents(chunk_id → 부모 Document)가 None입니다.
+    """
+    retrieval_mode = retrieval_mode or os.getenv("RETRIEVAL_MODE", "hybrid")
+    retrieval_unit = retrieval_unit or os.getenv("RETRIEVAL_UNIT", "sentence")
+    parents = None
+    if retrieval_unit == "sentence":
+        parents = {chunk_id(doc): doc for doc in stream_documents(data_path)}
+        index_documents = lambda: stream_child_documents(parents.values())
+    else:
+        index_documents = lambda: stream_documents(data_path)
+    # 이름/장소처럼 임베딩이 놓치기 쉬운 단어는 BM25 키워드 색인으로 찾습니다.
+    keyword_index = sync_keyword_index(index_documents())
+
+    vectorstore = embeddings = None
+    if retrieval_mode != "keyword":
+        from embedding_backends import get_embeddings, vector_collection_name
+        from vector_index import DEFAULT_COLLECTION, SENTENCE_COLLECTION, sync_vectorstore
+
+        embeddings = get_embeddings(api_key=api_key)
+        collection = SENTENCE_COLLECTION if parents is not None else DEFAULT_COLLECTION
+        # 영구 인덱스와 비교해 바뀐 청크만 임베딩합니다.
+        vectorstore = sync_vectorstore(index_documents(), embeddings,
+                                       collection_name=vector_collection_name(embeddings, collection))
+    return keyword_index, vectorstore, embeddings, parents
+
+
+def build_rag_chain(all_analysis_reports, data_path: str = DEFAULT_DATA_PATH,
+                    retrieval_mode: str = None, api_key: str = None, chat_model=None,
+                    phrase_routed: bool = None) -> RoutedRagChain:
+    """키워드/벡터 색인을 동기화하고 답변 캐시가 붙은 RAG 체인을 만듭니다.
+
+    retrieval_mode: hybrid(기본, 키워드+벡터) | keyword(임베딩 API 없이 오프라인) | vector
+    (기본값은 RETRIEVAL_MODE 환경 변수)
+    phrase_routed: 감정 집계 질문의 계산 결과를 LLM 한 번으로 다듬을지 (기본값은 ROUTER_PHRASING=1 환경 변수)
+    """
+    retrieval_mode = retrieval_mode or os.getenv("RETRIEVAL_MODE", "hybrid")
+    keyword_index, vectorstore, embeddings, parents = build_indexes(data_path, retrieval_mode, api_key)
+
+    # 질문 속 날짜 범위/감정을 벡터 스토어 필터로 먼저 적용해 검색 범위를 좁힙니다.
+    # (키워드 검색에도 같은 조건이 적용됩니다.)
+    emotion_index = build_emotion_index(all_analysis_reports)
+    # 문장 단위로 색인했으면 부모 일기 k개를 채울 만큼 자식을 넉넉히 찾습니다.
+    k = 3 if parents is None else 3 * CHILD_CANDIDATES
+    filtered_retriever = FilteredDiaryRetriever(vectorstore=vectorstore, k=k, emotion_index=emotion_index)
+    retriever = HybridRetriever(
+        keyword_index=keyword_index, vector_retriever=filtered_retriever, k=k, mode=retrieval_mode
+    )
+    if parents is not None:
+        retriever = ParentChildRetriever(child_retriever=retriever, parents=parents, k=3)
+
+    # 검색된 일기는 토큰 예산 안에서 질문과 관련 깊은 문장과 분석 요약으로 줄여 프롬프트에 넣습니다.
+    assembler = ContextAssembler(all_analysis_reports)
+
+    # 같은 질문(또는 표현만 다른 질문)은 캐시된 답변을 바로 돌려줍니다. 색인이 바뀌면 캐시는 자동으로 비워집니다.
+    answer_cache = AnswerCache(index_fingerprint(keyword_index.ids, emotion_index, retrieval_mode,
+                                                 getattr(embeddings, "namespace", None), assembler.max_tokens))
+    rag_chain = CachedRagChain(
+        get_rag_chain(retriever, chat_model, assemble_context=assembler), answer_cache,
+        embeddings=embeddings, get_conditions=filtered_retriever.get_conditions,
+    )
+
+    # "가장 기뻤던 날", "몇 번", "추이" 같은 감정 집계 질문은 검색/LLM 없이 감정 색인에서 바로 계산합니다.
+    if phrase_routed is None:
+        phrase_routed = os.getenv("ROUTER_PHRASING", "0") == "1"
+    router = QueryRouter(EmotionIndex.from_reports(all_analysis_reports))
+    return RoutedRagChain(rag_chain, router, get_answer_phrasing_chain(chat_model) if phrase_routed else None)
+
+
+def load_analysis_reports(path: str = DEFAULT_REPORTS_PATH):
+    """main.py가 저장한 분석 결과를 읽습니다. 없으면 감정 필터 없이 동작하도록 빈 목록."""
+    if not os.path.exists(path):
+        print(f"⚠️ {path}가 없어 감정 조건 없이 검색합니다. (main.py를 먼저 실행하면 감정 필터가 적용됩니다.)")
+        return []
+    from data_analysis import load_reports
+
+    return load_reports(path)
+
+
+# --- HTTP ---
+
+async def _send_response(writer, status: str, body: str, content_type: str = "text/plain; charset=utf-8"):
+    data = body.encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+    )
+    await writer.drain()
+
+
+async def _read_question(reader):
+    """요청 줄/헤더/본문을 읽어 (method, path, question)을 반환합니다."""
+    request_line = (await reader.readline()).decode("latin-1")
+    method, target, _ = request_line.split(" ", 2)
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    url = urlsplit(target)
+    question = parse_qs(url.query).get("q", [""])[0]
+    length = int(headers.get("content-length", 0))
+    if method == "POST" and length:
+        body = await reader.readexactly(length)
+        payload = json.loads(body.decode("utf-8"))
+        # "hi"나 []처럼 객체가 아닌 JSON, 문자열이 아닌 question은 잘못된 요청(400)으로 처리합니다.
+        if not isinstance(payload, dict):
+            raise ValueError("요청 본문은 JSON 객체여야 합니다.")
+        question = payload.get("question", question)
+        if not isinstance(question, str):
+            raise ValueError("question은 문자열이어야 합니다.")
+    return method, url.path, question.strip()
+
+
+async def handle_http(rag_chain: CachedRagChain, reader, writer):
+    """요청 하나를 처리합니다. 답변은 chunked 전송으로 토큰이 생성되는 대로 보냅니다."""
+    try:
+        try:
+            method, path, question = await _read_question(reader)
+        except (ValueError, UnicodeDecodeError, asyncio.IncompleteReadError):
+            await _send_response(writer, "400 Bad Request", "잘못된 요청입니다.\n")
+            return
+
+        if path == "/health":
+            await _send_response(writer, "200 OK", "ok\n")
+            return
+        if path != "/ask" or method not in ("GET", "POST"):
+            await _send_response(writer, "404 Not Found", "GET /ask?q=질문 또는 POST /ask {\"question\": ...}\n")
+            return
+        if not question:
+            await _send_response(writer, "400 Bad Request", "질문(q)이 비어 있습니다.\n")
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; charset=utf-8\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+        )
+        async for text in rag_chain.astream(question):
+            data = text.encode("utf-8")
+            if data:
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+    except ConnectionError:
+        pass  # 클라이언트가 먼저 연결을 끊음
+    except Exception as e:
+        # 이미 200 헤더를 보낸 뒤일 수 있으므로 연결만 닫고 서버는 계속 동작합니다.
+        print(f"❌ 요청 처리 실패: {e}")
+    finally:
+        writer.close()
+
+
+async def serve_http(rag_chain: CachedRagChain, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """요청마다 별도 태스크로 처리하므로 한 답변이 생성되는 동안 다른 요청도 동시에 진행됩니다."""
+    server = await asyncio.start_server(lambda r, w: handle_http(rag_chain, r, w), host, port)
+    print(f"✅ RAG 서비스 시작: http://{host}:{port}/ask?q=질문")
+    async with server:
+        await server.serve_forever()
+
+
+# --- REPL ---
+
+async def repl(rag_chain: CachedRagChain):
+    """터미널에서 질문을 받아 답변을 토큰 단위로 출력합니다. 빈 줄/exit/종료로 끝냅니다."""
+    while True:
+        try:
+            question = (await asyncio.to_thread(input, "\n질문> ")).strip()
+        except EOFError:
+            break
+        if question in ("", "exit", "quit", "종료"):
+            break
+        try:
+            async for text in rag_chain.astream(question):
+                print(text, end="", flush=True)
+        except Exception as e:
+            print(f"❌ 답변 실패: {e}", end="")
+        print()
+
+
+async def run(rag_chain: CachedRagChain, port: int = None, host: str = DEFAULT_HOST, interactive: bool = True):
+    tasks = []
+    if port:
+        tasks.append(asyncio.create_task(serve_http(rag_chain, host, port)))
+    try:
+        if interactive:
+            await repl(rag_chain)
+        elif tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        rag_chain.cache.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="일기 RAG 질의응답 서비스")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="일기 파일 경로")
+    parser.add_argument("--reports", default=DEFAULT_REPORTS_PATH, help="감정 분석 결과 JSON")
+    parser.add_argument("--mode", choices=["hybrid", "keyword", "vector"], default=None, help="검색 방식")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=None, help="지정하면 HTTP 서버를 엽니다.")
+    parser.add_argument("--repl", action="store_true", help="HTTP 서버와 함께 터미널 질문도 받습니다.")
+    args = parser.parse_args()
+
+    chain = build_rag_chain(load_analysis_reports(args.reports), args.data, args.mode)
+    asyncio.run(run(chain, port=args.port, host=args.host, interactive=args.repl or not args.port))
@@ -0,0 +1,155 @@
+# 파일 이름: report_cache.py (언더바 사용 필수)
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from data_preparer import EmotionAnalysisReport # 언더바 파일명으로 임포트
+from tracing import add_event
+
+DEFAULT_CACHE_PATH = "./.cache/emotion-reports.sqlite"
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_MAX_AGE_DAYS = 180
+
+# 스키마가 바뀌면 (필드 추가/설명 변경 등) 키가 달라져 예전 결과를 쓰지 않습니다.
+SCHEMA_VERSION = hashlib.sha256(
+    json.dumps(EmotionAnalysisReport.model_json_schema(), sort_keys=True, ensure_ascii=False).encode("utf-8")
+).hexdigest()[:16]
+
+
+def chain_fingerprint(emotion_chain) -> str:
+    """감정 분석 체인의 프롬프트 템플릿, 모델 이름, temperature를 하나의 문자열로 만듭니다."""
+    prompt = emotion_chain.first
+    chat_model = emotion_chain.steps[1]
+    templates = [
+        getattr(getattr(message, "prompt", None), "template", repr(message))
+        for message in getattr(prompt, "messages", [])
+    ]
+    model_name = getattr(chat_model, "model", None) or getattr(chat_model, "model_name", None) or type(chat_model).__name__
+    temperature = getattr(chat_model, "temperature", None)
+    return json.dumps(
+        {"templates": templates, "model": model_name, "temperature": temperature, "schema": SCHEMA_VERSION},
+        sort_keys=True, ensure_ascii=False,
+    )
+
+
+def make_cache_key(chunk_text: str, fingerprint: str) -> str:
+    """청크 텍스트와 체인 지문(fingerprint)으로 내용 주소(content address) 키를 만듭니다."""
+    digest = hashlib.sha256()
+    digest.update(fingerprint.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(chunk_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """청크별 EmotionAnalysisReport를 SQLite 파일에 저장하는 내용 주소 기반 캐시."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " key TEXT PRIMARY KEY,"
+            " report TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_accessed ON reports(accessed_at)")
+        self.conn.commit()
+
+    def get(self, key: str):
+        """캐시된 보고서를 검증된 EmotionAnalysisReport로 반환합니다. 없거나 손상되었으면 None."""
+        row = self.conn.execute("SELECT report FROM reports WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        try:
+            report = EmotionAnalysisReport.model_validate_json(row[0])
+        except ValueError:
+            # 스키마 검증에 실패한 항목은 버리고 다시 분석하도록 합니다.
+            self.conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+            self.conn.commit()
+            self.misses += 1
+            return None
+        self.conn.execute("UPDATE reports SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        self.hits += 1
+        add_event("cache_hit", cache="report")
+        return report
+
+    def put(self, key: str, report: EmotionAnalysisReport):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO reports (key, report, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, report.model_dump_json(), now, now),
+        )
+        self.conn.commit()
+
+    def evict(self) -> int:
+        """오래된 항목(max_age_days 초과)과 최근에 쓰이지 않은 초과 항목(max_entries 초과)을 지웁니다."""
+        removed = 0
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            removed += self.conn.execute("DELETE FROM reports WHERE created_at < ?", (cutoff,)).rowcount
+        if self.max_entries:
+            removed += self.conn.execute(
+                "DELETE FROM reports WHERE key IN ("
+                " SELECT key FROM reports ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self.conn.commit()
+        return removed
+
+    def close(self):
+        self.evict()
+        self.conn.close()
+
+
+class SummaryCache:
+    """기간(주/월/전체)별 요약문처럼 텍스트 결과를 같은 SQLite 파일에 저장하는 캐시."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str):
+        row = self.conn.execute("SELECT text FROM summaries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        add_event("cache_hit", cache="summary")
+        return row[0]
+
+    def put(self, key: str, text: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO summaries (key, text, created_at) VALUES (?, ?, ?)",
+            (key, text, time.time()),
+        )
+        self.conn.commit()
+
+    def close(self):
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            self.conn.execute("DELETE FROM summaries WHERE created_at < ?", (cutoff,))
+            self.conn.commit()
+        self.conn.close()
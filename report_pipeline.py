@@ -0,0 +1,143 @@
+# 파일 이름: report_pipeline.py (언더바 사용 필수)
+# 분석 결과 전체를 한 프롬프트에 넣는 대신 주 → 월 → 전체 순서로 줄여 가며 종합 보고서를 만듭니다.
+
+import asyncio
+import json
+from collections import defaultdict
+from datetime import date
+
+from concurrent_analysis import (
+    DEFAULT_CONCURRENCY, AdaptiveRateLimiter, ainvoke_with_retry, estimate_tokens,
+)
+from data_analysis import load_frame, summarize_for_report
+from report_cache import chain_fingerprint, make_cache_key
+
+UNKNOWN_PERIOD = "날짜미상"
+DIRECT_TOKEN_BUDGET = 8000    # 전체 분석 데이터가 이보다 작으면 요약 단계 없이 바로 보고서를 만듭니다.
+SUMMARY_OUTPUT_TOKENS = 1000
+
+
+def compact_report(report: dict) -> dict:
+    """보고서 딕셔너리에서 요약 단계에 필요한 필드만 남깁니다."""
+    return {
+        "date": report.get("metadata", {}).get("date", ""),
+        "summary": report["summary"],
+        "emotion_tags": report["emotion_tags"],
+    }
+
+
+def iso_week_key(value: date) -> str:
+    """date가 속한 ISO 주 키. 예: date(2025, 12, 29) → '2026-W01'"""
+    iso_year, week, _ = value.isocalendar()
+    return f"{iso_year}-W{week:02d}"
+
+
+def period_keys(date_str: str):
+    """ISO 날짜 문자열을 (월 키, 주 키)로 바꿉니다. 예: '2025-11-03' → ('2025-11', '2025-11/2025-W45')
+
+    주는 ISO 연도 + 주 번호로 표시하고, 그 주가 속한 달은 날짜의 달로 정합니다.
+    예: '2025-12-29' → ('2025-12', '2025-12/2026-W01'), '2026-01-01' → ('2026-01', '2026-01/2026-W01')
+    """
+    if not date_str:
+        return UNKNOWN_PERIOD, UNKNOWN_PERIOD
+    entry_date = date.fromisoformat(date_str)
+    month = entry_date.strftime("%Y-%m")
+    # 월 경계에 걸친 주는 월별로 나눠서, 새 주가 추가되어도 그 달만 다시 계산되게 합니다.
+    # 달 안에서는 ISO 연도가 주 번호 앞에 오므로 연말의 다음 해 W01이 W52 뒤로 정렬됩니다.
+    return month, f"{month}/{iso_week_key(entry_date)}"
+
+
+def group_by_period(all_analysis_reports):
+    """보고서를 {월: {주: [보고서, ...]}} 형태로 묶습니다. (날짜순 정렬)"""
+    groups = defaultdict(lambda: defaultdict(list))
+    for report in all_analysis_reports:
+        compact = compact_report(report)
+        month, week = period_keys(compact["date"])
+        groups[month][week].append(compact)
+    return {
+        month: {week: weeks[week] for week in sorted(weeks)}
+        for month, weeks in sorted(groups.items())
+    }
+
+
+async def build_final_report_async(all_analysis_reports, final_report_chain, summary_chain,
+                                   cache=None, rate_limiter: AdaptiveRateLimiter = None,
+                                   max_concurrency: int = DEFAULT_CONCURRENCY) -> str:
+    """주간 요약 → 월간 요약 → 종합 보고서 순서로 계층적으로 보고서를 생성하고 본문을 반환합니다.
+
+    같은 단계의 기간들은 동시에 요약하며, cache(report_cache.SummaryCache)를 넘기면 입력이 바뀌지 않은
+    기간은 다시 요약하지 않습니다. 새 주가 추가되면 그 주, 그 달, 최종 보고서만 다시 계산됩니다.
+    """
+    rate_limiter = rate_limiter or AdaptiveRateLimiter()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    summary_fingerprint = chain_fingerprint(summary_chain)
+    final_fingerprint = chain_fingerprint(final_report_chain)
+
+    async def run_cached(chain, fingerprint, inputs, label):
+        cache_key = make_cache_key(json.dumps(inputs, sort_keys=True, ensure_ascii=False), fingerprint)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print(f"  [=] {label} 캐시 사용.")
+                return cached
+
+        tokens = estimate_tokens(inputs["analysis_data"]) + SUMMARY_OUTPUT_TOKENS
+        async with semaphore:
+            result = await ainvoke_with_retry(chain, inputs, rate_limiter, tokens, label=label)
+        text = result if isinstance(result, str) else result.content
+
+        if cache is not None:
+            cache.put(cache_key, text)
+        print(f"  [+] {label} 완료.")
+        return text
+
+    async def summarize(period, level, items):
+        if len(items) == 1 and isinstance(items[0], dict) and "summary_text" in items[0]:
+            return items[0]["summary_text"]  # 하위 기간이 하나뿐이면 다시 요약할 필요가 없습니다.
+        inputs = {
+            "period": period,
+            "level": level,
+            "analysis_data": json.dumps(items, ensure_ascii=False, separators=(",", ":")),
+        }
+        return await run_cached(summary_chain, summary_fingerprint, inputs, f"{period} {level} 요약")
+
+    # 감정 빈도/강도/동시 출현 등 수치는 NumPy로 정확히 계산해서 넘깁니다.
+    statistics = summarize_for_report(load_frame(all_analysis_reports))
+    groups = group_by_period(all_analysis_reports)
+    entries = [
+        {"date": item["date"], "summary": item["summary"]}
+        for weeks in groups.values() for items in weeks.values() for item in items
+    ]
+    direct_data = json.dumps({"statistics": statistics, "entries": entries},
+                             ensure_ascii=False, separators=(",", ":"))
+
+    if estimate_tokens(direct_data) <= DIRECT_TOKEN_BUDGET:
+        # 데이터가 작으면 요약 단계를 건너뛰고 통계 + 청크별 한 줄 요약으로 바로 보고서를 만듭니다.
+        root_data = direct_data
+    else:
+        # 1단계: 주 단위 요약 (모든 주를 동시에)
+        week_jobs = [(month, week, summarize(week, "주간", items))
+                     for month, weeks in groups.items() for week, items in weeks.items()]
+        week_texts = await asyncio.gather(*(job for _, _, job in week_jobs))
+        weeks_by_month = defaultdict(list)
+        for (month, week, _), text in zip(week_jobs, week_texts):
+            weeks_by_month[month].append({"period": week, "summary_text": text})
+
+        # 2단계: 월 단위 요약 (모든 달을 동시에)
+        months = list(weeks_by_month)
+        month_texts = await asyncio.gather(*(summarize(month, "월간", weeks_by_month[month]) for month in months))
+        root_data = json.dumps(
+            {
+                "statistics": statistics,
+                "periods": [{"period": month, "summary_text": text} for month, text in zip(months, month_texts)],
+            },
+            ensure_ascii=False, indent=2,
+        )
+
+    # 3단계: 최종 종합 보고서
+    return await run_cached(final_report_chain, final_fingerprint, {"analysis_data": root_data}, "종합 보고서")
+
+
+def build_final_report(all_analysis_reports, final_report_chain, summary_chain, **kwargs) -> str:
+    """동기 코드(main.py 등)에서 호출하기 위한 build_final_report_async 래퍼."""
+    return asyncio.run(build_final_report_async(all_analysis_reports, final_report_chain, summary_chain, **kwargs))
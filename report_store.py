@@ -0,0 +1,143 @@
+# 파일 이름: report_store.py (언더바 사용 필수)
+# 감정 분석 결과 저장 형식.
+#   - JSONL: 청크 분석이 끝날 때마다 한 줄씩 바로 추가 (중간에 멈춰도 끝난 결과는 남음)
+#   - .npz: 통계용 열(column) 형식. 감정은 정수 코드 + 이름 표(사전 인코딩), 강도는 float32,
+#           날짜/entry_id는 정수·날짜 배열, 문자열은 UTF-8 바이트 + 오프셋으로 저장해 pickle 없이 바로 읽습니다.
+
+import json
+import os
+
+import numpy as np
+
+DEFAULT_JSONL_PATH = "./emotion-reports.jsonl"
+DEFAULT_NPZ_PATH = "./emotion-reports.npz"
+NPZ_FORMAT_VERSION = 1
+
+
+class JsonlReportWriter:
+    """보고서 딕셔너리를 받는 즉시 JSONL 파일에 한 줄씩 쓰고 flush합니다.
+
+    analyze_chunks(on_report=writer.write)처럼 넘기면 완료 순서대로 기록되며,
+    읽을 때 read_jsonl_reports()가 entry_id 순서로 정렬합니다.
+    """
+
+    def __init__(self, path: str = DEFAULT_JSONL_PATH, append: bool = False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.count = 0
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, report_data: dict):
+        self._file.write(json.dumps(report_data, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+def _entry_order(report: dict):
+    entry_id = report.get("metadata", {}).get("entry_id")
+    return (entry_id is None, entry_id or 0)
+
+
+def read_jsonl_reports(path: str = DEFAULT_JSONL_PATH):
+    """JSONL 보고서를 entry_id 순서로 읽습니다. 같은 entry_id가 여러 번 있으면 마지막 줄을 씁니다.
+    (쓰다가 끊긴 마지막 줄은 건너뜁니다.)"""
+    by_entry, without_id = {}, []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                report = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entry_id = report.get("metadata", {}).get("entry_id")
+            if entry_id is None:
+                without_id.append(report)
+            else:
+                by_entry[entry_id] = report
+    return sorted(by_entry.values(), key=_entry_order) + without_id
+
+
+def _encode_strings(values):
+    """문자열 목록 → (UTF-8 바이트 배열, 시작 오프셋 배열)."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(blob, offsets):
+    data = blob.tobytes()
+    return [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def tag_columns(reports):
+    """감정 태그 단위 열: (보고서 번호, 감정 코드, 강도, 원인 문장 목록, 감정 이름 목록).
+
+    태그에 emotion_taxonomy의 emotion_id가 있으면 문자열 비교 없이 정수 ID로 코드를 정하고,
+    (예전 결과처럼) 없으면 감정 이름으로 정합니다. 코드는 등장한 감정만 0부터 순서대로 붙습니다.
+    """
+    tag_entry, tag_id, tag_intensity, tag_reasons = [], [], [], []
+    names = {}
+    for row, report in enumerate(reports):
+        for tag in report.get("emotion_tags", []):
+            tag_entry.append(row)
+            tag_id.append(tag.get("emotion_id"))
+            tag_intensity.append(tag["intensity"])
+            tag_reasons.append(tag.get("reason", ""))
+            names.setdefault(tag.get("emotion_id", tag["emotion"]), tag["emotion"])
+
+    if None in tag_id:
+        label_codes = {}
+        tags = (tag for report in reports for tag in report.get("emotion_tags", []))
+        codes = [label_codes.setdefault(tag["emotion"], len(label_codes)) for tag in tags]
+        labels = list(label_codes)
+    else:
+        ids, codes = np.unique(np.asarray(tag_id, dtype=np.int64), return_inverse=True)
+        labels = [names[emotion_id] for emotion_id in ids.tolist()]
+    return (np.asarray(tag_entry, dtype=np.int32), np.asarray(codes, dtype=np.int32).reshape(-1),
+            np.clip(np.asarray(tag_intensity, dtype=np.float32), 0.0, 1.0), tag_reasons, labels)
+
+
+def export_npz(all_analysis_reports, path: str = DEFAULT_NPZ_PATH):
+    """보고서 목록을 열 형식 .npz로 저장합니다. (entry 단위 열 + 감정 태그 단위 열)"""
+    reports = sorted(all_analysis_reports, key=_entry_order)
+    tag_entry, tag_code, tag_intensity, tag_reasons, labels = tag_columns(reports)
+
+    summary_blob, summary_offsets = _encode_strings([report.get("summary", "") for report in reports])
+    reason_blob, reason_offsets = _encode_strings(tag_reasons)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(
+        path,
+        version=np.asarray(NPZ_FORMAT_VERSION),
+        entry_id=np.asarray([report.get("metadata", {}).get("entry_id", row + 1)
+                             for row, report in enumerate(reports)], dtype=np.int64),
+        entry_date=np.asarray([report.get("metadata", {}).get("date") or "NaT" for report in reports],
+                              dtype="datetime64[D]"),
+        summary_blob=summary_blob, summary_offsets=summary_offsets,
+        labels=np.asarray(labels, dtype=str),
+        tag_entry=tag_entry, tag_emotion=tag_code, tag_intensity=tag_intensity,
+        reason_blob=reason_blob, reason_offsets=reason_offsets,
+    )
+    return path
+
+
+def load_npz(path: str = DEFAULT_NPZ_PATH) -> dict:
+    """export_npz()로 저장한 파일을 배열 딕셔너리로 읽습니다. (문자열 열은 아직 디코딩하지 않음)"""
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    if int(arrays.pop("version")) != NPZ_FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 .npz 형식 버전입니다: {path}")
+    return arrays
+
+
+def decode_summaries(arrays: dict):
+    return _decode_strings(arrays["summary_blob"], arrays["summary_offsets"])
+
+
+def decode_reasons(arrays: dict):
+    return _decode_strings(arrays["reason_blob"], arrays["reason_offsets"])
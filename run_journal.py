@@ -0,0 +1,139 @@
+# 파일 이름: run_journal.py (언더바 사용 필수)
+# 감정 분석 실행 기록(write-ahead journal). 청크마다 pending → done/failed 상태와 결과를 바로 SQLite에 남겨
+# 프로세스가 중간에 죽어도 끝난 청크는 다시 분석하지 않고, 실패한 청크만 다시 돌릴 수 있게 합니다.
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+DEFAULT_JOURNAL_PATH = "./.cache/run-journal.sqlite"
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def chunk_hash(chunk) -> str:
+    return hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()[:32]
+
+
+class RunJournal:
+    """실행(run) 하나의 청크별 상태 기록.
+
+    - 분석 요청을 보내기 전에 pending을 기록하고, 끝나면 결과(보고서 딕셔너리)와 함께 done,
+      재시도 끝에 실패하면 사유와 함께 failed로 바꿉니다. (실패한 청크가 조용히 사라지지 않습니다.)
+    - 청크는 입력 순서(번호)와 내용 해시로 식별하므로, 같은 파일로 이어서 실행하면 done 청크는 건너뜁니다.
+    """
+
+    def __init__(self, run_id: str = None, path: str = DEFAULT_JOURNAL_PATH, data_path: str = ""):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")   # 청크마다 커밋해도 빠르도록
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " data_path TEXT NOT NULL,"
+            " started_at REAL NOT NULL,"
+            " finished_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " run_id TEXT NOT NULL,"
+            " idx INTEGER NOT NULL,"
+            " chunk_hash TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " report TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (run_id, idx))"
+        )
+        # 같은 초에 시작한 두 실행이 기록을 섞지 않도록 임의의 꼬리를 붙입니다. (시각 부분으로 정렬 가능)
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, data_path, started_at) VALUES (?, ?, ?)",
+            (self.run_id, data_path, time.time()),
+        )
+        self.conn.commit()
+        row = self.conn.execute("SELECT data_path FROM runs WHERE run_id = ?", (self.run_id,)).fetchone()
+        self.data_path = row[0]
+        self._status = {
+            idx: (status, digest) for idx, status, digest in self.conn.execute(
+                "SELECT idx, status, chunk_hash FROM chunks WHERE run_id = ?", (self.run_id,))
+        }
+
+    @staticmethod
+    def latest_run_id(path: str = DEFAULT_JOURNAL_PATH):
+        """가장 최근에 시작한 실행의 ID. 기록이 없으면 None. (시작 시각이 같으면 나중에 기록한 실행)"""
+        if not os.path.exists(path):
+            return None
+        conn = sqlite3.connect(path)
+        try:
+            row = conn.execute("SELECT run_id FROM runs ORDER BY started_at DESC, rowid DESC LIMIT 1").fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        conn.close()
+        return row[0] if row else None
+
+    def status(self, i: int, chunk):
+        """청크의 기록된 상태. 기록이 없거나 그 번호의 내용이 바뀌었으면 None."""
+        status, digest = self._status.get(i, (None, None))
+        return status if digest == chunk_hash(chunk) else None
+
+    def report(self, i: int):
+        row = self.conn.execute(
+            "SELECT report FROM chunks WHERE run_id = ? AND idx = ?", (self.run_id, i)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def _write(self, i: int, chunk, status: str, report=None, error: str = None):
+        digest = chunk_hash(chunk)
+        self.conn.execute(
+            "INSERT INTO chunks (run_id, idx, chunk_hash, status, report, error, attempts, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(run_id, idx) DO UPDATE SET chunk_hash = excluded.chunk_hash,"
+            " status = excluded.status, report = excluded.report, error = excluded.error,"
+            " attempts = chunks.attempts + (excluded.status = 'pending'), updated_at = excluded.updated_at",
+            (self.run_id, i, digest, status,
+             None if report is None else json.dumps(report, ensure_ascii=False),
+             error, int(status == PENDING), time.time()),
+        )
+        self.conn.commit()
+        self._status[i] = (status, digest)
+
+    def mark_pending(self, i: int, chunk):
+        self._write(i, chunk, PENDING)
+
+    def mark_done(self, i: int, chunk, report_data: dict):
+        self._write(i, chunk, DONE, report=report_data)
+
+    def mark_failed(self, i: int, chunk, reason: str):
+        self._write(i, chunk, FAILED, error=reason)
+
+    def counts(self) -> dict:
+        counts = {PENDING: 0, DONE: 0, FAILED: 0}
+        for status, _ in self._status.values():
+            counts[status] += 1
+        return counts
+
+    def failures(self):
+        """실패한 청크 목록 [(번호, 사유, 시도 횟수)]."""
+        return self.conn.execute(
+            "SELECT idx, error, attempts FROM chunks WHERE run_id = ? AND status = ? ORDER BY idx",
+            (self.run_id, FAILED),
+        ).fetchall()
+
+    def reports(self):
+        """done 상태인 청크의 보고서 딕셔너리를 입력 순서대로 반환합니다."""
+        return [json.loads(row[0]) for row in self.conn.execute(
+            "SELECT report FROM chunks WHERE run_id = ? AND status = ? ORDER BY idx", (self.run_id, DONE))]
+
+    def finish(self):
+        self.conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), self.run_id))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,7 @@
+# 파일 이름: conftest.py (언더바 사용 필수)
+# 테스트에서 저장소 최상위 모듈(concurrent_analysis.py 등)을 바로 임포트할 수 있게 합니다.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+# 파일 이름: test_answer_cache.py (언더바 사용 필수)
+# 비동기 답변 스트리밍에서 캐시 조회/저장이 이벤트 루프를 막지 않는지 확인합니다.
+
+import asyncio
+import time
+
+from answer_cache import AnswerCache, CachedRagChain
+
+CACHE_DELAY = 0.2
+
+
+class SlowAnswerCache(AnswerCache):
+    """조회/저장마다 느린 디스크처럼 CACHE_DELAY초씩 멈추는 캐시."""
+
+    def get(self, *args, **kwargs):
+        time.sleep(CACHE_DELAY)
+        return super().get(*args, **kwargs)
+
+    def put(self, *args, **kwargs):
+        time.sleep(CACHE_DELAY)
+        return super().put(*args, **kwargs)
+
+
+class EchoChain:
+    async def astream(self, question):
+        for word in ("답변:", question):
+            yield word
+
+
+async def ticks_during(coroutine, interval=0.01):
+    """coroutine이 도는 동안 이벤트 루프가 다른 태스크를 몇 번 실행했는지 셉니다."""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(interval)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    result = await coroutine
+    task.cancel()
+    return result, ticks
+
+
+def test_cache_lookup_and_store_run_off_the_event_loop(tmp_path):
+    cache = SlowAnswerCache("v1", path=str(tmp_path / "answers.sqlite"))
+    chain = CachedRagChain(EchoChain(), cache)
+
+    async def ask(question):
+        return "".join([text async for text in chain.astream(question)])
+
+    answer, ticks = asyncio.run(ticks_during(ask("오늘 기분은?")))
+    assert answer == "답변:오늘 기분은?"
+    assert ticks >= 10   # 조회와 저장(각 0.2초) 동안에도 다른 태스크가 계속 돌았습니다. (막히면 0~1번)
+
+    cached, _ = asyncio.run(ticks_during(ask("오늘 기분은?")))
+    assert cached == answer and cache.hits == 1
+
+
+def test_concurrent_questions_share_one_cache(tmp_path):
+    cache = AnswerCache("v1", path=str(tmp_path / "answers.sqlite"))
+    chain = CachedRagChain(EchoChain(), cache)
+
+    async def ask_all(questions):
+        async def ask(question):
+            return "".join([text async for text in chain.astream(question)])
+        return await asyncio.gather(*(ask(question) for question in questions))
+
+    questions = [f"질문 {i}" for i in range(20)]
+    assert asyncio.run(ask_all(questions)) == [f"답변:{question}" for question in questions]
+    assert asyncio.run(ask_all(questions)) == [f"답변:{question}" for question in questions]
+    assert cache.hits == len(questions) and cache.misses == len(questions)
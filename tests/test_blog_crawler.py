@@ -0,0 +1,137 @@
+# 파일 이름: test_blog_crawler.py (언더바 사용 필수)
+# 로컬 http.server로 글 목록/RSS/글 페이지(tests/fixtures/blog)를 흉내 내어 크롤러를 네트워크 없이 확인합니다.
+
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from blog_crawler import crawl, crawl_incremental
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "blog")
+BLOG_ID = "testblog"
+
+
+class FixtureBlog:
+    """글 목록에 보일 글 번호(최신순), 목록 API 실패 여부, 글별 요청 횟수를 갖는 가짜 블로그."""
+
+    def __init__(self, log_nos):
+        self.log_nos = list(log_nos)
+        self.list_fails = False
+        self.hits = {}
+
+    def handler(self):
+        blog = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="text/html; charset=utf-8"):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path == "/PostTitleListAsync.naver":
+                    if blog.list_fails:
+                        return self._send(500, "error")
+                    page, per_page = int(query["currentPage"]), int(query["countPerPage"])
+                    items = blog.log_nos[(page - 1) * per_page:page * per_page] or blog.log_nos[-per_page:]
+                    body = json.dumps({"resultCode": "S", "totalCount": str(len(blog.log_nos)),
+                                       "postList": [{"logNo": log_no} for log_no in items]})
+                    return self._send(200, body, "application/json")
+                if url.path == f"/{BLOG_ID}.xml":
+                    with open(os.path.join(FIXTURE_DIR, "rss.xml"), encoding="utf-8") as f:
+                        return self._send(200, f.read(), "application/rss+xml")
+                if url.path == "/PostView.naver":
+                    log_no = query["logNo"]
+                    blog.hits[log_no] = blog.hits.get(log_no, 0) + 1
+                    path = os.path.join(FIXTURE_DIR, f"post_{log_no}.html")
+                    if not os.path.exists(path):
+                        return self._send(404, "not found")
+                    with open(path, encoding="utf-8") as f:
+                        return self._send(200, f.read())
+                return self._send(404, "not found")
+
+        return Handler
+
+
+@pytest.fixture
+def fixture_blog():
+    blog = FixtureBlog(["223000003", "223000002", "223000001"])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), blog.handler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    blog.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield blog
+    server.shutdown()
+    server.server_close()
+
+
+def run_incremental(blog, tmp_path, **kwargs):
+    return asyncio.run(crawl_incremental(
+        BLOG_ID, str(tmp_path / "posts.jsonl"), str(tmp_path / "crawl-state.json"),
+        base_url=blog.base_url, rss_url=blog.base_url + "/{blog_id}.xml", per_host_interval=0, **kwargs,
+    ))
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_incremental_crawl_writes_jsonl_and_resumes(fixture_blog, tmp_path):
+    counts = run_incremental(fixture_blog, tmp_path)
+    assert counts == {"done": 2, "not_modified": 0, "skipped": 1, "failed": 0}
+    posts = read_jsonl(tmp_path / "posts.jsonl")
+    assert [post["log_no"] for post in posts] == ["223000001", "223000002"]   # 오래된 글부터
+    assert posts[0] == {"log_no": "223000001", "date": "2025. 3. 1. 21:00", "title": "첫 번째 일기",
+                        "content": "오늘은 공원에서 산책을 했다.\n기분이 좋았다."}
+
+    # 새 글이 올라오면 그 글만 가져오고, 받은 글과 건너뛴 글은 다시 요청하지 않습니다.
+    fixture_blog.log_nos.insert(0, "223000004")
+    counts = run_incremental(fixture_blog, tmp_path)
+    assert counts == {"done": 1, "not_modified": 0, "skipped": 0, "failed": 0}
+    assert [post["log_no"] for post in read_jsonl(tmp_path / "posts.jsonl")][-1] == "223000004"
+    assert fixture_blog.hits == {"223000001": 1, "223000002": 1, "223000003": 1, "223000004": 1}
+
+    with open(tmp_path / "crawl-state.json", encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["last_seen_log_no"] == "223000004"
+    assert state["posts"]["223000003"]["status"] == "skipped"
+
+
+def test_full_listing_does_not_refetch_skipped_posts(fixture_blog, tmp_path):
+    run_incremental(fixture_blog, tmp_path)
+    counts = run_incremental(fixture_blog, tmp_path, since_last=False)
+    assert counts == {"done": 0, "not_modified": 0, "skipped": 0, "failed": 0}
+    assert fixture_blog.hits["223000003"] == 1
+
+
+def test_interrupted_run_resumes_from_jsonl(fixture_blog, tmp_path):
+    # 상태 파일을 저장하기 전에 멈춘 경우: JSONL에 있는 글은 완료로 보고 다시 받지 않습니다.
+    with open(tmp_path / "posts.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"log_no": "223000001", "date": "", "title": "", "content": ""}) + "\n")
+        f.write('{"log_no": "2230000')   # 쓰는 도중 잘린 줄
+    run_incremental(fixture_blog, tmp_path)
+    assert "223000001" not in fixture_blog.hits
+    # 새 글은 잘린 줄에 이어 붙지 않고 온전한 한 줄로 기록됩니다.
+    lines = (tmp_path / "posts.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[-1])["log_no"] == "223000002"
+
+
+def test_crawl_falls_back_to_rss(fixture_blog):
+    fixture_blog.list_fails = True
+    posts = asyncio.run(crawl(BLOG_ID, base_url=fixture_blog.base_url,
+                              rss_url=fixture_blog.base_url + "/{blog_id}.xml", per_host_interval=0))
+    assert [post["title"] for post in posts] == ["첫 번째 일기", "두 번째 일기"]
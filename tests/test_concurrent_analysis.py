@@ -0,0 +1,99 @@
+# 파일 이름: test_concurrent_analysis.py (언더바 사용 필수)
+# 가짜 채팅 모델로 429/5xx 재시도와 재시도하지 않는 파싱 오류를 확인합니다. (API 키 불필요)
+
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage
+
+from analysis_chains import get_batch_emotion_analysis_chain, get_emotion_analysis_chain
+from concurrent_analysis import (AdaptiveRateLimiter, ainvoke_with_retry, analyze_chunks_async,
+                                 get_status_code, is_retryable_error)
+from fake_models import FakeEmotionChatModel, FakeRateLimitError
+
+
+class ScriptedChatModel(FakeEmotionChatModel):
+    """앞의 호출 몇 번은 정해진 예외를 내고, 그다음부터 정상 응답하는 가짜 모델."""
+
+    failures: list = []
+    garbage_for_batches: bool = False
+
+    def _next_response(self, messages):
+        if self.call_count < len(self.failures):
+            self.call_count += 1
+            raise self.failures[self.call_count - 1]
+        text = str(messages[-1].content)
+        if self.garbage_for_batches and "[청크 " in text:
+            self.call_count += 1
+            return AIMessage(content="결과: 550 원짜리 커피를 마셨다")   # JSON이 아닌 응답 → 파싱 오류
+        return super()._next_response(messages)
+
+
+def fast_limiter():
+    return AdaptiveRateLimiter(rpm=60000, tpm=1e9, base_delay=0.001, max_delay=0.01)
+
+
+def analyze(chain, limiter, max_retries=3):
+    inputs = {"diary_chunk": "오늘은 산책을 했다.",
+              "format_instructions": chain.steps[-1].get_format_instructions()}
+    return asyncio.run(ainvoke_with_retry(chain, inputs, limiter, tokens=10, max_retries=max_retries))
+
+
+def test_rate_limit_is_retried_and_slows_down():
+    model = ScriptedChatModel(failures=[FakeRateLimitError(), FakeRateLimitError()])
+    limiter = fast_limiter()
+    report = analyze(get_emotion_analysis_chain(model), limiter)
+    assert report.emotion_tags
+    assert model.call_count == 3
+    assert limiter.scale < 1.0
+
+
+def test_server_error_is_retried_without_slowing_down():
+    model = ScriptedChatModel(failures=[FakeRateLimitError("503 Service Unavailable (fake)", status_code=503)])
+    limiter = fast_limiter()
+    analyze(get_emotion_analysis_chain(model), limiter)
+    assert model.call_count == 2
+    assert limiter.scale == 1.0
+
+
+def test_retries_give_up_after_max_retries():
+    model = ScriptedChatModel(failures=[FakeRateLimitError()] * 5)
+    with pytest.raises(FakeRateLimitError):
+        analyze(get_emotion_analysis_chain(model), fast_limiter(), max_retries=2)
+    assert model.call_count == 3
+
+
+def test_parse_error_with_numbers_is_not_retried():
+    error = OutputParserException("Invalid json output: 550 원, 503호, 429번 버스")
+    assert get_status_code(error) is None
+    assert not is_retryable_error(error)
+
+    model = ScriptedChatModel(failures=[error])
+    with pytest.raises(OutputParserException):
+        analyze(get_emotion_analysis_chain(model), fast_limiter())
+    assert model.call_count == 1
+
+
+def test_wrapped_provider_error_keeps_status():
+    class ResourceExhausted(Exception):
+        pass
+
+    try:
+        try:
+            raise ResourceExhausted("quota")
+        except ResourceExhausted as e:
+            raise RuntimeError("model call failed") from e
+    except RuntimeError as wrapped:
+        assert get_status_code(wrapped) == 429
+
+
+def test_batch_parse_error_is_split_instead_of_failed():
+    model = ScriptedChatModel(garbage_for_batches=True)
+    chunks = [Document(page_content=f"{n}번째 일기. 550 원짜리 커피.", metadata={"entry_id": n + 1}) for n in range(4)]
+    reports = asyncio.run(analyze_chunks_async(
+        chunks, get_emotion_analysis_chain(model), max_concurrency=1, rate_limiter=fast_limiter(),
+        batch_chain=get_batch_emotion_analysis_chain(model),
+    ))
+    assert [report["metadata"]["entry_id"] for report in reports] == [1, 2, 3, 4]
@@ -0,0 +1,35 @@
+# 파일 이름: test_context_assembler.py (언더바 사용 필수)
+# 여러 청크로 나뉜 긴 일기의 분석 요약이 모든 청크에서 모여 대용 정보로 들어가는지 확인합니다.
+
+from langchain_core.documents import Document
+
+from context_assembler import ContextAssembler
+
+LONG_BODY = " ".join(f"오늘 {i}번째로 있었던 일은 평범했다." for i in range(40))
+
+
+def report(entry_id: int, entry_no: int, part: int, summary: str, emotion: str) -> dict:
+    return {"summary": summary, "metadata": {"entry_id": entry_id, "entry_no": entry_no, "part": part},
+            "emotion_tags": [{"emotion": emotion, "intensity": 0.8, "reason": summary}]}
+
+
+def merged_entry() -> Document:
+    # ParentChildRetriever가 돌려주는 것처럼 나뉜 청크를 합친 일기 한 편 (첫 청크의 entry_id를 가짐)
+    return Document(page_content=f"날짜: 2025-11-03\n제목: 긴 하루\n본문:\n{LONG_BODY}",
+                    metadata={"entry_id": 7, "entry_no": 5, "part": 0, "parts": 2})
+
+
+def test_surrogate_collects_every_part_of_a_split_entry():
+    reports = [report(8, 5, 1, "저녁에 친구와 화해함", "안도"),
+               report(7, 5, 0, "아침 회의에서 실수함", "불안"),
+               report(9, 6, 0, "다른 일기", "기쁨")]
+    context = ContextAssembler(reports, max_tokens=120).assemble([merged_entry()], "화해")
+    assert "[분석 요약] 아침 회의에서 실수함 저녁에 친구와 화해함" in context
+    assert "불안(0.8)" in context and "안도(0.8)" in context
+    assert "다른 일기" not in context
+
+
+def test_reports_without_entry_no_still_match_by_entry_id():
+    old = {"summary": "예전 분석", "metadata": {"entry_id": 7}, "emotion_tags": []}
+    doc = Document(page_content=f"날짜: 2025-11-03\n제목: 긴 하루\n본문:\n{LONG_BODY}", metadata={"entry_id": 7})
+    assert "[분석 요약] 예전 분석" in ContextAssembler([old], max_tokens=120).assemble([doc], "회의")
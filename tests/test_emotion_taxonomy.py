@@ -0,0 +1,51 @@
+# 파일 이름: test_emotion_taxonomy.py (언더바 사용 필수)
+# 감정 이름 → 대표 감정 매핑: 부정 표현이 반대 감정으로 묶이지 않는지와 예전 버전 매핑 표 무효화를 확인합니다.
+
+import json
+
+from emotion_taxonomy import CANONICAL_EMOTIONS, TAXONOMY_VERSION, EmotionTaxonomy
+
+
+def taxonomy(tmp_path) -> EmotionTaxonomy:
+    return EmotionTaxonomy(path=str(tmp_path / "taxonomy.json"))
+
+
+def test_plain_suffix_matches_canonical_emotion(tmp_path):
+    labels = taxonomy(tmp_path)
+    assert labels.canonical_label("극심한 불안감") == "불안"
+    assert labels.canonical_label("약간의 짜증") == "짜증"
+    assert labels.canonical_label("깊은 우울감") == "우울"
+
+
+def test_negated_expressions_do_not_map_to_the_emotion_they_contain(tmp_path):
+    labels = taxonomy(tmp_path)
+    # 예전 포함 관계 규칙은 '안정감'이 들어 있다고 평온, '불안'이 들어 있다고 불안으로 묶었습니다.
+    assert labels.canonical_label("불안정감") not in ("평온", "불안")
+    assert labels.canonical_label("불안하지 않다") != "불안"
+    assert labels.canonical_label("불편안") != "평온"
+    assert labels.canonical_label("무기대") != "설렘"
+    assert labels.canonical_id("불안정감") >= len(CANONICAL_EMOTIONS)   # 새 대표 감정으로 등록
+
+
+def test_old_taxonomy_version_recomputes_mapping_but_keeps_ids(tmp_path):
+    path = tmp_path / "taxonomy.json"
+    saved_labels = CANONICAL_EMOTIONS + ["번아웃 직전"]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": TAXONOMY_VERSION - 1, "labels": saved_labels,
+                   "mapping": {"불안정감": CANONICAL_EMOTIONS.index("평온")}}, f, ensure_ascii=False)
+
+    labels = EmotionTaxonomy(path=str(path))
+    assert labels.labels == saved_labels              # 이미 붙은 ID는 그대로
+    assert labels.canonical_label("불안정감") != "평온"  # 예전 규칙으로 만든 매핑은 버림
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["version"] == TAXONOMY_VERSION
+    assert saved["mapping"]["불안정감"] != CANONICAL_EMOTIONS.index("평온")
+
+
+def test_current_taxonomy_version_reuses_saved_mapping(tmp_path):
+    path = tmp_path / "taxonomy.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": TAXONOMY_VERSION, "labels": CANONICAL_EMOTIONS,
+                   "mapping": {"몽글몽글": CANONICAL_EMOTIONS.index("설렘")}}, f, ensure_ascii=False)
+    assert EmotionTaxonomy(path=str(path)).canonical_label("몽글몽글") == "설렘"
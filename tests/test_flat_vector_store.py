@@ -0,0 +1,180 @@
+# 파일 이름: test_flat_vector_store.py (언더바 사용 필수)
+# 내장 벡터 스토어의 저장/다시 열기, 끊긴 이어 쓰기 복구, 삭제 후 compact, int8 재현율, 필터 의미를 확인합니다.
+
+import json
+import os
+import zlib
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+import flat_vector_store
+from flat_vector_store import FlatVectorStore
+
+DIM = 16
+
+
+class TableEmbeddings(Embeddings):
+    """텍스트마다 정해진 벡터를 돌려주는 임베딩. (표에 없는 텍스트는 해시 시드로 만든 무작위 벡터)"""
+
+    def __init__(self, table=None):
+        self.table = table or {}
+
+    def _vector(self, text):
+        if text in self.table:
+            return list(self.table[text])
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        return rng.standard_normal(DIM).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def add_days(store, count=6, start=0):
+    texts = [f"일기 {i}" for i in range(start, start + count)]
+    metadatas = [{"date_num": 20250101 + i, "entry_id": i + 1} for i in range(start, start + count)]
+    store.add_texts(texts, metadatas, ids=[f"id{i}" for i in range(start, start + count)])
+    return texts
+
+
+def nearest_text(store, text):
+    return store.similarity_search(text, k=1)[0].page_content
+
+
+@pytest.fixture(params=["float32", "int8"])
+def dtype(request):
+    return request.param
+
+
+def test_reopen_round_trip(tmp_path, dtype):
+    store = FlatVectorStore(TableEmbeddings(), str(tmp_path), dtype)
+    texts = add_days(store)
+    store.update_metadata(["id2"], [{"date_num": 20251231, "entry_id": 99, "title": "고침"}])
+    store.delete(["id4"])
+
+    reopened = FlatVectorStore(TableEmbeddings(), str(tmp_path), dtype)
+    assert len(reopened) == 5 and reopened.dim == DIM
+    assert reopened.get(["id2"])["metadatas"] == [{"date_num": 20251231, "entry_id": 99, "title": "고침"}]
+    assert reopened.get(["id4"])["ids"] == []
+    for text in (texts[0], texts[5]):
+        assert nearest_text(reopened, text) == text
+    assert [doc.page_content for doc in reopened.similarity_search(texts[4], k=5)].count(texts[4]) == 0
+
+
+def test_truncated_tail_is_cut_back_and_appends_stay_aligned(tmp_path, dtype):
+    store = FlatVectorStore(TableEmbeddings(), str(tmp_path), dtype)
+    add_days(store, 3)
+    vectors_name = flat_vector_store.DTYPES[dtype][1]
+    # 다음 행을 쓰다가 멈춘 것처럼 벡터/열/ID 파일에만 일부를 덧붙입니다.
+    for name, junk in ((vectors_name, b"\x01" * 10), ("columns.i64", b"\x00" * 16), ("ids.txt", b"half")):
+        with open(tmp_path / name, "ab") as f:
+            f.write(junk)
+
+    recovered = FlatVectorStore(TableEmbeddings(), str(tmp_path), dtype)
+    assert recovered.ids == ["id0", "id1", "id2"]
+    assert os.path.getsize(tmp_path / "columns.i64") == 3 * 16
+    texts = add_days(recovered, 2, start=3)
+
+    reopened = FlatVectorStore(TableEmbeddings(), str(tmp_path), dtype)
+    assert reopened.ids == ["id0", "id1", "id2", "id3", "id4"]
+    assert nearest_text(reopened, texts[1]) == texts[1]
+    assert reopened.get(["id4"])["metadatas"] == [{"date_num": 20250105, "entry_id": 5}]
+    assert [doc.id for doc in reopened.similarity_search(texts[0], k=1, filter={"entry_id": 4})] == ["id3"]
+
+
+def test_crash_after_meta_before_first_rows_opens_empty(tmp_path):
+    with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"version": flat_vector_store.STORE_VERSION, "dim": DIM, "dtype": "float32"}, f)
+    store = FlatVectorStore(TableEmbeddings(), str(tmp_path))
+    assert len(store) == 0
+    texts = add_days(store, 2)
+    assert FlatVectorStore(TableEmbeddings(), str(tmp_path)).ids == ["id0", "id1"]
+    assert nearest_text(store, texts[1]) == texts[1]
+
+
+def test_delete_compacts_when_most_rows_are_dead(tmp_path, dtype):
+    store = FlatVectorStore(TableEmbeddings(), str(tmp_path), dtype)
+    texts = add_days(store)
+    before = {text: store.similarity_search(text, k=2, filter={"entry_id": {"$in": [5, 6]}}) for text in texts[4:]}
+    store.delete(["id0", "id1", "id2", "id3"])
+
+    assert store.ids == ["id4", "id5"]            # 죽은 행이 더 많아져 compact()로 다시 썼습니다.
+    assert not any(name.startswith("compact") for name in os.listdir(tmp_path))
+    reopened = FlatVectorStore(TableEmbeddings(), str(tmp_path), dtype)
+    for text, docs in before.items():
+        assert [doc.id for doc in reopened.similarity_search(text, k=2)] == [doc.id for doc in docs]
+    assert reopened.get(["id5"])["metadatas"] == [{"date_num": 20250106, "entry_id": 6}]
+
+    reopened.delete(["id4", "id5"])
+    empty = FlatVectorStore(TableEmbeddings(), str(tmp_path), dtype)
+    assert len(empty) == 0 and empty.dim is None
+
+
+def test_interrupted_compaction_is_finished_on_open(tmp_path, monkeypatch):
+    store = FlatVectorStore(TableEmbeddings(), str(tmp_path))
+    texts = add_days(store)
+    store.delete(["id0", "id1"])
+
+    real_replace, calls = os.replace, []
+
+    def crash_after_two(src, dst):
+        calls.append(src)
+        if len(calls) > 2:   # compact.done/으로 이름을 바꾸고 파일 하나를 옮긴 뒤 멈춤
+            raise KeyboardInterrupt
+        real_replace(src, dst)
+
+    monkeypatch.setattr(flat_vector_store.os, "replace", crash_after_two)
+    with pytest.raises(KeyboardInterrupt):
+        store.compact()
+    monkeypatch.undo()
+    assert os.path.isdir(tmp_path / flat_vector_store.COMPACT_DONE)
+
+    reopened = FlatVectorStore(TableEmbeddings(), str(tmp_path))
+    assert reopened.ids == ["id2", "id3", "id4", "id5"]
+    assert not os.path.exists(tmp_path / flat_vector_store.COMPACT_DONE)
+    assert nearest_text(reopened, texts[3]) == texts[3]
+    assert reopened.get(["id3"])["metadatas"] == [{"date_num": 20250104, "entry_id": 4}]
+
+
+def test_int8_recall_matches_float32(tmp_path):
+    rng = np.random.default_rng(0)
+    table = {f"문서 {i}": rng.standard_normal(DIM) for i in range(400)}
+    queries = rng.standard_normal((20, DIM))
+    exact = FlatVectorStore(TableEmbeddings(table), str(tmp_path / "f32"))
+    quantized = FlatVectorStore(TableEmbeddings(table), str(tmp_path / "i8"), "int8")
+    for store in (exact, quantized):
+        store.add_texts(list(table), ids=list(table))
+    quantized = FlatVectorStore(TableEmbeddings(table), str(tmp_path / "i8"), "int8")
+
+    hits = 0
+    for query in queries:
+        expected = {doc.id for doc in exact.similarity_search_by_vector(query.tolist(), k=10)}
+        hits += len(expected & {doc.id for doc in quantized.similarity_search_by_vector(query.tolist(), k=10)})
+    assert hits / (10 * len(queries)) >= 0.9
+
+
+def test_filter_semantics():
+    store = FlatVectorStore(TableEmbeddings())
+    add_days(store)
+    store.add_texts(["날짜 없음"], [{"entry_id": 7}], ids=["undated"])
+
+    def ids(where):
+        return sorted(doc.id for doc in store.similarity_search("질문", k=10, filter=where))
+
+    assert ids({"entry_id": 2}) == ["id1"]
+    assert ids({"date_num": {"$gte": 20250104}}) == ["id3", "id4", "id5"]
+    assert ids({"$and": [{"date_num": {"$gte": 20250102}}, {"date_num": {"$lte": 20250103}}]}) == ["id1", "id2"]
+    assert ids({"$or": [{"entry_id": 1}, {"entry_id": {"$in": [6, 7]}}]}) == ["id0", "id5", "undated"]
+    assert ids({"entry_id": {"$in": [3, 99]}}) == ["id2"]
+    # 값이 없는 행은 비교 조건에는 걸리지 않고, 부정 조건($ne/$nin)에는 남습니다.
+    assert "undated" not in ids({"date_num": {"$lt": 20260101}})
+    assert ids({"date_num": {"$ne": 20250101}}) == ["id1", "id2", "id3", "id4", "id5", "undated"]
+    assert ids({"date_num": {"$nin": [20250101, 20250102]}}) == ["id2", "id3", "id4", "id5", "undated"]
+    store.delete(["id3"])
+    assert ids({"date_num": {"$gte": 20250104}}) == ["id4", "id5"]
+    with pytest.raises(ValueError):
+        ids({"title": "제목"})
@@ -0,0 +1,49 @@
+# 파일 이름: test_parent_retriever.py (언더바 사용 필수)
+# 여러 일기에 같은 문장이 있어도 자식 문장이 일기마다 따로 색인되고 검색되는지 확인합니다.
+
+from data_preparer import stream_documents
+from embedding_backends import HashingEmbeddings
+from parent_retriever import ParentChildRetriever, stream_child_documents
+from vector_index import chunk_id, sync_vectorstore
+
+DIARY = """오늘은 비가 왔다. 회사에서 발표를 망쳐서 속상했다.
+---
+오늘은 비가 왔다. 친구와 떡볶이를 먹어서 즐거웠다.
+"""
+
+
+def index(tmp_path):
+    path = tmp_path / "diary.txt"
+    path.write_text(DIARY, encoding="utf-8")
+    parents = {chunk_id(doc): doc for doc in stream_documents(str(path))}
+    children = list(stream_child_documents(parents.values(), max_tokens=8))
+    store = sync_vectorstore(iter(children), HashingEmbeddings(dim=64),
+                             persist_directory=str(tmp_path / "vectors"), collection_name="sentences", store="flat")
+    return parents, children, store
+
+
+def test_identical_sentences_in_undated_entries_keep_separate_children(tmp_path):
+    parents, children, store = index(tmp_path)
+    rain = [child for child in children if child.page_content == "오늘은 비가 왔다."]
+    assert len(rain) == 2 and rain[0].id != rain[1].id
+    assert [child.id for child in children] == [f"{child.metadata['parent_id']}:{child.metadata['child']}"
+                                                 for child in children]
+
+    stored = store.get(ids=[child.id for child in rain])
+    assert {metadata["parent_id"] for metadata in stored["metadatas"]} == set(parents)
+    assert {metadata["entry_id"] for metadata in stored["metadatas"]} == {1, 2}
+
+
+def test_shared_sentence_retrieves_both_entries(tmp_path):
+    parents, _, store = index(tmp_path)
+    retriever = ParentChildRetriever(child_retriever=store.as_retriever(search_kwargs={"k": 2}),
+                                     parents=parents, k=2)
+    docs = retriever.invoke("오늘은 비가 왔다.")
+    assert sorted(doc.metadata["entry_no"] for doc in docs) == [1, 2]
+
+
+def test_resync_keeps_child_ids_stable(tmp_path):
+    _, children, _ = index(tmp_path)
+    _, again, store = index(tmp_path)
+    assert [child.id for child in again] == [child.id for child in children]
+    assert len(store) == len(children)
@@ -0,0 +1,76 @@
+# 파일 이름: test_query_router.py (언더바 사용 필수)
+# 감정 추이의 주 경계(ISO 주)와 답변 다듬기 스트리밍이 중간에 실패했을 때의 처리를 확인합니다.
+
+import asyncio
+from datetime import date
+
+import pytest
+
+from query_router import EmotionIndex, QueryRouter, RoutedRagChain
+from report_pipeline import period_keys
+
+
+def report(day: str, emotion: str = "불안", intensity: float = 0.7) -> dict:
+    return {"summary": f"{day} 일기", "metadata": {"date": day},
+            "emotion_tags": [{"emotion": emotion, "intensity": intensity, "reason": "회의"}]}
+
+
+def trend(reports, question="불안 추이는?"):
+    router = QueryRouter(EmotionIndex.from_reports(reports), today=date(2026, 2, 1))
+    routed = router.route(question)
+    assert routed is not None and routed.kind == "trend"
+    return routed.data["series"]
+
+
+def test_weekly_trend_groups_by_iso_week_starting_monday():
+    # 2024-01-01은 월요일: 1일~7일이 2024-W01, 8일부터 2024-W02 (numpy 주는 목요일에 시작해 2023-12-28로 묶임)
+    reports = [report("2024-01-01"), report("2024-01-07", "기쁨"), report("2024-01-08")]
+    series = trend(reports)
+    assert [item["period"] for item in series] == ["2024-W01", "2024-W02"]
+    assert [(item["entries"], item["matched"]) for item in series] == [(2, 1), (1, 1)]
+
+
+def test_weekly_trend_keys_match_report_pipeline_across_new_year():
+    days = ["2025-12-28", "2025-12-29", "2026-01-01", "2026-01-05"]
+    series = trend([report(day) for day in days])
+    assert [item["period"] for item in series] == ["2025-W52", "2026-W01", "2026-W02"]
+    assert [item["entries"] for item in series] == [1, 2, 1]
+    assert {period_keys(day)[1].split("/")[1] for day in days} == {item["period"] for item in series}
+
+
+class FakeRag:
+    cache = None
+
+
+class BrokenPhraseChain:
+    """fail_after개를 보낸 뒤 실패하는 가짜 다듬기 체인."""
+
+    def __init__(self, fail_after: int):
+        self.fail_after = fail_after
+
+    async def astream(self, inputs):
+        for i in range(self.fail_after):
+            yield f"다듬은 문장 {i} "
+        raise RuntimeError("연결 끊김")
+
+
+def collect(chain, question):
+    async def run():
+        return [text async for text in chain.astream(question)]
+    return asyncio.run(run())
+
+
+def routed_chain(fail_after: int) -> RoutedRagChain:
+    router = QueryRouter(EmotionIndex.from_reports([report("2024-01-01"), report("2024-01-08")]))
+    return RoutedRagChain(FakeRag(), router, phrase_chain=BrokenPhraseChain(fail_after))
+
+
+def test_phrasing_failure_before_any_text_falls_back_to_computed_answer():
+    chain = routed_chain(fail_after=0)
+    parts = collect(chain, "불안 추이는?")
+    assert parts == [chain.router.route("불안 추이는?").text]
+
+
+def test_phrasing_failure_after_partial_text_does_not_repeat_answer():
+    with pytest.raises(RuntimeError):
+        collect(routed_chain(fail_after=2), "불안 추이는?")
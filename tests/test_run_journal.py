@@ -0,0 +1,30 @@
+# 파일 이름: test_run_journal.py (언더바 사용 필수)
+# 같은 초에 시작한 두 실행의 ID가 겹치지 않고, 이어서 실행할 때 알맞은 실행을 고르는지 확인합니다.
+
+from langchain_core.documents import Document
+
+import run_journal
+from run_journal import DONE, RunJournal
+
+
+def test_runs_started_in_the_same_second_get_distinct_ids(tmp_path, monkeypatch):
+    path = str(tmp_path / "journal.sqlite")
+    monkeypatch.setattr(run_journal.time, "time", lambda: 1_700_000_000.0)   # 두 실행의 시작 시각이 완전히 같음
+    chunk = Document(page_content="오늘은 산책을 했다.")
+
+    first = RunJournal(path=path, data_path="first.txt")
+    first.mark_done(0, chunk, {"summary": "첫 실행"})
+    second = RunJournal(path=path, data_path="second.txt")
+    second.mark_pending(0, chunk)
+    assert first.run_id != second.run_id
+    assert first.run_id[:15] == second.run_id[:15]   # 시각 부분(YYYYmmdd-HHMMSS)은 같고 꼬리만 다름
+
+    # 이어서 실행하면 나중에 시작한 실행을 고르고, 두 실행의 기록은 섞이지 않습니다.
+    assert RunJournal.latest_run_id(path) == second.run_id
+    resumed = RunJournal(RunJournal.latest_run_id(path), path=path)
+    assert resumed.data_path == "second.txt"
+    assert resumed.counts()[DONE] == 0 and resumed.reports() == []
+    reopened_first = RunJournal(first.run_id, path=path)
+    assert reopened_first.data_path == "first.txt" and reopened_first.reports() == [{"summary": "첫 실행"}]
+    for journal in (first, second, resumed, reopened_first):
+        journal.close()
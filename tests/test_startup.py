@@ -0,0 +1,37 @@
+# 파일 이름: test_startup.py (언더바 사용 필수)
+# `cli.py --help`와 `stats` 경로가 무거운 모듈 없이 시작 시간 예산 안에 뜨는지 확인합니다.
+
+import os
+import subprocess
+import sys
+
+from cli import HEAVY_MODULES, STARTUP_BUDGET_SECONDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# --help에서는 NumPy도 불러오지 않아야 합니다. (stats만 data_analysis를 통해 NumPy를 씁니다.)
+HELP_FORBIDDEN = set(HEAVY_MODULES) | {"numpy"}
+
+
+def import_times(*args):
+    """`python -X importtime ...`을 실행해 {최상위 모듈 이름: 자체 임포트 시간(초)}를 반환합니다."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, check=True,
+                            capture_output=True, text=True, env={**os.environ, "GEMINI_API_KEY": ""})
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        top = name.strip().split(".")[0]
+        times[top] = times.get(top, 0.0) + int(self_us) / 1e6
+    return times
+
+
+def test_help_skips_heavy_modules():
+    times = import_times("cli.py", "--help")
+    assert not HELP_FORBIDDEN & set(times), sorted(HELP_FORBIDDEN & set(times))
+    assert sum(times.values()) < STARTUP_BUDGET_SECONDS
+
+
+def test_stats_path_skips_langchain():
+    times = import_times("-c", "import cli, data_analysis")
+    assert not set(HEAVY_MODULES) & set(times), sorted(set(HEAVY_MODULES) & set(times))
@@ -0,0 +1,306 @@
+# 파일 이름: tracing.py (언더바 사용 필수)
+# LangChain 콜백 기반 계측. 단계(stage)별 구간(span)과 LLM/임베딩/검색 호출 하나하나의
+# 지연 시간, 입력/출력 토큰, 재시도, 캐시 사용, 파싱 실패를 기록해
+# OpenTelemetry(OTLP/JSON) 형식의 로컬 trace 파일로 저장하고 실행이 끝나면 요약 표를 출력합니다.
+# trace_run() 밖에서는 span()/add_event()가 아무것도 하지 않으므로 계측 코드를 그대로 둬도 됩니다.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+DEFAULT_TRACE_PATH = "./.cache/traces/latest-trace.json"
+SERVICE_NAME = "maum-diary"
+LATENCY_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0)   # 지연 시간 히스토그램 경계(초)
+
+_current_span = ContextVar("maum_current_span", default=None)
+# 이 ContextVar에 핸들러가 있으면 LangChain이 모든 체인/모델/검색기 실행에 자동으로 붙입니다.
+_handler_var = ContextVar("maum_trace_handler", default=None)
+register_configure_hook(_handler_var, inheritable=True)
+_active_tracer = None
+
+
+class Span:
+    """구간 하나. stage는 그 구간이 속한 최상위 단계 이름입니다. (요약 표의 행)"""
+
+    __slots__ = ("name", "span_id", "parent_id", "stage", "start_ns", "end_ns", "attributes", "events", "error")
+
+    def __init__(self, name: str, parent, attributes: dict):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else ""
+        # 루트 바로 아래 구간이 단계이며, 그보다 깊은 구간은 부모의 단계를 물려받습니다.
+        self.stage = (parent.stage or name) if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes)
+        self.events = []
+        self.error = None
+
+    @property
+    def seconds(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict):
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class Tracer:
+    """실행(run) 하나의 구간 목록."""
+
+    def __init__(self, name: str):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, None)
+
+    def start_span(self, name: str, parent, **attributes) -> Span:
+        span = Span(name, parent, attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @staticmethod
+    def end_span(span: Span, error: BaseException = None):
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self) -> dict:
+        """OTLP/JSON(ExportTraceServiceRequest) 형식. Jaeger/Tempo 등 OpenTelemetry 도구로 바로 읽을 수 있습니다."""
+        spans = [{
+            "traceId": self.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": _otlp_attributes({"stage": span.stage, **span.attributes}),
+            "events": [{"timeUnixNano": str(at), "name": name, "attributes": _otlp_attributes(attributes)}
+                       for at, name, attributes in span.events],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        } for span in self.spans]
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+        }]}
+
+    def export(self, path: str = DEFAULT_TRACE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_otlp(), f, ensure_ascii=False)
+        return path
+
+    def summary(self) -> dict:
+        """단계별 {시간, LLM 호출 수/지연 시간 백분위/히스토그램, 토큰, 임베딩/검색 호출, 재시도, 캐시, 오류}."""
+        rows = {}
+        for span in self.spans:
+            if span.stage is None:
+                continue
+            row = rows.setdefault(span.stage, {
+                "seconds": 0.0, "llm_latencies": [], "input_tokens": 0, "output_tokens": 0,
+                "embedding_calls": 0, "retriever_calls": 0, "retries": 0, "cache_hits": 0,
+                "parse_failures": 0, "errors": 0,
+            })
+            if span.name == span.stage:
+                row["seconds"] += span.seconds
+            elif span.name == "llm":
+                row["llm_latencies"].append(span.seconds)
+            elif span.name == "embedding":
+                row["embedding_calls"] += 1
+            elif span.name == "retriever":
+                row["retriever_calls"] += 1
+            row["input_tokens"] += span.attributes.get("llm.input_tokens", 0)
+            row["output_tokens"] += span.attributes.get("llm.output_tokens", 0)
+            row["errors"] += span.error is not None
+            for _, name, attributes in span.events:
+                if name == "retry":
+                    row["retries"] += 1
+                elif name == "cache_hit":
+                    row["cache_hits"] += attributes.get("count", 1)
+                elif name == "parse_failure":
+                    row["parse_failures"] += 1
+
+        for row in rows.values():
+            latencies = np.asarray(row.pop("llm_latencies"), dtype=np.float64)
+            row["llm_calls"] = len(latencies)
+            row["llm_p50"], row["llm_p95"] = (np.percentile(latencies, [50, 95]).tolist()
+                                              if len(latencies) else (None, None))
+            row["llm_histogram"] = np.bincount(np.searchsorted(LATENCY_BUCKETS, latencies),
+                                               minlength=len(LATENCY_BUCKETS) + 1).tolist()
+        return rows
+
+    def format_summary(self) -> str:
+        def seconds(value):
+            return "-" if value is None else f"{value:.2f}"
+
+        header = ("단계", "시간(s)", "LLM", "p50(s)", "p95(s)", "입력 토큰", "출력 토큰",
+                  "임베딩", "검색", "재시도", "캐시", "파싱 실패", "오류")
+        rows = [header]
+        histograms = []
+        for stage, row in self.summary().items():
+            rows.append((stage, seconds(row["seconds"]), str(row["llm_calls"]), seconds(row["llm_p50"]),
+                         seconds(row["llm_p95"]), str(row["input_tokens"]), str(row["output_tokens"]),
+                         str(row["embedding_calls"]), str(row["retriever_calls"]), str(row["retries"]),
+                         str(row["cache_hits"]), str(row["parse_failures"]), str(row["errors"])))
+            if row["llm_calls"]:
+                bounds = [f"<{b:g}s" for b in LATENCY_BUCKETS] + [f"≥{LATENCY_BUCKETS[-1]:g}s"]
+                histograms.append(f"  {stage} LLM 지연 분포: " + " ".join(
+                    f"{bound}:{count}" for bound, count in zip(bounds, row["llm_histogram"]) if count))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+        lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows]
+        return "\n".join(lines + histograms)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """현재 구간 아래에 새 구간을 엽니다. 추적 중이 아니면 아무것도 하지 않습니다."""
+    tracer = _active_tracer
+    if tracer is None:
+        yield None
+        return
+    current = tracer.start_span(name, _current_span.get() or tracer.root, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        tracer.end_span(current, e)
+        raise
+    else:
+        tracer.end_span(current)
+    finally:
+        _current_span.reset(token)
+
+
+def add_event(name: str, **attributes):
+    """현재 구간에 이벤트(retry, cache_hit, parse_failure 등)를 남깁니다. 추적 중이 아니면 무시합니다."""
+    tracer = _active_tracer
+    if tracer is None:
+        return
+    current = _current_span.get() or tracer.root
+    current.events.append((time.time_ns(), name, attributes))
+
+
+def _estimate_tokens(text: str) -> int:
+    from concurrent_analysis import estimate_tokens
+
+    return estimate_tokens(text)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LLM/검색기 호출마다 구간을 만들고, 출력 파서 오류는 parse_failure 이벤트로 남깁니다.
+
+    Gemini처럼 응답에 usage_metadata가 있으면 실제 토큰 수를, 없으면 글자 수로 추정한 값을 기록합니다.
+    """
+
+    run_inline = True   # 호출한 코루틴의 컨텍스트(현재 단계)에서 바로 실행
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self.runs = {}
+        self.parsers = set()
+
+    def _start(self, run_id, name: str, **attributes):
+        self.runs[run_id] = self.tracer.start_span(name, _current_span.get() or self.tracer.root, **attributes)
+
+    def _end(self, run_id, error: BaseException = None):
+        span = self.runs.pop(run_id, None)
+        if span is not None:
+            self.tracer.end_span(span, error)
+        return span
+
+    def _start_llm(self, serialized, text: str, run_id, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or params.get("_type") \
+            or (serialized or {}).get("name", "")
+        self._start(run_id, "llm", **{"llm.model": model, "llm.prompt_chars": len(text),
+                                      "llm.estimated_input_tokens": _estimate_tokens(text)})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        text = "".join(str(message.content) for batch in messages for message in batch)
+        self._start_llm(serialized, text, run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start_llm(serialized, "".join(prompts), run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._end(run_id)
+        if span is None:
+            return
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            span.attributes["llm.input_tokens"] = usage.get("input_tokens", 0)
+            span.attributes["llm.output_tokens"] = usage.get("output_tokens", 0)
+        else:
+            span.attributes["llm.input_tokens"] = span.attributes["llm.estimated_input_tokens"]
+            span.attributes["llm.output_tokens"] = _estimate_tokens(generation.text if generation else "")
+            span.attributes["llm.tokens_estimated"] = True
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        if kwargs.get("run_type") == "parser":
+            self.parsers.add(run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self.parsers.discard(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        if run_id in self.parsers:
+            self.parsers.discard(run_id)
+            add_event("parse_failure", error=f"{type(error).__name__}: {str(error)[:200]}")
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "retriever", **{"retriever.query_chars": len(query)})
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        span = self._end(run_id)
+        if span is not None:
+            span.attributes["retriever.documents"] = len(documents)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+@contextmanager
+def trace_run(name: str, path: str = DEFAULT_TRACE_PATH, show_summary: bool = True):
+    """with 블록 안의 실행을 추적하고, 끝나면 trace 파일을 저장하고 요약 표를 출력합니다.
+
+    블록 안에서 span("analyze") 같은 구간으로 단계를 나누면 요약 표에 단계별 행이 생깁니다.
+    """
+    global _active_tracer
+    tracer = Tracer(name)
+    _active_tracer = tracer
+    span_token = _current_span.set(tracer.root)
+    handler_token = _handler_var.set(TracingCallbackHandler(tracer))
+    try:
+        yield tracer
+    finally:
+        _handler_var.reset(handler_token)
+        _current_span.reset(span_token)
+        _active_tracer = None
+        tracer.end_span(tracer.root)
+        tracer.export(path)
+        if show_summary:
+            print(f"\n📊 실행 추적 요약 (trace: {path})")
+            print(tracer.format_summary())
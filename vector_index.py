@@ -0,0 +1,109 @@
+# 파일 이름: vector_index.py (언더바 사용 필수)
+
+import hashlib
+import os
+
+from data_preparer import extract_entry_date # 언더바 파일명으로 임포트
+
+DEFAULT_PERSIST_DIR = "./.cache/chroma"
+DEFAULT_FLAT_DIR = "./.cache/vectors"
+DEFAULT_COLLECTION = "maum_diary"
+SENTENCE_COLLECTION = "maum_diary_sentences"   # 문장 단위 자식 청크 (parent_retriever.py)
+DEFAULT_VECTOR_STORE = "flat"
+VECTOR_STORES = ("flat", "int8", "chroma")
+UPSERT_BATCH_SIZE = 256
+
+
+def chunk_id(doc) -> str:
+    """청크 내용 해시와 일기 날짜로 실행할 때마다 같은 값이 나오는 안정적인 ID를 만듭니다.
+
+    Document에 id가 이미 있으면(자식 문장처럼 만든 쪽이 ID를 정한 경우) 그대로 씁니다.
+    """
+    if getattr(doc, "id", None):
+        return doc.id
+    entry_date = doc.metadata.get("date") or extract_entry_date(doc.page_content)
+    digest = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()[:32]
+    return f"{entry_date}:{digest}" if entry_date else digest
+
+
+def open_vectorstore(embeddings, persist_directory: str = None,
+                     collection_name: str = DEFAULT_COLLECTION, store: str = None):
+    """영구 벡터 스토어를 엽니다.
+
+    store: flat(기본, memmap float32 행렬) | int8(양자화, 메모리 1/4) | chroma
+    (기본값은 VECTOR_STORE 환경 변수)
+    """
+    store = store or os.getenv("VECTOR_STORE", DEFAULT_VECTOR_STORE)
+    if store == "chroma":
+        from langchain_community.vectorstores import Chroma
+
+        return Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=persist_directory or DEFAULT_PERSIST_DIR,
+        )
+    if store in ("flat", "int8"):
+        from flat_vector_store import FlatVectorStore
+
+        directory = os.path.join(persist_directory or DEFAULT_FLAT_DIR,
+                                 collection_name + ("-int8" if store == "int8" else ""))
+        return FlatVectorStore(embeddings, persist_directory=directory,
+                               dtype="int8" if store == "int8" else "float32")
+    raise ValueError(f"알 수 없는 벡터 스토어: {store} (선택: {', '.join(VECTOR_STORES)})")
+
+
+def sync_vectorstore(documents, embeddings,
+                     persist_directory: str = None,
+                     collection_name: str = DEFAULT_COLLECTION,
+                     store: str = None):
+    """영구 벡터 스토어(open_vectorstore)를 documents와 같은 상태로 맞춘 뒤 반환합니다.
+
+    새로 생기거나 내용이 바뀐 청크만 임베딩하고, 사라진 청크는 삭제합니다.
+    내용은 같고 메타데이터(entry_id 등)만 달라진 청크는 다시 임베딩하지 않고 메타데이터만 고칩니다.
+    documents는 제너레이터여도 되며, 전체 문서 대신 ID 목록만 메모리에 유지합니다.
+    """
+    vectorstore = open_vectorstore(embeddings, persist_directory, collection_name, store)
+
+    stored = vectorstore.get(include=["metadatas"])
+    stored_metadata = dict(zip(stored["ids"], stored["metadatas"]))
+
+    seen_ids = set()
+    new_batch, moved_batch = [], []
+    added = moved = 0
+
+    def flush():
+        nonlocal added, moved
+        if new_batch:
+            vectorstore.add_documents([doc for _, doc in new_batch], ids=[i for i, _ in new_batch])
+            added += len(new_batch)
+            new_batch.clear()
+        if moved_batch:
+            # 임베딩은 그대로 두고 메타데이터만 갱신합니다.
+            moved_ids, moved_metadatas = [i for i, _ in moved_batch], [doc.metadata for _, doc in moved_batch]
+            if hasattr(vectorstore, "update_metadata"):
+                vectorstore.update_metadata(moved_ids, moved_metadatas)
+            else:
+                vectorstore._collection.update(ids=moved_ids, metadatas=moved_metadatas)
+            moved += len(moved_batch)
+            moved_batch.clear()
+
+    for doc in documents:
+        doc_id = chunk_id(doc)
+        if doc_id in seen_ids:
+            continue
+        seen_ids.add(doc_id)
+        if doc_id not in stored_metadata:
+            new_batch.append((doc_id, doc))
+        elif stored_metadata[doc_id] != doc.metadata:
+            moved_batch.append((doc_id, doc))
+        if len(new_batch) >= UPSERT_BATCH_SIZE or len(moved_batch) >= UPSERT_BATCH_SIZE:
+            flush()
+    flush()
+
+    stale_ids = [i for i in stored_metadata if i not in seen_ids]
+    if stale_ids:
+        vectorstore.delete(ids=stale_ids)
+
+    print(f"✅ 벡터 인덱스 동기화 완료: 추가 {added}개, 삭제 {len(stale_ids)}개, "
+          f"메타데이터 갱신 {moved}개, 유지 {len(seen_ids) - added - moved}개.")
+    return vectorstore